@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Descarga de imágenes (póster, fanart y pósters de temporada) para Jellyfin
+Las imágenes se descargan en paralelo con una sesión HTTP reutilizable, se
+guardan en una caché direccionada por contenido (con miniaturas) y se copian
+a las carpetas de la serie y la temporada sin frenar la conversión
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait as wait_futures
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from .http_client import get_http_client
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    Image = None
+
+TMDB_IMAGE_URL = "https://image.tmdb.org/t/p/original"
+THUMBNAIL_SIZE = (300, 450)
+# Firma de los formatos de imagen que usan TMDB y MyAnimeList
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'RIFF', '.webp'),
+    (b'GIF8', '.gif')
+)
+
+
+def detect_extension(data: bytes) -> Optional[str]:
+    """Extensión según el contenido (None si no es una imagen conocida)"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            if extension == '.webp' and data[8:12] != b'WEBP':
+                continue
+            return extension
+    return None
+
+
+class ArtworkCache:
+    """Caché de imágenes direccionada por contenido
+
+    Cada imagen se guarda una sola vez como blobs/ab/abcdef...ext (SHA-256 del
+    contenido), aunque la publiquen varias URLs; urls.json recuerda qué
+    contenido corresponde a cada URL para no volver a descargarla.
+    """
+
+    def __init__(self, cache_dir: str, session: Optional[requests.Session] = None,
+                 thumbnail_size: Tuple[int, int] = THUMBNAIL_SIZE, timeout: float = 30):
+        self.cache_dir = Path(cache_dir)
+        self.session = session or get_http_client()
+        self.thumbnail_size = thumbnail_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._index_path = self.cache_dir / "urls.json"
+        self._urls: Dict[str, str] = {}
+        self._downloads: Dict[str, threading.Lock] = {}
+        self.downloaded = 0
+        if self._index_path.exists():
+            try:
+                with open(self._index_path, 'r', encoding='utf-8') as f:
+                    self._urls = json.load(f)
+            except (OSError, ValueError):
+                self._urls = {}
+
+    def blob_path(self, name: str) -> Path:
+        """Ruta del blob 'digest.ext' dentro de la caché"""
+        return self.cache_dir / "blobs" / name[:2] / name
+
+    def thumbnail_path(self, name: str) -> Path:
+        width, height = self.thumbnail_size
+        return self.cache_dir / "thumbs" / f"{Path(name).stem}_{width}x{height}.jpg"
+
+    def lookup(self, url: str) -> Optional[Path]:
+        """Imagen ya descargada para la URL (None si no está en la caché)"""
+        with self._lock:
+            name = self._urls.get(url)
+        if name and self.blob_path(name).exists():
+            return self.blob_path(name)
+        return None
+
+    def fetch(self, url: str) -> Path:
+        """Ruta en la caché de la imagen de la URL, descargándola si hace falta"""
+        with self._lock:
+            url_lock = self._downloads.setdefault(url, threading.Lock())
+        # Una misma URL pedida por varios hilos se descarga una sola vez
+        with url_lock:
+            cached = self.lookup(url)
+            if cached is not None:
+                return cached
+
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.content
+            extension = detect_extension(data)
+            if extension is None:
+                raise ValueError(f"La respuesta de {url} no es una imagen")
+
+            name = hashlib.sha256(data).hexdigest() + extension
+            path = self.blob_path(name)
+            if not path.exists():
+                _atomic_write(path, data)
+            self.make_thumbnail(name)
+            with self._lock:
+                self.downloaded += 1
+                self._urls[url] = name
+                index = dict(self._urls)
+            _atomic_write(self._index_path, json.dumps(index, indent=2).encode('utf-8'))
+            return path
+
+    def make_thumbnail(self, name: str) -> Optional[Path]:
+        """Miniatura JPEG de un blob (requiere Pillow); None si no se puede generar"""
+        if not PIL_AVAILABLE:
+            return None
+        thumbnail = self.thumbnail_path(name)
+        if thumbnail.exists():
+            return thumbnail
+        try:
+            with Image.open(self.blob_path(name)) as image:
+                image = image.convert("RGB")
+                image.thumbnail(self.thumbnail_size)
+                thumbnail.parent.mkdir(parents=True, exist_ok=True)
+                fd, temp_name = tempfile.mkstemp(suffix=".jpg", dir=str(thumbnail.parent))
+                with os.fdopen(fd, 'wb') as f:
+                    image.save(f, "JPEG", quality=85)
+                os.replace(temp_name, thumbnail)
+            return thumbnail
+        except (OSError, ValueError):
+            return None
+
+
+def _atomic_write(path: Path, data: bytes):
+    """Escribe en un temporal de la misma carpeta y lo renombra"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
+
+def image_url(path_or_url: Optional[str], base_url: str = TMDB_IMAGE_URL) -> Optional[str]:
+    """URL completa de una imagen (TMDB entrega rutas relativas como '/abc.jpg')"""
+    if not path_or_url:
+        return None
+    if path_or_url.startswith(("http://", "https://")):
+        return path_or_url
+    return base_url.rstrip('/') + '/' + path_or_url.lstrip('/')
+
+
+def plan_artwork(metadata, details: Optional[Dict], series_dir: Path, season_dir: Optional[Path],
+                 season_number: int, base_url: str = TMDB_IMAGE_URL) -> List[Tuple[str, Path]]:
+    """Imágenes a descargar: (URL, destino sin extensión) con los nombres que usa Jellyfin
+
+    - Carpeta de la serie: poster y fanart
+    - Carpeta de la temporada: poster de la temporada
+    """
+    details = details or {}
+    jobs = []
+    if metadata.tmdb_data:
+        tmdb_data = metadata.tmdb_data
+        poster = details.get('poster_path') or tmdb_data.get('poster_path')
+        fanart = details.get('backdrop_path') or tmdb_data.get('backdrop_path')
+        jobs.append((image_url(poster, base_url), series_dir / "poster"))
+        jobs.append((image_url(fanart, base_url), series_dir / "fanart"))
+        if season_dir is not None:
+            for season in details.get('seasons') or []:
+                if season.get('season_number') == season_number:
+                    jobs.append((image_url(season.get('poster_path'), base_url), season_dir / "poster"))
+    elif metadata.jikan_data:
+        jobs.append((image_url(metadata.jikan_data.get('image_url')), series_dir / "poster"))
+    return [(url, destination) for url, destination in jobs if url]
+
+
+class ArtworkFetcher:
+    """Descarga imágenes en segundo plano y las copia a las carpetas de destino"""
+
+    def __init__(self, cache: ArtworkCache, max_workers: int = 4,
+                 on_log: Optional[Callable[[str], None]] = None):
+        self.cache = cache
+        self.on_log = on_log
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="artwork")
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
+
+    def _log(self, message: str):
+        if self.on_log:
+            self.on_log(message)
+
+    def submit(self, jobs: List[Tuple[str, Path]], overwrite: bool = False) -> List[Future]:
+        """Programa las descargas; retorna enseguida"""
+        futures = [self._executor.submit(self._install, url, destination, overwrite)
+                   for url, destination in jobs]
+        with self._lock:
+            self._futures.extend(futures)
+        return futures
+
+    def submit_with(self, plan: Callable[[], List[Tuple[str, Path]]], overwrite: bool = False) -> Future:
+        """Programa una tarea que primero obtiene los trabajos (p. ej. consultando detalles)"""
+        def run():
+            try:
+                return self.submit(plan(), overwrite)
+            except Exception as e:
+                self._log(f"⚠️ No se pudieron obtener las imágenes: {e}")
+                return []
+        future = self._executor.submit(run)
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def _install(self, url: str, destination: Path, overwrite: bool) -> Optional[Path]:
+        existing = [path for path in destination.parent.glob(destination.name + ".*")
+                    if path.suffix in {ext for _, ext in IMAGE_SIGNATURES}]
+        if existing and not overwrite:
+            return existing[0]
+        try:
+            blob = self.cache.fetch(url)
+            target = destination.with_suffix(blob.suffix)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(blob, target)
+            self._log(f"🖼️ Imagen guardada: {target.parent.name}/{target.name}")
+            return target
+        except (requests.RequestException, OSError, ValueError) as e:
+            self._log(f"⚠️ No se pudo descargar {url}: {e}")
+            return None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que terminen las descargas programadas; False si vence el tiempo"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # Las tareas de submit_with agregan sus descargas antes de terminar
+            with self._lock:
+                self._futures = [future for future in self._futures if not future.done()]
+                pending = list(self._futures)
+            if not pending:
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            wait_futures(pending, timeout=remaining)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Limitación de ancho de banda con cubetas de fichas (token bucket)
+Un límite global compartido por todas las descargas y otro por episodio,
+ambos ajustables mientras se convierte
+"""
+
+import time
+import threading
+import weakref
+from typing import Optional
+
+# Ráfaga permitida, en segundos de caudal: suficiente para no frenar cada
+# bloque pequeño pero sin picos que saturen la línea
+BURST_SECONDS = 0.5
+# Intervalo máximo de espera, para aplicar enseguida un cambio de límite o una cancelación
+MAX_WAIT_SLICE = 0.1
+
+
+class TokenBucket:
+    """Cubeta de fichas en bytes/s (0 = sin límite)
+
+    consume() descuenta los bytes en el momento y espera hasta que el saldo
+    vuelve a ser positivo, por lo que bloques mayores que la ráfaga también
+    se respetan y el caudal medio coincide con el límite.
+    """
+
+    def __init__(self, rate: float = 0, burst_seconds: float = BURST_SECONDS):
+        self.burst_seconds = burst_seconds
+        self._lock = threading.Lock()
+        self._rate = max(float(rate), 0.0)
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+
+    @property
+    def _burst(self) -> float:
+        return self._rate * self.burst_seconds
+
+    @property
+    def rate(self) -> float:
+        with self._lock:
+            return self._rate
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def set_rate(self, rate: float):
+        """Cambia el límite; las esperas en curso se ajustan al nuevo valor"""
+        with self._lock:
+            self._refill()
+            self._rate = max(float(rate), 0.0)
+            if not self._rate:
+                self._tokens = 0.0
+            else:
+                self._tokens = min(self._tokens, self._burst)
+
+    def consume(self, amount: int, cancel_token=None) -> bool:
+        """Descuenta bytes y espera lo necesario; retorna False si se canceló la espera"""
+        with self._lock:
+            if not self._rate:
+                return True
+            self._refill()
+            self._tokens -= amount
+
+        while True:
+            with self._lock:
+                if not self._rate:
+                    return True
+                self._refill()
+                if self._tokens >= 0:
+                    return True
+                wait = min(-self._tokens / self._rate, MAX_WAIT_SLICE)
+            if cancel_token is not None:
+                if cancel_token.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+class EpisodeThrottle:
+    """Límite de un episodio: su propia cubeta más la global"""
+
+    def __init__(self, episode_bucket: TokenBucket, global_bucket: TokenBucket):
+        self.episode_bucket = episode_bucket
+        self.global_bucket = global_bucket
+
+    def consume(self, amount: int, cancel_token=None) -> bool:
+        return (self.episode_bucket.consume(amount, cancel_token)
+                and self.global_bucket.consume(amount, cancel_token))
+
+
+class BandwidthLimiter:
+    """Límites de ancho de banda del conversor (bytes/s, 0 = sin límite)"""
+
+    def __init__(self, global_rate: float = 0, episode_rate: float = 0):
+        self.global_bucket = TokenBucket(global_rate)
+        self._episode_rate = max(float(episode_rate), 0.0)
+        self._episode_buckets = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    @property
+    def global_rate(self) -> float:
+        return self.global_bucket.rate
+
+    @property
+    def episode_rate(self) -> float:
+        with self._lock:
+            return self._episode_rate
+
+    def set_global_rate(self, rate: float):
+        self.global_bucket.set_rate(rate)
+
+    def set_episode_rate(self, rate: float):
+        """Cambia el límite por episodio, también en los episodios activos"""
+        with self._lock:
+            self._episode_rate = max(float(rate), 0.0)
+            buckets = list(self._episode_buckets)
+        for bucket in buckets:
+            bucket.set_rate(rate)
+
+    def episode_throttle(self) -> EpisodeThrottle:
+        """Limitador para las descargas de un episodio"""
+        with self._lock:
+            bucket = TokenBucket(self._episode_rate)
+            self._episode_buckets.add(bucket)
+        return EpisodeThrottle(bucket, self.global_bucket)
+
+
+def mbps_to_bytes(mbps: Optional[float]) -> float:
+    """Convierte megabits/s (como en la configuración) a bytes/s"""
+    return max(float(mbps or 0), 0.0) * 125000
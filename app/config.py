@@ -47,14 +47,61 @@ class ConfigManager:
                 "default_audio_mode": "keep_all",
                 "default_audio_format": "mp3",
                 "max_concurrent_processes": 2,
-                "backup_original": False
+                "backup_original": False,
+                "min_free_space_mb": 1024,
+                "preflight_action": "refuse",
+                "priority_mode": "normal",
+                "background_nice": 10,
+                "background_io_class": "idle",
+                "stall_timeout_seconds": 120,
+                "max_retries": 2,
+                "retry_backoff_seconds": 5,
+                "output_mode": "standard"
+            },
+            "converter": {
+                "native_hls": True,
+                "segment_workers": 8,
+                "segment_timeout_seconds": 30,
+                "max_parallel_episodes": 3,
+                "max_episodes_per_host": 2,
+                "max_bandwidth_mbps": 0,
+                "episode_bandwidth_mbps": 0,
+                "segment_cache_mb": 4096,
+                "max_parallel_encodes": 1,
+                "prefetch_depth": 2,
+                "prefetch_disk_mb": 8192,
+                "stream_remux": True,
+                "stream_buffer_segments": 16,
+                "output_mode": "standard",
+                "validate_on_add": True,
+                "validation_workers": 8
             },
             "metadata": {
                 "default_search_source": "tmdb",
                 "tmdb_api_key": "",
                 "auto_search": False,
+                "search_debounce_ms": 350,
+                "absolute_episode_numbers": False,
+                "auto_identify": True,
+                "identify_sources": ["tmdb", "jikan"],
+                "identify_threshold": 0.8,
+                "download_artwork": True,
+                "artwork_cache_dir": "artwork_cache",
+                "tmdb_image_url": "https://image.tmdb.org/t/p/original",
+                "prefetch_details": True,
+                "prefetch_top_n": 3,
                 "cache_metadata": True,
-                "cache_duration_days": 7
+                "cache_duration_days": 7,
+                "cache_stale_days": 30,
+                "cache_file": "metadata_cache.db",
+                "offline_index_file": "metadata_offline.db"
+            },
+            "network": {
+                "connect_timeout_seconds": 5,
+                "read_timeout_seconds": 30,
+                "retries": 2,
+                "pool_size": 10,
+                "host_pool_sizes": {}
             },
             "ui": {
                 "show_file_sizes": True,
@@ -117,6 +164,11 @@ class ConfigManager:
         except Exception:
             return default
     
+    def get_path(self, section: str, key: str, default: str) -> Path:
+        """Ruta de la configuración; las relativas se toman junto al archivo de configuración"""
+        path = Path(self.get(section, key, default) or default).expanduser()
+        return path if path.is_absolute() else self.config_file.parent / path
+    
     def set(self, section: str, key: str = None, value: Any = None) -> None:
         """Establecer valor de configuración"""
         try:
@@ -158,10 +210,18 @@ class ConfigManager:
         """Obtener configuración de procesamiento"""
         return self.get("processing", default={})
     
+    def get_converter_config(self) -> Dict[str, Any]:
+        """Obtener configuración del conversor de series (descargas HLS)"""
+        return self.get("converter", default={})
+    
     def get_metadata_config(self) -> Dict[str, Any]:
         """Obtener configuración de metadatos"""
         return self.get("metadata", default={})
     
+    def get_network_config(self) -> Dict[str, Any]:
+        """Obtener configuración del cliente HTTP compartido"""
+        return self.get("network", default={})
+    
     def get_ui_config(self) -> Dict[str, Any]:
         """Obtener configuración de UI"""
         return self.get("ui", default={})
@@ -271,6 +331,22 @@ class ConfigManager:
         if resolution not in valid_resolutions:
             errors.append(f"Resolución por defecto no válida: {resolution}")
         
+        valid_preflight_actions = ["refuse", "trim"]
+        preflight_action = self.get("processing", "preflight_action", "refuse")
+        if preflight_action not in valid_preflight_actions:
+            errors.append(f"Acción de verificación previa no válida: {preflight_action}")
+        
+        valid_priority_modes = ["normal", "background"]
+        priority_mode = self.get("processing", "priority_mode", "normal")
+        if priority_mode not in valid_priority_modes:
+            errors.append(f"Modo de prioridad no válido: {priority_mode}")
+        
+        valid_output_modes = ["standard", "fragmented", "mkv"]
+        for section in ("processing", "converter"):
+            output_mode = self.get(section, "output_mode", "standard")
+            if output_mode not in valid_output_modes:
+                errors.append(f"Modo de salida no válido en {section}: {output_mode}")
+        
         return errors
     
     def __str__(self) -> str:
@@ -8,10 +8,18 @@ Maneja la lógica de control entre la vista y el modelo
 import threading
 import subprocess
 import shutil
+import time
 from pathlib import Path
 from typing import Callable, Optional, List, Dict
 from .model import SeriesModel, VideoFile, SeriesMetadata
 from .utils import FFmpegProcessor, MetadataSearcher
+from .search_worker import DetailsPrefetcher
+from .planner import BatchPlanner, BatchPlan, SpeedHistory
+from .process_control import CancellationToken, remove_partial_output
+from .nfo import NfoWriter
+from .http_client import format_host_stats
+from .artwork import ArtworkCache, ArtworkFetcher, plan_artwork, TMDB_IMAGE_URL
+from .identifier import SeriesIdentifier, Identification, DEFAULT_THRESHOLD as DEFAULT_IDENTIFY_THRESHOLD
 
 class SeriesController:
     """Controlador principal de la aplicación"""
@@ -20,7 +28,31 @@ class SeriesController:
         self.config_manager = config_manager
         self.model = SeriesModel()
         self.ffmpeg_processor = FFmpegProcessor()
-        self.metadata_searcher = MetadataSearcher()
+        self.metadata_searcher = MetadataSearcher(config_manager)
+        # Historial de velocidades junto al archivo de configuración, no en el directorio actual
+        history_dir = config_manager.config_file.parent if config_manager else Path.cwd()
+        self.speed_history = SpeedHistory(str(history_dir / "encode_history.json"))
+        self.output_mode = "standard"
+        self.prefetch_details = True
+        prefetch_top_n = 3
+        
+        if config_manager:
+            self.prefetch_details = config_manager.get("metadata", "prefetch_details", True)
+            prefetch_top_n = config_manager.get("metadata", "prefetch_top_n", prefetch_top_n)
+            processing_config = config_manager.get_processing_config()
+            self.output_mode = processing_config.get("output_mode", "standard")
+            self.ffmpeg_processor.configure_priority(
+                processing_config.get("priority_mode", "normal"),
+                processing_config.get("background_nice", 10),
+                processing_config.get("background_io_class", "idle")
+            )
+            self.ffmpeg_processor.configure_watchdog(
+                processing_config.get("stall_timeout_seconds", 120),
+                processing_config.get("max_retries", 2),
+                processing_config.get("retry_backoff_seconds", 5)
+            )
+        # Detalles de los primeros resultados de cada búsqueda, pedidos en segundo plano
+        self.details_prefetcher = DetailsPrefetcher(self.metadata_searcher.get_details, top_n=prefetch_top_n)
         
         # Callbacks para la vista
         self.on_files_updated: Optional[Callable] = None
@@ -34,6 +66,10 @@ class SeriesController:
         self.current_file = 0
         self.total_files = 0
         self.stop_processing = False
+        self.current_plan: Optional[BatchPlan] = None
+        self.cancel_token = CancellationToken()
+        self.artwork_fetcher: Optional[ArtworkFetcher] = None
+        self.nfo_writer: Optional[NfoWriter] = None
     
     def set_callbacks(self, **callbacks):
         """Establece los callbacks para comunicación con la vista"""
@@ -138,14 +174,17 @@ class SeriesController:
     def search_metadata(self, query: str, source: str = "tmdb") -> List[Dict]:
         """Busca metadatos de la serie"""
         try:
-            if source == "tmdb":
-                results = self.metadata_searcher.search_tmdb(query)
-            elif source == "jikan":
-                results = self.metadata_searcher.search_jikan(query)
-            else:
-                return []
+            # Una búsqueda nueva deja sin sentido la precarga de la anterior
+            self.details_prefetcher.cancel()
+            results = self.metadata_searcher.search(query, source)
+            if self.prefetch_details:
+                self.details_prefetcher.prefetch(results, source)
             
             self.log_message(f"🔍 Encontrados {len(results)} resultados para '{query}' en {source.upper()}")
+            cache_stats = self.metadata_searcher.get_cache_stats()
+            if cache_stats:
+                self.log_message(f"📦 Caché de metadatos: {cache_stats['hit_rate']:.0%} de aciertos "
+                                 f"({cache_stats['entries']} respuestas guardadas)")
             return results
         except Exception as e:
             self.log_message(f"❌ Error buscando metadatos: {str(e)}")
@@ -154,6 +193,9 @@ class SeriesController:
     def apply_metadata(self, metadata: Dict, source: str = "tmdb"):
         """Aplica metadatos seleccionados a la serie"""
         try:
+            if source == "offline":
+                # Los resultados del índice local indican de qué fuente provienen
+                source = metadata.get('source', 'tmdb')
             if source == "tmdb":
                 self.model.metadata.name = metadata.get('name', '')
                 self.model.metadata.year = str(metadata.get('first_air_date', '')[:4]) if metadata.get('first_air_date') else ''
@@ -164,10 +206,79 @@ class SeriesController:
                 self.model.metadata.year = str(metadata.get('year', '')) if metadata.get('year') else ''
                 self.model.metadata.jikan_data = metadata
             
+            self.model.metadata.details = self._prefetched_details(source, metadata.get('id'))
+            # Los títulos de episodios se cargan al procesar, una vez por temporada
+            self.model.metadata.episode_index = None
             self.log_message(f"✅ Metadatos aplicados desde {source.upper()}: {self.model.metadata.name}")
         except Exception as e:
             self.log_message(f"❌ Error aplicando metadatos: {str(e)}")
     
+    def _prefetched_details(self, source: str, item_id) -> Optional[Dict]:
+        """Detalles ya disponibles (precarga o caché) sin esperar a la red
+        
+        Si aún no están, se piden en segundo plano para que lleguen a la caché
+        antes de procesar.
+        """
+        if item_id is None or source not in ("tmdb", "jikan"):
+            return None
+        details = self.details_prefetcher.get(source, item_id)
+        if details is None:
+            details = self.metadata_searcher.peek_cached(source, "details", item_id)
+        if details is None:
+            self.details_prefetcher.prefetch([{'id': item_id, 'source': source}], source)
+        return details
+    
+    def create_identifier(self) -> SeriesIdentifier:
+        """Identificador de series con las fuentes y el umbral de la configuración"""
+        sources = ["tmdb", "jikan"]
+        threshold = DEFAULT_IDENTIFY_THRESHOLD
+        if self.config_manager:
+            sources = self.config_manager.get("metadata", "identify_sources", sources)
+            threshold = self.config_manager.get("metadata", "identify_threshold", threshold)
+        if self.metadata_searcher.offline_index and "offline" not in sources:
+            # El índice local responde sin red: se consulta primero
+            sources = ["offline"] + list(sources)
+        return SeriesIdentifier(self.metadata_searcher.search, sources, threshold)
+    
+    def auto_identify_series(self, source_folder: str) -> Optional[Identification]:
+        """Identifica la serie por el nombre de la carpeta y de sus archivos
+        
+        No aplica los metadatos: quien llama decide (con apply_metadata) si el
+        resultado es fiable (identification.confident, según
+        metadata.identify_threshold) y si el usuario no ha escrito ya otro nombre.
+        """
+        file_names = [video_file.name for video_file in self.model.video_files]
+        identification = self.create_identifier().identify(Path(source_folder).name, file_names)
+        self.log_message(f"🔎 Identificación automática: {identification.summary}")
+        return identification
+    
+    def load_episode_titles(self) -> int:
+        """Carga los títulos de la temporada actual para nombrar los episodios
+        
+        Se pide la temporada completa una sola vez (con caché); después cada
+        nombre se resuelve en memoria. Retorna el número de títulos cargados.
+        """
+        metadata = self.model.metadata
+        if metadata.tmdb_data and metadata.series_id:
+            source, series_id = "tmdb", metadata.series_id
+        elif metadata.jikan_data and metadata.jikan_data.get('id'):
+            source, series_id = "jikan", metadata.jikan_data['id']
+        else:
+            return 0
+        
+        if self.config_manager:
+            metadata.absolute_numbering = self.config_manager.get("metadata", "absolute_episode_numbers", False)
+        season_number = int(metadata.season) if str(metadata.season).isdigit() else 1
+        index = metadata.episode_index
+        # En numeración absoluta se reconstruye siempre (las temporadas ya pedidas están en memoria)
+        if index is None or not index.has_season(season_number) or metadata.absolute_numbering:
+            index = self.metadata_searcher.get_episode_index(source, series_id, season_number,
+                                                             absolute=metadata.absolute_numbering)
+            metadata.episode_index = index
+        if len(index):
+            self.log_message(f"📚 {len(index)} títulos de episodios cargados desde {source.upper()}")
+        return len(index)
+    
     # Métodos de procesamiento
     def start_processing(self, operation_mode: str, output_directory: str, 
                         resolution: str = "Original", compression_level: str = "Medium",
@@ -196,6 +307,7 @@ class SeriesController:
         # Configurar procesamiento
         self.is_processing = True
         self.stop_processing = False
+        self.cancel_token = CancellationToken()
         self.current_file = 0
         self.total_files = len(self.model.video_files)
         
@@ -214,17 +326,89 @@ class SeriesController:
         
         return True
     
+    def set_priority_mode(self, mode: str):
+        """Cambia el modo de prioridad (normal/segundo plano), incluso en ejecución"""
+        results = self.ffmpeg_processor.set_priority_mode(mode)
+        if self.config_manager:
+            self.config_manager.set("processing", "priority_mode", self.ffmpeg_processor.priority_mode)
+        
+        label = "segundo plano" if self.ffmpeg_processor.priority_mode == "background" else "normal"
+        self.log_message(f"🌙 Modo de ejecución: {label}")
+        for pid, applied in results.items():
+            if not applied:
+                self.log_message(f"⚠️ No se pudo cambiar la prioridad del proceso {pid} (puede requerir permisos)")
+    
     def stop_processing_request(self):
-        """Solicita detener el procesamiento"""
+        """Solicita detener el procesamiento, terminando los procesos en curso"""
         self.stop_processing = True
         self.log_message("🛑 Solicitando detener procesamiento...")
+        latency = self.cancel_token.cancel()
+        self.log_message(f"🛑 Procesos detenidos en {latency * 1000:.0f} ms")
+    
+    def plan_batch(self, operation_mode: str, output_directory: str,
+                   resolution: str = "Original", compression_level: str = "Medium",
+                   audio_mode: str = "keep_all", selected_audio_track: str = "0",
+                   audio_format: str = "mp3") -> BatchPlan:
+        """Estima tamaño y tiempo del lote y lo compara con el espacio libre"""
+        reserve_mb = 1024
+        if self.config_manager:
+            reserve_mb = self.config_manager.get("processing", "min_free_space_mb", 1024)
+        
+        planner = BatchPlanner(self.ffmpeg_processor, self.speed_history, reserve_mb)
+        return planner.plan(self.model.video_files, output_directory, operation_mode,
+                            resolution, compression_level, audio_mode,
+                            selected_audio_track, audio_format)
+    
+    def _run_preflight(self, operation_mode: str, output_directory: str,
+                       resolution: str, compression_level: str, audio_mode: str,
+                       selected_audio_track: str, audio_format: str) -> int:
+        """Verifica espacio y tiempo antes del lote; retorna cuántos archivos procesar"""
+        # Sin plan no se registran velocidades (no usar las estimaciones del lote anterior)
+        self.current_plan = None
+        try:
+            plan = self.plan_batch(operation_mode, output_directory, resolution,
+                                   compression_level, audio_mode, selected_audio_track,
+                                   audio_format)
+        except Exception as e:
+            self.log_message(f"⚠️ No se pudo estimar el lote: {str(e)}")
+            return len(self.model.video_files)
+        
+        self.current_plan = plan
+        for line in plan.format_report():
+            self.log_message(line)
+        
+        if plan.fits:
+            return len(plan.jobs)
+        
+        action = "refuse"
+        if self.config_manager:
+            action = self.config_manager.get("processing", "preflight_action", "refuse")
+        
+        if action == "trim" and plan.fitting_count > 0:
+            self.current_plan = plan.trim()
+            self.log_message(f"✂️ Lote recortado a {plan.fitting_count} de {len(plan.jobs)} archivos por falta de espacio")
+            return plan.fitting_count
+        
+        self.log_message("🚫 Lote rechazado: no hay espacio suficiente en el destino")
+        return 0
     
     def _process_files(self, operation_mode: str, output_directory: str,
                       resolution: str, compression_level: str, audio_mode: str,
                       selected_audio_track: str, audio_format: str,
                       jellyfin_structure: bool, create_nfo: bool):
         """Procesa todos los archivos (ejecutado en hilo separado)"""
+        rejected = False
         try:
+            # Verificación previa de espacio y tiempo
+            file_count = self._run_preflight(operation_mode, output_directory, resolution,
+                                             compression_level, audio_mode,
+                                             selected_audio_track, audio_format)
+            if file_count == 0:
+                rejected = True
+                return
+            self.total_files = file_count
+            speed_key = SpeedHistory.make_key(operation_mode, resolution, compression_level)
+            
             # Crear directorio de trabajo
             work_dir = self._create_work_directory(output_directory, jellyfin_structure)
             
@@ -232,8 +416,16 @@ class SeriesController:
             self.log_message(f"📁 Directorio de salida: {work_dir}")
             self.log_message(f"🎯 Modo de operación: {operation_mode}")
             
+            # Títulos de la temporada completa antes de nombrar el primer episodio
+            self.load_episode_titles()
+            # Imágenes en segundo plano mientras se procesan los episodios
+            self.start_artwork_download(work_dir, jellyfin_structure)
+            # NFO de la serie y la temporada; los de episodios se escriben al terminar cada uno
+            write_nfo = (create_nfo and operation_mode != "extract_audio"
+                         and self.start_nfo_files(work_dir, jellyfin_structure))
+            
             # Procesar cada archivo
-            for i, video_file in enumerate(self.model.video_files):
+            for i, video_file in enumerate(self.model.video_files[:file_count]):
                 if self.stop_processing:
                     break
                 
@@ -243,23 +435,38 @@ class SeriesController:
                 self.update_progress(self.current_file, self.total_files, 
                                    f"Procesando: {video_file.name}")
                 
+                started = time.monotonic()
                 success = self._process_single_file(
                     video_file, work_dir, episode_num, operation_mode,
                     resolution, compression_level, audio_mode,
                     selected_audio_track, audio_format
                 )
                 
-                if not success and not self.stop_processing:
+                if success:
+                    self._record_speed(speed_key, i, operation_mode, time.monotonic() - started)
+                    if write_nfo:
+                        output_name = self.model.metadata.generate_episode_name(episode_num, video_file.name)
+                        self.nfo_writer.write_episode(self.model.metadata, episode_num, work_dir / output_name)
+                elif not self.stop_processing:
                     self.log_message(f"❌ Error procesando: {video_file.name}")
             
-            # Crear archivos NFO si está habilitado
-            if create_nfo and not self.stop_processing:
-                self._create_nfo_files(work_dir)
+            if self.artwork_fetcher and not self.stop_processing:
+                if not self.artwork_fetcher.wait(timeout=60):
+                    self.log_message("⚠️ Algunas imágenes siguen descargándose")
+            
+            # Solo quedan los NFO del último episodio, si aún no se escribieron
+            if write_nfo and not self.nfo_writer.wait(timeout=30):
+                self.log_message("⚠️ Algunos archivos NFO siguen escribiéndose")
+            elif write_nfo:
+                self.log_message(f"📄 {self.nfo_writer.written} archivos NFO creados")
             
             # Mostrar resumen final
             if not self.stop_processing:
                 self.log_message(f"📂 Archivos guardados en: {work_dir}")
                 self.log_message(f"📊 Total procesados: {self.current_file}/{self.total_files}")
+                # Servidores más lentos de la sesión (metadatos e imágenes)
+                for line in format_host_stats(dict(self.metadata_searcher.http.slowest_hosts(3))):
+                    self.log_message(line)
             
         except Exception as e:
             self.log_message(f"❌ Error durante el procesamiento: {str(e)}")
@@ -271,9 +478,19 @@ class SeriesController:
             
             if self.stop_processing:
                 self.log_message("🛑 Procesamiento detenido por el usuario")
-            else:
+            elif not rejected:
                 self.log_message("🎉 ¡Conversión completada!")
     
+    def _record_speed(self, speed_key: str, job_index: int, operation_mode: str,
+                      elapsed_seconds: float):
+        """Registra la velocidad real de un trabajo para futuras estimaciones"""
+        if not self.current_plan or job_index >= len(self.current_plan.jobs):
+            return
+        job = self.current_plan.jobs[job_index]
+        # La copia se mide en bytes/s; la conversión en segundos de media/s
+        amount = job.estimated_bytes if operation_mode == "rename" else job.duration
+        self.speed_history.record(speed_key, amount, elapsed_seconds)
+    
     def _create_work_directory(self, output_directory: str, jellyfin_structure: bool) -> Path:
         """Crea el directorio de trabajo"""
         output_path = Path(output_directory)
@@ -307,7 +524,8 @@ class SeriesController:
             if operation_mode == "rename":
                 # Solo copiar/renombrar
                 self.log_message(f"📋 Copiando: {video_file.name} → {output_name}")
-                shutil.copy2(video_file.path, output_path)
+                if not self._copy_file(video_file.path, output_path):
+                    return False
                 self.log_message(f"✅ Copiado: {output_name} → {output_path}")
                 
             elif operation_mode == "convert":
@@ -317,7 +535,8 @@ class SeriesController:
                 
                 success = self.ffmpeg_processor.convert_video(
                     str(video_file.path), str(output_path), resolution,
-                    compression_level, audio_mode, selected_audio_track
+                    compression_level, audio_mode, selected_audio_track,
+                    cancel_token=self.cancel_token, output_mode=self.output_mode
                 )
                 if success:
                     self.log_message(f"✅ Convertido: {output_name} → {output_path}")
@@ -333,7 +552,7 @@ class SeriesController:
                 
                 success = self.ffmpeg_processor.extract_audio(
                     str(video_file.path), str(audio_output), audio_format,
-                    selected_audio_track
+                    selected_audio_track, cancel_token=self.cancel_token
                 )
                 if success:
                     self.log_message(f"✅ Audio extraído: {audio_output.name} → {audio_output}")
@@ -347,40 +566,77 @@ class SeriesController:
             self.log_message(f"❌ Error procesando {video_file.name}: {str(e)}")
             return False
     
-    def _create_nfo_files(self, work_dir: Path):
-        """Crea archivos NFO para Jellyfin/Kodi"""
-        try:
-            # Crear tvshow.nfo para la serie
-            if self.model.metadata.tmdb_data:
-                nfo_content = self._generate_tvshow_nfo()
-                nfo_path = work_dir.parent / "tvshow.nfo"
-                with open(nfo_path, 'w', encoding='utf-8') as f:
-                    f.write(nfo_content)
-                self.log_message("📄 Archivo tvshow.nfo creado")
-        except Exception as e:
-            self.log_message(f"❌ Error creando archivos NFO: {str(e)}")
-    
-    def _generate_tvshow_nfo(self) -> str:
-        """Genera contenido NFO para la serie"""
-        tmdb_data = self.model.metadata.tmdb_data
-        if not tmdb_data:
-            return ""
-        
-        nfo_content = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<tvshow>
-    <title>{tmdb_data.get('name', '')}</title>
-    <originaltitle>{tmdb_data.get('original_name', '')}</originaltitle>
-    <showtitle>{tmdb_data.get('name', '')}</showtitle>
-    <plot>{tmdb_data.get('overview', '')}</plot>
-    <year>{tmdb_data.get('first_air_date', '')[:4] if tmdb_data.get('first_air_date') else ''}</year>
-    <premiered>{tmdb_data.get('first_air_date', '')}</premiered>
-    <status>{tmdb_data.get('status', '')}</status>
-    <tmdbid>{tmdb_data.get('id', '')}</tmdbid>
-    <rating>{tmdb_data.get('vote_average', 0)}</rating>
-    <votes>{tmdb_data.get('vote_count', 0)}</votes>
-</tvshow>"""
-        
-        return nfo_content
+    def _copy_file(self, source: Path, destination: Path, chunk_size: int = 8 * 1024 * 1024) -> bool:
+        """Copia un archivo por bloques para poder cancelar a mitad de la copia"""
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            while not self.cancel_token.is_cancelled:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                dst.write(chunk)
+        
+        if self.cancel_token.is_cancelled:
+            remove_partial_output(str(destination))
+            return False
+        
+        shutil.copystat(source, destination)
+        return True
+    
+    def start_artwork_download(self, work_dir: Path, jellyfin_structure: bool = True) -> bool:
+        """Programa póster, fanart y póster de temporada sin esperar a que terminen
+        
+        Las imágenes van a la carpeta de la serie y a la de la temporada (estructura
+        Jellyfin) o junto a los episodios. Retorna False si no hay nada que descargar.
+        """
+        metadata = self.model.metadata
+        if not (metadata.tmdb_data or metadata.jikan_data):
+            return False
+        cache_dir, base_url = Path("artwork_cache"), TMDB_IMAGE_URL
+        if self.config_manager:
+            if not self.config_manager.get("metadata", "download_artwork", True):
+                return False
+            cache_dir = self.config_manager.get_path("metadata", "artwork_cache_dir", "artwork_cache")
+            base_url = self.config_manager.get("metadata", "tmdb_image_url", base_url)
+        if self.artwork_fetcher is None:
+            self.artwork_fetcher = ArtworkFetcher(ArtworkCache(str(cache_dir)), on_log=self.log_message)
+        
+        series_dir = work_dir.parent if jellyfin_structure else work_dir
+        season_dir = work_dir if jellyfin_structure else None
+        season_number = int(metadata.season) if str(metadata.season).isdigit() else 1
+        
+        def plan():
+            # Los detalles (fanart, pósters de temporada) también se piden en segundo plano
+            details = metadata.details if metadata.tmdb_data else None
+            if details is None and metadata.tmdb_data and metadata.series_id:
+                details = self.metadata_searcher.get_tmdb_details(metadata.series_id)
+            return plan_artwork(metadata, details, series_dir, season_dir, season_number, base_url)
+        
+        self.artwork_fetcher.submit_with(plan)
+        return True
+    
+    def start_nfo_files(self, work_dir: Path, jellyfin_structure: bool = True) -> bool:
+        """Escribe tvshow.nfo y season.nfo en segundo plano (y prepara los de episodios)
+        
+        Retorna False si no hay metadatos de TMDB ni de Jikan aplicados.
+        """
+        metadata = self.model.metadata
+        if not metadata.tmdb_data and not metadata.jikan_data:
+            return False
+        if self.nfo_writer is not None:
+            self.nfo_writer.shutdown()
+        self.nfo_writer = NfoWriter(on_log=self.log_message)
+        
+        series_dir = work_dir.parent if jellyfin_structure else work_dir
+        season_dir = work_dir if jellyfin_structure else None
+        
+        def get_details():
+            # Detalles desde la caché (los pidió la precarga o las imágenes)
+            if metadata.tmdb_data and metadata.series_id:
+                return self.metadata_searcher.get_tmdb_details(metadata.series_id)
+            return None
+        
+        self.nfo_writer.write_series(metadata, series_dir, season_dir, get_details)
+        return True
     
     # Propiedades de acceso al modelo
     @property
@@ -395,6 +651,10 @@ class SeriesController:
     def ffmpeg_available(self) -> bool:
         return self.model.ffmpeg_path is not None
     
+    @property
+    def priority_mode(self) -> str:
+        return self.ffmpeg_processor.priority_mode
+    
     @property
     def directory_history(self) -> List[str]:
         return self.model.directory_history
\ No newline at end of file
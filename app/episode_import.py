@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Importación de listas de episodios para el conversor de series
+Lee listas .m3u/.m3u8, listas de URLs en texto plano y CSV (url, name, number)
+línea a línea, sin cargar el archivo entero, y guarda las listas de forma atómica
+"""
+
+import os
+import csv
+import sys
+import json
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Iterator, Iterable, Optional, Callable, Tuple
+
+# Etiquetas que indican una lista HLS de un solo video, no una lista de episodios
+HLS_STREAM_TAGS = ("#EXT-X-TARGETDURATION", "#EXT-X-STREAM-INF", "#EXT-X-MEDIA-SEQUENCE")
+
+CSV_DELIMITERS = (",", ";", "\t")
+
+IMPORT_FORMATS = {
+    ".m3u": "m3u",
+    ".m3u8": "m3u",
+    ".csv": "csv",
+    ".json": "json"
+}
+
+
+class EpisodeImportError(Exception):
+    """Archivo de episodios no válido"""
+
+
+def detect_format(file_path: str) -> str:
+    """Formato según la extensión (las demás se leen como lista de URLs)"""
+    return IMPORT_FORMATS.get(Path(file_path).suffix.lower(), "text")
+
+
+def _open_text(file_path: str):
+    # utf-8-sig descarta el BOM que añaden algunos editores en Windows
+    return open(file_path, 'r', encoding='utf-8-sig', errors='replace', newline='')
+
+
+def iter_m3u(file_path: str) -> Iterator[Tuple[str, str, str]]:
+    """Entradas (url, nombre, número) de una lista M3U extendida"""
+    name = ""
+    with _open_text(file_path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith(HLS_STREAM_TAGS):
+                raise EpisodeImportError("El archivo es una lista HLS de un solo video, no una lista de episodios")
+            if line.startswith("#EXTINF:"):
+                # #EXTINF:-1 tvg-name="..",Nombre del episodio
+                name = line.split(",", 1)[1].strip() if "," in line else ""
+            elif not line.startswith("#"):
+                yield line, name, ""
+                name = ""
+
+
+def iter_url_list(file_path: str) -> Iterator[Tuple[str, str, str]]:
+    """Entradas de una lista de URLs: una por línea, opcionalmente seguida del nombre"""
+    with _open_text(file_path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split(None, 1)
+            yield parts[0], parts[1].strip() if len(parts) > 1 else "", ""
+
+
+def iter_csv(file_path: str) -> Iterator[Tuple[str, str, str]]:
+    """Entradas de un CSV con columnas url, name, number (con o sin encabezado)"""
+    with _open_text(file_path) as f:
+        # Separador más frecuente de la primera línea (Excel en español usa ';')
+        first_line = f.readline()
+        f.seek(0)
+        delimiter = max(CSV_DELIMITERS, key=first_line.count)
+        reader = csv.reader(f, delimiter=delimiter)
+        columns = {"url": 0, "name": 1, "number": 2}
+        for row in reader:
+            cells = [cell.strip() for cell in row]
+            if not cells or not any(cells):
+                continue
+            if reader.line_num == 1 and "url" in (cell.lower() for cell in cells):
+                columns = {cell.lower(): i for i, cell in enumerate(cells)}
+                continue
+
+            def cell(column):
+                index = columns.get(column)
+                return cells[index] if index is not None and index < len(cells) else ""
+
+            yield cell("url"), cell("name"), cell("number")
+
+
+def iter_json(file_path: str) -> Iterator[Tuple[str, str, str]]:
+    """Entradas de una lista guardada por la aplicación"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        episodes = json.load(f)
+    if not isinstance(episodes, list):
+        raise EpisodeImportError("La lista JSON debe ser un arreglo de episodios")
+    for episode in episodes:
+        yield episode.get('url', ''), episode.get('name', ''), str(episode.get('number', ''))
+
+
+READERS = {
+    "m3u": iter_m3u,
+    "text": iter_url_list,
+    "csv": iter_csv,
+    "json": iter_json
+}
+
+
+def import_episodes(file_path: str, start_number: int = 1, existing: Iterable[Dict] = (),
+                    batch_size: int = 200,
+                    on_batch: Optional[Callable[[List[Dict]], None]] = None,
+                    cancel_token=None) -> Tuple[List[Dict], int]:
+    """Importa episodios nuevos desde un archivo
+
+    Descarta URLs repetidas (también las ya presentes en 'existing') y numera
+    desde start_number continuando tras los episodios existentes, salvo que la
+    entrada traiga su propio número. on_batch recibe los episodios por lotes
+    a medida que se leen. Retorna (episodios importados, duplicados descartados).
+    """
+    existing = list(existing)
+    seen = {episode.get('url') for episode in existing}
+    next_number = start_number + len(existing)
+    imported: List[Dict] = []
+    batch: List[Dict] = []
+    duplicates = 0
+
+    for url, name, number in READERS[detect_format(file_path)](file_path):
+        if cancel_token is not None and cancel_token.is_cancelled:
+            break
+        if not url.lower().startswith(("http://", "https://")):
+            continue
+        if url in seen:
+            duplicates += 1
+            continue
+        seen.add(url)
+
+        if number.isdigit():
+            episode_number = int(number)
+        else:
+            episode_number = next_number
+        next_number = max(next_number, episode_number + 1)
+
+        episode = {
+            'number': f"{episode_number:02d}",
+            'name': name or f"Episodio {episode_number}",
+            'url': url
+        }
+        imported.append(episode)
+        batch.append(episode)
+        if on_batch and len(batch) >= batch_size:
+            on_batch(batch)
+            batch = []
+
+    if on_batch and batch:
+        on_batch(batch)
+    return imported, duplicates
+
+
+def save_episode_list(file_path: str, episodes: List[Dict]):
+    """Guarda la lista de episodios de forma atómica
+
+    Se escribe en un temporal de la misma carpeta y se reemplaza el archivo
+    final, de modo que un cierre inesperado nunca deja una lista a medias.
+    """
+    target = Path(file_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=str(target.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(episodes, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_name, target)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
+
+def main():
+    """Comando: python -m app.episode_import <archivo> [--start N] [-o lista.json]"""
+    parser = argparse.ArgumentParser(description="Convierte listas M3U, de URLs o CSV en una lista de episodios")
+    parser.add_argument("source", help="Archivo .m3u/.m3u8, .csv, .json o lista de URLs")
+    parser.add_argument("--start", type=int, default=1, help="Número del primer episodio")
+    parser.add_argument("-o", "--output", help="Lista JSON de destino (se agregan los episodios nuevos)")
+    args = parser.parse_args()
+
+    existing = []
+    if args.output and Path(args.output).exists():
+        with open(args.output, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+
+    try:
+        imported, duplicates = import_episodes(args.source, args.start, existing)
+    except (EpisodeImportError, OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"📥 {len(imported)} episodios importados, {duplicates} duplicados descartados")
+    if args.output:
+        save_episode_list(args.output, existing + imported)
+        print(f"💾 Lista guardada en {args.output}")
+    else:
+        json.dump(imported, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cola de episodios para el conversor de series
+Ejecuta varias descargas a la vez con límite global, límite por servidor
+y admisión según el ancho de banda medido
+"""
+
+import time
+import queue
+import threading
+from collections import deque
+from urllib.parse import urlparse
+from typing import List, Dict, Callable, Optional, Any
+
+from .bandwidth import TokenBucket
+
+
+class ThroughputMeter:
+    """Mide el caudal (bytes/s) en una ventana deslizante"""
+
+    def __init__(self, window: float = 3.0):
+        self.window = window
+        self._samples = deque()
+        self._lock = threading.Lock()
+
+    def add(self, byte_count: int):
+        if byte_count <= 0:
+            return
+        with self._lock:
+            self._samples.append((time.monotonic(), byte_count))
+
+    def rate(self) -> float:
+        """Bytes por segundo en la ventana actual"""
+        now = time.monotonic()
+        with self._lock:
+            while self._samples and now - self._samples[0][0] > self.window:
+                self._samples.popleft()
+            total = sum(count for _, count in self._samples)
+        return total / self.window
+
+
+def get_host(url: str) -> str:
+    """Servidor (host:puerto) de una URL; las rutas locales comparten clave"""
+    return urlparse(url).netloc.lower() or "local"
+
+
+class EpisodeJob:
+    """Episodio en la cola"""
+
+    def __init__(self, index: int, url: str, payload: Any = None):
+        self.index = index
+        self.url = url
+        self.payload = payload
+        self.host = get_host(url)
+        self.success: Optional[bool] = None
+
+
+class EpisodeQueue:
+    """Ejecuta episodios en paralelo respetando los límites configurados
+
+    - max_parallel: episodios activos a la vez como máximo
+    - max_per_host: episodios activos contra el mismo servidor
+    - max_bandwidth: bytes/s; si el caudal medido se acerca al límite no se
+      admiten más episodios (0 = sin límite)
+    - bandwidth_bucket: cubeta global de la que se lee el límite en cada
+      admisión, para que los cambios en vivo se apliquen (en lugar de max_bandwidth)
+    """
+
+    def __init__(self, max_parallel: int = 3, max_per_host: int = 2,
+                 max_bandwidth: float = 0, admit_interval: float = 0.5,
+                 bandwidth_bucket: Optional[TokenBucket] = None):
+        self.max_parallel = max(int(max_parallel), 1)
+        self.max_per_host = max(int(max_per_host), 1)
+        self.bandwidth_bucket = bandwidth_bucket
+        self._max_bandwidth = max_bandwidth
+        self.admit_interval = admit_interval
+        self.meter = ThroughputMeter()
+        self._condition = threading.Condition()
+        self._active: Dict[int, EpisodeJob] = {}
+        self._host_counts: Dict[str, int] = {}
+        self._last_admit = 0.0
+
+    @property
+    def max_bandwidth(self) -> float:
+        if self.bandwidth_bucket is not None:
+            return self.bandwidth_bucket.rate
+        return self._max_bandwidth
+
+    @max_bandwidth.setter
+    def max_bandwidth(self, rate: float):
+        if self.bandwidth_bucket is not None:
+            self.bandwidth_bucket.set_rate(rate)
+        else:
+            self._max_bandwidth = rate
+
+    def report_bytes(self, byte_count: int):
+        """Informa bytes descargados (para la admisión por ancho de banda)"""
+        self.meter.add(byte_count)
+
+    @property
+    def active_count(self) -> int:
+        with self._condition:
+            return len(self._active)
+
+    def _bandwidth_saturated(self) -> bool:
+        max_bandwidth = self.max_bandwidth
+        if not max_bandwidth or not self._active:
+            return False
+        # Dar tiempo a medir el caudal del último episodio admitido
+        if time.monotonic() - self._last_admit < self.admit_interval:
+            return True
+        return self.meter.rate() >= max_bandwidth * 0.9
+
+    def _next_admissible(self, pending: deque) -> Optional[EpisodeJob]:
+        """Primer episodio pendiente cuyo servidor tiene capacidad libre"""
+        if len(self._active) >= self.max_parallel or self._bandwidth_saturated():
+            return None
+        for job in pending:
+            if self._host_counts.get(job.host, 0) < self.max_per_host:
+                pending.remove(job)
+                return job
+        return None
+
+    def run(self, jobs: List[EpisodeJob], worker: Callable[[EpisodeJob], bool],
+            cancel_token=None, on_finished: Optional[Callable[[EpisodeJob], None]] = None) -> List[EpisodeJob]:
+        """Procesa todos los episodios y retorna la lista con el resultado de cada uno
+
+        Al cancelar no se admiten nuevos episodios y se espera a que terminen
+        los activos (que reciben la cancelación por el mismo token).
+        """
+        pending = deque(jobs)
+
+        def execute(job: EpisodeJob):
+            try:
+                job.success = bool(worker(job))
+            except Exception:
+                job.success = False
+            finally:
+                if on_finished:
+                    on_finished(job)
+                with self._condition:
+                    del self._active[job.index]
+                    self._host_counts[job.host] -= 1
+                    self._condition.notify_all()
+
+        with self._condition:
+            while pending or self._active:
+                cancelled = cancel_token is not None and cancel_token.is_cancelled
+                job = None if cancelled else self._next_admissible(pending)
+                if job is not None:
+                    self._active[job.index] = job
+                    self._host_counts[job.host] = self._host_counts.get(job.host, 0) + 1
+                    self._last_admit = time.monotonic()
+                    threading.Thread(target=execute, args=(job,), daemon=True).start()
+                    continue
+                if cancelled and not self._active:
+                    break
+                # Esperar a que termine uno o revisar el ancho de banda más tarde
+                self._condition.wait(self.admit_interval)
+
+        return jobs
+
+
+class FetchEncodePipeline:
+    """Descarga y codificación encadenadas: se descarga el episodio N+1
+    mientras se codifica el N
+
+    Las descargas usan una EpisodeQueue (límites por servidor y ancho de banda)
+    y entregan a una cola de codificación atendida por encode_workers hilos.
+    Los episodios descargados pendientes de codificar están acotados por
+    max_prefetch y por el presupuesto de disco (disk_budget en bytes, 0 = sin límite).
+    """
+
+    def __init__(self, fetch_queue: EpisodeQueue, encode_workers: int = 1,
+                 max_prefetch: int = 2, disk_budget: int = 0):
+        self.fetch_queue = fetch_queue
+        self.encode_workers = max(int(encode_workers), 1)
+        self.max_prefetch = max(int(max_prefetch), 0)
+        self.disk_budget = disk_budget
+        self._condition = threading.Condition()
+        self._in_pipeline = 0
+        self._fetching = 0
+        self._held_bytes = 0
+        self._fetched_count = 0
+        self._fetched_total = 0
+
+    @property
+    def held_bytes(self) -> int:
+        """Bytes descargados que aún esperan (o están en) codificación"""
+        with self._condition:
+            return self._held_bytes
+
+    def _has_room(self) -> bool:
+        if self._in_pipeline == 0:
+            return True
+        if self._in_pipeline >= self.encode_workers + self.max_prefetch:
+            return False
+        if not self.disk_budget:
+            return True
+        # Reservar para las descargas en curso el tamaño medio de las anteriores
+        average = self._fetched_total / self._fetched_count if self._fetched_count else 0
+        return self._held_bytes + (self._fetching + 1) * average < self.disk_budget
+
+    def _acquire(self, cancel_token) -> bool:
+        with self._condition:
+            while not self._has_room():
+                if cancel_token is not None and cancel_token.is_cancelled:
+                    return False
+                self._condition.wait(0.2)
+            self._in_pipeline += 1
+            self._fetching += 1
+            return True
+
+    def _fetched(self, byte_count: int):
+        with self._condition:
+            self._fetching -= 1
+            self._held_bytes += byte_count
+            self._fetched_count += 1
+            self._fetched_total += byte_count
+
+    def _release(self, byte_count: int = 0, fetching: bool = False):
+        with self._condition:
+            self._in_pipeline -= 1
+            if fetching:
+                self._fetching -= 1
+            self._held_bytes -= byte_count
+            self._condition.notify_all()
+
+    def run(self, jobs: List[EpisodeJob], fetch: Callable[[EpisodeJob], Any],
+            encode: Callable[[EpisodeJob, Any], bool], cancel_token=None,
+            on_finished: Optional[Callable[[EpisodeJob], None]] = None) -> List[EpisodeJob]:
+        """Procesa los episodios; fetch retorna el material descargado (o None si falla)
+
+        El material puede indicar su tamaño en disco con el atributo/clave 'bytes'.
+        """
+        ready = queue.Queue()
+
+        def finish(job: EpisodeJob, success: bool):
+            job.success = success
+            if on_finished:
+                on_finished(job)
+
+        def fetch_stage(fetch_job: EpisodeJob) -> bool:
+            job = fetch_job.payload
+            if not self._acquire(cancel_token):
+                return False
+            try:
+                source = fetch(job)
+            except Exception:
+                source = None
+            if source is None:
+                self._release(fetching=True)
+                finish(job, False)
+                return False
+            byte_count = source.get('bytes', 0) if isinstance(source, dict) else getattr(source, 'bytes', 0)
+            self._fetched(byte_count)
+            ready.put((job, source, byte_count))
+            return True
+
+        def encode_stage():
+            while True:
+                item = ready.get()
+                if item is None:
+                    return
+                job, source, byte_count = item
+                try:
+                    success = bool(encode(job, source))
+                except Exception:
+                    success = False
+                finally:
+                    self._release(byte_count)
+                finish(job, success)
+
+        encoders = [threading.Thread(target=encode_stage, daemon=True) for _ in range(self.encode_workers)]
+        for encoder in encoders:
+            encoder.start()
+
+        fetch_jobs = [EpisodeJob(job.index, job.url, job) for job in jobs]
+        self.fetch_queue.run(fetch_jobs, fetch_stage, cancel_token)
+
+        for _ in encoders:
+            ready.put(None)
+        for encoder in encoders:
+            encoder.join()
+        return jobs
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verificación de faststart en archivos MP4
+Lee los átomos de primer nivel para saber si el índice (moov) está antes
+de los datos (mdat), necesario para empezar a reproducir sin descargar el final
+"""
+
+import sys
+import struct
+import argparse
+from pathlib import Path
+from typing import List, Tuple, Optional, Iterator
+
+MP4_EXTENSIONS = ('.mp4', '.m4v', '.mov')
+
+# Estados de un archivo
+FASTSTART_OK = "faststart"
+FASTSTART_MISSING = "sin faststart"
+FASTSTART_FRAGMENTED = "fragmentado"
+FASTSTART_INVALID = "no válido"
+
+
+def iter_top_level_atoms(file_path: str) -> Iterator[Tuple[str, int, int]]:
+    """Recorre los átomos de primer nivel: (tipo, posición, tamaño)"""
+    with open(file_path, 'rb') as f:
+        f.seek(0, 2)
+        file_size = f.tell()
+        offset = 0
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            size, atom_type = struct.unpack('>I4s', f.read(8))
+            if size == 1:
+                size = struct.unpack('>Q', f.read(8))[0]
+            elif size == 0:
+                size = file_size - offset
+            if size < 8:
+                raise ValueError(f"Átomo con tamaño no válido en {offset}")
+            yield atom_type.decode('latin-1'), offset, size
+            offset += size
+
+
+def check_faststart(file_path: str) -> str:
+    """Estado de faststart de un archivo MP4"""
+    try:
+        atom_types = [atom_type for atom_type, _, _ in iter_top_level_atoms(file_path)]
+    except (OSError, ValueError, struct.error):
+        return FASTSTART_INVALID
+
+    if 'moov' not in atom_types:
+        return FASTSTART_INVALID
+    if 'moof' in atom_types:
+        return FASTSTART_FRAGMENTED
+    if 'mdat' in atom_types and atom_types.index('moov') > atom_types.index('mdat'):
+        return FASTSTART_MISSING
+    return FASTSTART_OK
+
+
+def scan_library(folder: str) -> List[Tuple[Path, str]]:
+    """Revisa todos los MP4 de una carpeta (recursivamente)"""
+    results = []
+    for path in sorted(Path(folder).rglob('*')):
+        if path.is_file() and path.suffix.lower() in MP4_EXTENSIONS:
+            results.append((path, check_faststart(str(path))))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Comando: python -m app.faststart <carpeta> [--fix]"""
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+    parser = argparse.ArgumentParser(description="Verifica qué MP4 de la biblioteca no tienen faststart")
+    parser.add_argument("folder", help="Carpeta de la biblioteca")
+    parser.add_argument("--fix", action="store_true",
+                        help="Reescribir con faststart los archivos que no lo tienen (copia sin recodificar)")
+    args = parser.parse_args(argv)
+
+    results = scan_library(args.folder)
+    pending = [(path, status) for path, status in results
+               if status in (FASTSTART_MISSING, FASTSTART_FRAGMENTED)]
+    for path, status in results:
+        icon = "✅" if status == FASTSTART_OK else "⚠️" if status != FASTSTART_INVALID else "❌"
+        print(f"{icon} {status:14} {path}")
+    print(f"\n📊 {len(results)} archivos MP4, {len(pending)} sin faststart")
+
+    if args.fix and pending:
+        from app.utils import FFmpegProcessor
+        ffmpeg = FFmpegProcessor()
+        if not ffmpeg.is_available():
+            print("❌ FFmpeg no está disponible")
+            return 1
+        for path, _ in pending:
+            ok = ffmpeg.finalize_output(str(path), str(path))
+            print(f"{'✅' if ok else '❌'} {path.name}")
+
+    return 0 if not pending or args.fix else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Descargador nativo de HLS (M3U8)
+Analiza listas de reproducción y descarga los segmentos en paralelo
+sobre conexiones reutilizadas, dejando una lista local lista para FFmpeg
+"""
+
+import io
+import re
+import time
+import shutil
+from pathlib import Path
+from itertools import islice
+from collections import deque
+from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Callable, Tuple, Union
+
+import requests
+
+from app.http_client import get_http_client
+from app.segment_cache import link_or_copy
+
+ATTRIBUTE_PATTERN = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (SeriesOrganizer HLS)'
+}
+
+
+class HLSError(Exception):
+    """Error al analizar o descargar una lista HLS"""
+
+
+class HLSCancelled(HLSError):
+    """La descarga fue cancelada"""
+
+
+def parse_attributes(value: str) -> Dict[str, str]:
+    """Analiza una lista de atributos HLS (CLAVE=valor,CLAVE="valor")"""
+    return {key: val.strip('"') for key, val in ATTRIBUTE_PATTERN.findall(value)}
+
+
+def parse_byte_range(value: str, previous_end: int = 0) -> Tuple[int, int]:
+    """Analiza un rango de bytes '<longitud>[@<inicio>]' -> (longitud, inicio)"""
+    if '@' in value:
+        length, offset = value.split('@', 1)
+        return int(length), int(offset)
+    return int(value), previous_end
+
+
+class HLSKey:
+    """Clave de cifrado (EXT-X-KEY) de uno o varios segmentos"""
+
+    def __init__(self, method: str, uri: str = None, iv: str = None):
+        self.method = method
+        self.uri = uri
+        self.iv = iv
+
+    @property
+    def is_encrypted(self) -> bool:
+        return self.method not in ("NONE", "")
+
+
+class HLSSegment:
+    """Segmento de una lista de medios"""
+
+    def __init__(self, uri: str, duration: float = 0.0, sequence: int = 0,
+                 byte_range: Optional[Tuple[int, int]] = None, key: Optional[HLSKey] = None,
+                 discontinuity: bool = False):
+        self.uri = uri
+        self.duration = duration
+        self.sequence = sequence
+        self.byte_range = byte_range
+        self.key = key
+        self.discontinuity = discontinuity
+
+    @property
+    def range_header(self) -> Optional[str]:
+        """Cabecera HTTP Range del segmento, si usa EXT-X-BYTERANGE"""
+        if not self.byte_range:
+            return None
+        length, offset = self.byte_range
+        return f"bytes={offset}-{offset + length - 1}"
+
+    @property
+    def extension(self) -> str:
+        suffix = Path(urlparse(self.uri).path).suffix.lower()
+        return suffix if suffix in ('.ts', '.m4s', '.mp4', '.aac', '.m4a', '.vtt') else '.ts'
+
+
+class MediaPlaylist:
+    """Lista de medios HLS (segmentos de una sola variante)"""
+
+    def __init__(self, url: str = ""):
+        self.url = url
+        self.version = 3
+        self.target_duration = 0
+        self.media_sequence = 0
+        self.segments: List[HLSSegment] = []
+        self.init_segment: Optional[HLSSegment] = None
+        self.ended = False
+        # Variante elegida (y todas las disponibles) si la lista proviene de una lista maestra
+        self.variant: Optional['HLSVariant'] = None
+        self.variants: List['HLSVariant'] = []
+
+    @property
+    def total_duration(self) -> float:
+        return sum(segment.duration for segment in self.segments)
+
+    @property
+    def is_encrypted(self) -> bool:
+        return any(s.key and s.key.is_encrypted for s in self.segments)
+
+
+class HLSVariant:
+    """Variante de una lista maestra (EXT-X-STREAM-INF)"""
+
+    def __init__(self, uri: str, bandwidth: int = 0, resolution: Optional[Tuple[int, int]] = None,
+                 codecs: str = ""):
+        self.uri = uri
+        self.bandwidth = bandwidth
+        self.resolution = resolution
+        self.codecs = codecs
+
+    @property
+    def height(self) -> int:
+        return self.resolution[1] if self.resolution else 0
+
+
+class MasterPlaylist:
+    """Lista maestra HLS con varias variantes"""
+
+    def __init__(self, url: str = ""):
+        self.url = url
+        self.variants: List[HLSVariant] = []
+
+
+def parse_playlist(text: str, base_url: str = "") -> Union[MediaPlaylist, MasterPlaylist]:
+    """Analiza el texto de una lista M3U8 (maestra o de medios)"""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines or not lines[0].startswith('#EXTM3U'):
+        raise HLSError("La respuesta no es una lista M3U8 válida")
+
+    if any(line.startswith('#EXT-X-STREAM-INF') for line in lines):
+        return _parse_master(lines, base_url)
+    return _parse_media(lines, base_url)
+
+
+def _parse_master(lines: List[str], base_url: str) -> MasterPlaylist:
+    playlist = MasterPlaylist(base_url)
+    pending: Optional[Dict[str, str]] = None
+    for line in lines:
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            pending = parse_attributes(line.split(':', 1)[1])
+        elif not line.startswith('#') and pending is not None:
+            resolution = None
+            if 'RESOLUTION' in pending and 'x' in pending['RESOLUTION']:
+                width, height = pending['RESOLUTION'].lower().split('x', 1)
+                resolution = (int(width), int(height))
+            playlist.variants.append(HLSVariant(
+                urljoin(base_url, line),
+                int(pending.get('BANDWIDTH', 0) or 0),
+                resolution,
+                pending.get('CODECS', '')
+            ))
+            pending = None
+    return playlist
+
+
+def _parse_media(lines: List[str], base_url: str) -> MediaPlaylist:
+    playlist = MediaPlaylist(base_url)
+    current_key: Optional[HLSKey] = None
+    duration = 0.0
+    byte_range: Optional[Tuple[int, int]] = None
+    discontinuity = False
+    range_ends: Dict[str, int] = {}
+    sequence = 0
+
+    for line in lines:
+        if line.startswith('#EXT-X-VERSION:'):
+            playlist.version = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-TARGETDURATION:'):
+            playlist.target_duration = int(float(line.split(':', 1)[1]))
+        elif line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            playlist.media_sequence = int(line.split(':', 1)[1])
+            sequence = playlist.media_sequence
+        elif line.startswith('#EXT-X-KEY:'):
+            attributes = parse_attributes(line.split(':', 1)[1])
+            uri = attributes.get('URI')
+            current_key = HLSKey(attributes.get('METHOD', 'NONE'),
+                                 urljoin(base_url, uri) if uri else None,
+                                 attributes.get('IV'))
+        elif line.startswith('#EXT-X-MAP:'):
+            attributes = parse_attributes(line.split(':', 1)[1])
+            uri = urljoin(base_url, attributes['URI'])
+            map_range = None
+            if 'BYTERANGE' in attributes:
+                map_range = parse_byte_range(attributes['BYTERANGE'])
+            playlist.init_segment = HLSSegment(uri, byte_range=map_range)
+        elif line.startswith('#EXTINF:'):
+            duration = float(line.split(':', 1)[1].split(',', 1)[0])
+        elif line.startswith('#EXT-X-BYTERANGE:'):
+            byte_range = line.split(':', 1)[1]
+        elif line.startswith('#EXT-X-DISCONTINUITY') and not line.startswith('#EXT-X-DISCONTINUITY-'):
+            discontinuity = True
+        elif line.startswith('#EXT-X-ENDLIST'):
+            playlist.ended = True
+        elif not line.startswith('#'):
+            uri = urljoin(base_url, line)
+            parsed_range = None
+            if byte_range is not None:
+                parsed_range = parse_byte_range(byte_range, range_ends.get(uri, 0))
+                range_ends[uri] = parsed_range[1] + parsed_range[0]
+            playlist.segments.append(HLSSegment(uri, duration, sequence, parsed_range,
+                                                current_key, discontinuity))
+            sequence += 1
+            duration = 0.0
+            byte_range = None
+            discontinuity = False
+
+    return playlist
+
+
+def select_variant(variants: List[HLSVariant], target_height: Optional[int] = None) -> HLSVariant:
+    """Elige la variante que mejor coincide con la altura pedida
+
+    Coincidencia exacta -> esa variante; si no, la menor resolución superior
+    (menos bytes y menos trabajo de escalado); si todas son menores, la mayor.
+    Sin altura objetivo se elige la de mayor ancho de banda.
+    """
+    if not variants:
+        raise HLSError("La lista maestra no contiene variantes")
+    if not target_height:
+        return max(variants, key=lambda v: (v.bandwidth, v.height))
+
+    exact = [v for v in variants if v.height == target_height]
+    if exact:
+        return max(exact, key=lambda v: v.bandwidth)
+    above = [v for v in variants if v.height > target_height]
+    if above:
+        return min(above, key=lambda v: (v.height, -v.bandwidth))
+    return max(variants, key=lambda v: (v.height, v.bandwidth))
+
+
+def is_hls_url(url: str) -> bool:
+    """Indica si una URL apunta a una lista M3U8"""
+    return urlparse(url).path.lower().endswith(('.m3u8', '.m3u'))
+
+
+class HLSDownloader:
+    """Descarga segmentos HLS en paralelo con un número acotado en vuelo"""
+
+    def __init__(self, session: requests.Session = None, max_workers: int = 8,
+                 timeout: float = 30, retries: int = 3, chunk_size: int = 64 * 1024,
+                 cache=None, throttle=None):
+        self.max_workers = max(int(max_workers), 1)
+        # Cliente HTTP compartido (app.http_client): conexiones reutilizadas entre episodios
+        self.session = session or get_http_client()
+        self.timeout = timeout
+        self.retries = retries
+        self.chunk_size = chunk_size
+        # Caché de segmentos opcional (SegmentCache) para reanudar descargas
+        self.cache = cache
+        self.cache_hits = 0
+        # Limitador de ancho de banda opcional (EpisodeThrottle o TokenBucket)
+        self.throttle = throttle
+
+    def fetch_text(self, url: str) -> str:
+        """Descarga una lista de reproducción"""
+        response = self.session.get(url, headers=DEFAULT_HEADERS, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+    def fetch_playlist(self, url: str) -> Union[MediaPlaylist, MasterPlaylist]:
+        """Descarga y analiza una lista de reproducción"""
+        return parse_playlist(self.fetch_text(url), url)
+
+    def fetch_media_playlist(self, url: str, target_height: Optional[int] = None) -> MediaPlaylist:
+        """Obtiene la lista de medios, resolviendo una lista maestra si hace falta"""
+        playlist = self.fetch_playlist(url)
+        if isinstance(playlist, MasterPlaylist):
+            master = playlist
+            variant = select_variant(master.variants, target_height)
+            playlist = self.fetch_playlist(variant.uri)
+            if isinstance(playlist, MasterPlaylist):
+                raise HLSError("Lista maestra anidada no soportada")
+            playlist.variant = variant
+            playlist.variants = master.variants
+        return playlist
+
+    def download(self, url: str, work_dir: Path,
+                 progress_callback: Optional[Callable[[int, int, int], None]] = None,
+                 cancel_token=None,
+                 playlist: Optional[MediaPlaylist] = None) -> Path:
+        """Descarga todos los segmentos y genera una lista local para FFmpeg
+
+        progress_callback recibe (segmentos completados, total, bytes descargados).
+        Retorna la ruta de la lista local (index.m3u8).
+        """
+        work_dir = Path(work_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        playlist = playlist or self.fetch_media_playlist(url)
+        if not playlist.segments:
+            raise HLSError("La lista no contiene segmentos")
+
+        key_files = self._download_keys(playlist, work_dir, cancel_token)
+
+        init_name = None
+        if playlist.init_segment:
+            init_name = f"init{playlist.init_segment.extension}"
+            self._fetch_segment(playlist.init_segment, work_dir / init_name, cancel_token)
+
+        names = [f"seg_{i:05d}{segment.extension}" for i, segment in enumerate(playlist.segments)]
+        total = len(playlist.segments)
+        completed = 0
+        downloaded_bytes = 0
+        self.cache_hits = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._fetch_segment, segment, work_dir / name, cancel_token)
+                       for segment, name in zip(playlist.segments, names)]
+            try:
+                for future in as_completed(futures):
+                    size, cached = future.result()
+                    completed += 1
+                    if cached:
+                        self.cache_hits += 1
+                    else:
+                        downloaded_bytes += size
+                    if progress_callback:
+                        progress_callback(completed, total, downloaded_bytes)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        if self.cache:
+            self.cache.evict()
+        return self._write_local_playlist(playlist, work_dir, names, key_files, init_name)
+
+    def can_stream(self, playlist: MediaPlaylist) -> bool:
+        """Indica si la lista puede enviarse como flujo MPEG-TS continuo"""
+        return (not playlist.is_encrypted and playlist.init_segment is None
+                and all(segment.extension == '.ts' for segment in playlist.segments))
+
+    def stream(self, playlist: MediaPlaylist, sink,
+               progress_callback: Optional[Callable[[int, int, int], None]] = None,
+               cancel_token=None, max_buffered: Optional[int] = None) -> int:
+        """Escribe los segmentos en orden en un flujo (p. ej. stdin de FFmpeg) sin archivos temporales
+
+        Los segmentos se descargan en paralelo; como máximo max_buffered
+        (por defecto el doble de conexiones) están en vuelo o esperando su
+        turno en memoria. Retorna los bytes escritos.
+        """
+        if not self.can_stream(playlist):
+            raise HLSError("La lista (cifrada o fMP4) no se puede transmitir como MPEG-TS")
+        max_buffered = max(max_buffered or self.max_workers * 2, 1)
+        segments = iter(playlist.segments)
+        window = deque()
+        total = len(playlist.segments)
+        completed = 0
+        written = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            def fill():
+                for segment in islice(segments, max_buffered - len(window)):
+                    window.append(executor.submit(self._read_segment, segment, cancel_token))
+
+            try:
+                fill()
+                while window:
+                    data = window.popleft().result()
+                    fill()
+                    try:
+                        sink.write(data)
+                    except (BrokenPipeError, ValueError, OSError) as e:
+                        if cancel_token and cancel_token.is_cancelled:
+                            raise HLSCancelled("Descarga cancelada")
+                        raise HLSError(f"El receptor del flujo se cerró: {e}")
+                    written += len(data)
+                    completed += 1
+                    if progress_callback:
+                        progress_callback(completed, total, written)
+            except BaseException:
+                for future in window:
+                    future.cancel()
+                raise
+        return written
+
+    def _fetch_segment(self, segment: HLSSegment, destination: Path, cancel_token=None) -> Tuple[int, bool]:
+        """Obtiene un segmento desde la caché o la red; retorna (bytes, desde caché)"""
+        if self.cache:
+            cached = self.cache.get(segment.uri, segment.byte_range)
+            if cached:
+                link_or_copy(cached, destination)
+                return destination.stat().st_size, True
+
+        size = self._download_segment(segment, destination, cancel_token)
+        if self.cache:
+            self.cache.put(segment.uri, segment.byte_range, destination)
+        return size, False
+
+    def _download_keys(self, playlist: MediaPlaylist, work_dir: Path, cancel_token) -> Dict[str, str]:
+        """Descarga las claves AES-128 (una vez por URI)"""
+        key_files: Dict[str, str] = {}
+        for segment in playlist.segments:
+            key = segment.key
+            if not key or not key.is_encrypted or not key.uri or key.uri in key_files:
+                continue
+            if key.method != "AES-128":
+                raise HLSError(f"Método de cifrado no soportado: {key.method}")
+            name = f"key_{len(key_files)}.bin"
+            self._download_segment(HLSSegment(key.uri), work_dir / name, cancel_token)
+            key_files[key.uri] = name
+        return key_files
+
+    def _download_segment(self, segment: HLSSegment, destination: Path, cancel_token=None) -> int:
+        """Descarga un segmento (o rango) a disco; retorna los bytes escritos"""
+        temp_path = destination.with_name(destination.name + '.part')
+        try:
+            with open(temp_path, 'wb') as f:
+                size = self._transfer_segment(segment, f, cancel_token)
+            temp_path.replace(destination)
+            return size
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+    def _read_segment(self, segment: HLSSegment, cancel_token=None) -> bytes:
+        """Obtiene un segmento en memoria (desde la caché si está disponible)"""
+        if self.cache:
+            cached = self.cache.get(segment.uri, segment.byte_range)
+            if cached:
+                try:
+                    return cached.read_bytes()
+                except OSError:
+                    pass
+        buffer = io.BytesIO()
+        self._transfer_segment(segment, buffer, cancel_token)
+        return buffer.getvalue()
+
+    def _transfer_segment(self, segment: HLSSegment, sink, cancel_token=None) -> int:
+        """Descarga un segmento (o rango) con reintentos en un archivo o buffer; retorna los bytes"""
+        headers = dict(DEFAULT_HEADERS)
+        if hasattr(self.session, "ensure_pool"):
+            # Una conexión persistente por descarga simultánea hacia el servidor de segmentos
+            self.session.ensure_pool(segment.uri, self.max_workers)
+        if segment.range_header:
+            headers['Range'] = segment.range_header
+
+        last_error = None
+        for attempt in range(self.retries):
+            if cancel_token and cancel_token.is_cancelled:
+                raise HLSCancelled("Descarga cancelada")
+            sink.seek(0)
+            sink.truncate()
+            try:
+                size = 0
+                with self.session.get(segment.uri, headers=headers, timeout=self.timeout,
+                                      stream=True) as response:
+                    response.raise_for_status()
+                    if segment.byte_range and response.status_code != 206:
+                        raise HLSError("El servidor no respetó el rango de bytes solicitado")
+                    expected = response.headers.get('Content-Length')
+                    for chunk in response.iter_content(self.chunk_size):
+                        if cancel_token and cancel_token.is_cancelled:
+                            raise HLSCancelled("Descarga cancelada")
+                        if self.throttle and not self.throttle.consume(len(chunk), cancel_token):
+                            raise HLSCancelled("Descarga cancelada")
+                        sink.write(chunk)
+                        size += len(chunk)
+                if segment.byte_range and size != segment.byte_range[0]:
+                    raise HLSError(f"Tamaño inesperado del rango: {size} bytes")
+                if expected and expected.isdigit() and 'Content-Encoding' not in response.headers \
+                        and size != int(expected):
+                    raise HLSError(f"Segmento incompleto: {size} de {expected} bytes")
+                return size
+            except HLSCancelled:
+                raise
+            except (requests.RequestException, HLSError, OSError) as e:
+                last_error = e
+                time.sleep(0.5 * (2 ** attempt))
+
+        raise HLSError(f"No se pudo descargar {segment.uri}: {last_error}")
+
+    @staticmethod
+    def _write_local_playlist(playlist: MediaPlaylist, work_dir: Path, names: List[str],
+                              key_files: Dict[str, str], init_name: Optional[str]) -> Path:
+        """Escribe una lista M3U8 que apunta a los segmentos descargados"""
+        lines = [
+            "#EXTM3U",
+            f"#EXT-X-VERSION:{max(playlist.version, 3)}",
+            f"#EXT-X-TARGETDURATION:{playlist.target_duration or int(max(s.duration for s in playlist.segments)) + 1}",
+            f"#EXT-X-MEDIA-SEQUENCE:{playlist.media_sequence}",
+            "#EXT-X-PLAYLIST-TYPE:VOD"
+        ]
+        if init_name:
+            lines.append(f'#EXT-X-MAP:URI="{init_name}"')
+
+        current_key = None
+        for segment, name in zip(playlist.segments, names):
+            if segment.key is not current_key:
+                current_key = segment.key
+                if current_key and current_key.is_encrypted:
+                    key_line = f'#EXT-X-KEY:METHOD={current_key.method},URI="{key_files[current_key.uri]}"'
+                    if current_key.iv:
+                        key_line += f",IV={current_key.iv}"
+                    lines.append(key_line)
+                else:
+                    lines.append("#EXT-X-KEY:METHOD=NONE")
+            if segment.discontinuity:
+                lines.append("#EXT-X-DISCONTINUITY")
+            lines.append(f"#EXTINF:{segment.duration:.6f},")
+            lines.append(name)
+        lines.append("#EXT-X-ENDLIST")
+
+        local_playlist = work_dir / "index.m3u8"
+        local_playlist.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        return local_playlist
+
+
+def remove_work_dir(work_dir: Path):
+    """Elimina la carpeta temporal de una descarga"""
+    shutil.rmtree(work_dir, ignore_errors=True)
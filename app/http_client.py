@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cliente HTTP compartido
+Una sola sesión con conexiones persistentes (un pool por servidor, de tamaño
+configurable), tiempos de espera por defecto, reintentos ante fallos de
+conexión y errores 5xx, compresión gzip y métricas de latencia y
+rendimiento por servidor para localizar los servicios lentos
+"""
+
+import time
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (5.0, 30.0)  # (conexión, lectura) en segundos
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 2
+RETRY_BACKOFF = 0.3
+# Los 429 los gestiona el limitador de cada fuente (app.rate_limit)
+RETRY_STATUSES = (500, 502, 503, 504)
+# Conexiones que se mantienen abiertas por servidor
+HOST_POOL_SIZES = {
+    "api.jikan.moe": 3,
+    "api.themoviedb.org": 8,
+    "image.tmdb.org": 4,
+    "cdn.myanimelist.net": 4
+}
+DEFAULT_HEADERS = {
+    'User-Agent': 'SeriesOrganizer/1.0',
+    'Accept-Encoding': 'gzip, deflate'
+}
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class HostMetrics:
+    """Peticiones, errores, bytes, latencia y tiempo de transferencia por servidor"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, float]] = {}
+
+    def _host(self, host: str) -> Dict[str, float]:
+        # Se llama con el bloqueo tomado
+        return self._hosts.setdefault(host, {"requests": 0, "errors": 0, "bytes": 0, "latency": 0.0,
+                                             "max_latency": 0.0, "transfer": 0.0})
+
+    def record(self, host: str, latency: float, error: bool = False):
+        """Una respuesta (o un fallo) con su tiempo hasta recibir las cabeceras"""
+        with self._lock:
+            metrics = self._host(host)
+            metrics["requests"] += 1
+            metrics["errors"] += int(error)
+            metrics["latency"] += latency
+            metrics["max_latency"] = max(metrics["max_latency"], latency)
+
+    def add_transfer(self, host: str, size: int, seconds: float):
+        """Bytes recibidos en el cuerpo y el tiempo que tardaron"""
+        with self._lock:
+            metrics = self._host(host)
+            metrics["bytes"] += size
+            metrics["transfer"] += seconds
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Por servidor: requests, errors, bytes, avg_latency, max_latency y throughput (bytes/s)"""
+        with self._lock:
+            hosts = {host: dict(metrics) for host, metrics in self._hosts.items()}
+        result = {}
+        for host, metrics in hosts.items():
+            result[host] = {
+                "requests": metrics["requests"],
+                "errors": metrics["errors"],
+                "bytes": metrics["bytes"],
+                "avg_latency": metrics["latency"] / metrics["requests"] if metrics["requests"] else 0.0,
+                "max_latency": metrics["max_latency"],
+                "throughput": metrics["bytes"] / metrics["transfer"] if metrics["transfer"] > 0 else 0.0
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._hosts = {}
+
+
+class HttpClient(requests.Session):
+    """Sesión HTTP con pools por servidor, tiempos de espera, reintentos y métricas
+
+    Se usa como un requests.Session normal (get, head, stream=True...). Las
+    respuestas en flujo cuentan sus bytes a medida que se leen con
+    iter_content.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, timeout: Timeout = DEFAULT_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES, host_pool_sizes: Optional[Dict[str, int]] = None):
+        super().__init__()
+        self.timeout = timeout
+        self.retries = retries
+        self.pool_size = pool_size
+        self.metrics = HostMetrics()
+        self._pools: Dict[str, int] = {}
+        self._pools_lock = threading.Lock()
+        self.headers.update(DEFAULT_HEADERS)
+        adapter = self._make_adapter(pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        for host, size in (host_pool_sizes or {}).items():
+            self.set_host_pool(host, size)
+
+    def _make_adapter(self, size: int) -> HTTPAdapter:
+        # Sin reintentos de lectura: un tiempo agotado se propaga como requests.Timeout
+        # y las descargas en flujo (segmentos) ya reintentan por su cuenta
+        retry = Retry(total=self.retries, connect=self.retries, read=False,
+                      status=self.retries, status_forcelist=RETRY_STATUSES,
+                      backoff_factor=RETRY_BACKOFF, raise_on_status=False,
+                      respect_retry_after_header=False)
+        return HTTPAdapter(pool_connections=DEFAULT_POOL_SIZE, pool_maxsize=size, max_retries=retry)
+
+    def set_host_pool(self, host: str, size: int):
+        """Fija las conexiones persistentes de un servidor ('api.jikan.moe' o una URL)"""
+        parsed = urlparse(host if "://" in host else f"//{host}")
+        schemes = [parsed.scheme] if parsed.scheme else ["http", "https"]
+        with self._pools_lock:
+            self._pools[parsed.netloc] = size
+            for scheme in schemes:
+                self.mount(f"{scheme}://{parsed.netloc}/", self._make_adapter(size))
+
+    def ensure_pool(self, url: str, size: int):
+        """Amplía el pool del servidor de la URL si tiene menos de size conexiones"""
+        host = urlparse(url).netloc
+        with self._pools_lock:
+            current = self._pools.get(host, self.pool_size)
+        if size > current:
+            self.set_host_pool(f"{urlparse(url).scheme}://{host}", size)
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlparse(url).netloc
+        started = time.monotonic()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            self.metrics.record(host, time.monotonic() - started, error=True)
+            raise
+
+        self.metrics.record(host, response.elapsed.total_seconds(), error=response.status_code >= 400)
+        if kwargs.get("stream"):
+            self._count_stream(response, host)
+        else:
+            body_seconds = max(time.monotonic() - started - response.elapsed.total_seconds(), 0.0)
+            self.metrics.add_transfer(host, len(response.content), body_seconds)
+        return response
+
+    def _count_stream(self, response: requests.Response, host: str):
+        iter_content = response.iter_content
+        metrics = self.metrics
+
+        def counted(*args, **kwargs):
+            size, started = 0, time.monotonic()
+            try:
+                for chunk in iter_content(*args, **kwargs):
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                metrics.add_transfer(host, size, time.monotonic() - started)
+
+        response.iter_content = counted
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return self.metrics.stats()
+
+    def slowest_hosts(self, count: int = 3) -> List[Tuple[str, Dict[str, float]]]:
+        """Servidores con mayor latencia media"""
+        return sorted(self.stats().items(), key=lambda item: item[1]["avg_latency"], reverse=True)[:count]
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client(config_manager=None) -> HttpClient:
+    """Cliente compartido por toda la aplicación (la configuración se lee al crearlo)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            network = config_manager.get_network_config() if config_manager else {}
+            host_pool_sizes = dict(HOST_POOL_SIZES)
+            host_pool_sizes.update(network.get("host_pool_sizes", {}))
+            _client = HttpClient(
+                pool_size=network.get("pool_size", DEFAULT_POOL_SIZE),
+                timeout=(network.get("connect_timeout_seconds", DEFAULT_TIMEOUT[0]),
+                         network.get("read_timeout_seconds", DEFAULT_TIMEOUT[1])),
+                retries=network.get("retries", DEFAULT_RETRIES),
+                host_pool_sizes=host_pool_sizes
+            )
+        return _client
+
+
+def format_host_stats(stats: Dict[str, Dict[str, float]]) -> List[str]:
+    """Líneas legibles de las métricas por servidor, de más lento a más rápido"""
+    lines = []
+    for host, metrics in sorted(stats.items(), key=lambda item: item[1]["avg_latency"], reverse=True):
+        lines.append(f"🌐 {host}: {metrics['requests']} peticiones, "
+                     f"latencia media {metrics['avg_latency'] * 1000:.0f} ms "
+                     f"(máx. {metrics['max_latency'] * 1000:.0f} ms), "
+                     f"{metrics['throughput'] / (1024 * 1024):.2f} MB/s, {metrics['errors']} errores")
+    return lines
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Identificación automática de series a partir de nombres de carpetas y archivos
+Limpia los nombres de descarga (grupos, resolución, códecs, episodios), obtiene
+títulos y año candidatos, los busca en la capa de metadatos (con caché y límite
+de peticiones) y ordena los resultados por parecido
+"""
+
+import re
+import sys
+import json
+import argparse
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+VIDEO_EXTENSIONS = {'.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v'}
+# Parecido mínimo para rellenar los metadatos sin preguntar
+DEFAULT_THRESHOLD = 0.8
+# Archivos de cada carpeta que se analizan (bastan unos pocos para votar el título)
+SAMPLE_FILES = 8
+
+# Marcas de descarga que no forman parte del título
+RELEASE_TOKENS = re.compile(
+    r'\b(?:'
+    r'\d{3,4}[pi]|4k|uhd|[hx]\.?26[45]|hevc|avc|av1|xvid|divx|10-?bits?|8-?bits?|hdr(?:10)?|dv|sdr|'
+    r'web(?:-?dl|-?rip)?|blu-?ray|bd(?:rip)?|br(?:rip)?|dvd(?:rip)?|hdtv|hdrip|remux|'
+    r'aac(?:2\.0)?|ac3|e-?ac-?3|ddp?(?:5\.1|2\.0)?|flac|opus|mp3|dts(?:-?hd)?|truehd|atmos|'
+    r'multi|dual(?:[ -]audio)?|subs?|subbed|dubbed|castellano|latino|spanish|english|vostfr|'
+    r'proper|repack|complete|batch|uncensored|internal|nf|amzn|cr|dsnp|hmax'
+    r')\b', re.IGNORECASE)
+# Desde aquí empieza la información de episodio o temporada
+EPISODE_MARKERS = re.compile(
+    r'(?:\bS\d{1,2}(?:\s*E\d{1,4})?\b|\bE\d{2,4}\b|\b\d{1,2}x\d{2,3}\b|'
+    r'\b(?:episode|episodio|ep|cap(?:itulo)?|season|temporada)\b\.?\s*\d+|\b\d+(?:st|nd|rd|th)\s+season\b|'
+    r'\s-\s*\d{1,4}\b|#\d+)', re.IGNORECASE)
+YEAR = re.compile(r'(?<!\d)(19[3-9]\d|20\d{2})(?!\d)')
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin acentos ni signos y con espacios simples"""
+    text = unicodedata.normalize("NFKD", unicodedata.normalize("NFKC", str(text)).casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def parse_release_name(name: str) -> Tuple[str, Optional[str]]:
+    """(título, año) de un nombre de carpeta o archivo de descarga
+
+    '[SubsPlease] Spy x Family - 05 (1080p) [A1B2].mkv' -> ('Spy x Family', None)
+    'Dark.2017.S01E03.1080p.WEB-DL.x264-GRP.mkv' -> ('Dark', '2017')
+    """
+    stem = name
+    is_file = Path(name).suffix.lower() in VIDEO_EXTENSIONS
+    if is_file:
+        stem = Path(name).stem
+    # Los grupos entre corchetes nunca son parte del título
+    stem = re.sub(r'\[[^\]]*\]|\{[^}]*\}', ' ', stem)
+    # Separadores de las descargas: puntos y guiones bajos
+    if stem.count(' ') < max(stem.count('.'), stem.count('_')):
+        stem = re.sub(r'(?<!\d)\.|\.(?!\d)|_', ' ', stem)
+
+    year = None
+    year_match = YEAR.search(stem)
+    # Un año al principio es parte del título ("1923", "2001 Nights")
+    if year_match and stem[:year_match.start()].strip(' ([-'):
+        year = year_match.group(1)
+        stem = stem[:year_match.start()]
+
+    marker = EPISODE_MARKERS.search(stem)
+    if marker:
+        stem = stem[:marker.start()]
+    release = RELEASE_TOKENS.search(stem)
+    if release and stem[:release.start()].strip():
+        stem = stem[:release.start()]
+    if is_file and not marker:
+        # Sin otra marca, un número final es el episodio ("Naruto Shippuden 001")
+        stem = re.sub(r'(?<=\D)\s+\d{1,4}\s*$', '', stem)
+
+    # Paréntesis vacíos o sin cerrar y separadores sobrantes
+    stem = re.sub(r'\([^)]*$|\(\s*\)', ' ', stem)
+    title = " ".join(stem.replace('(', ' ').replace(')', ' ').split()).strip(' -–_.,')
+    return title, year
+
+
+def candidate_titles(folder_name: str, file_names: Iterable[str]) -> Tuple[List[str], Optional[str]]:
+    """Títulos candidatos (más votados primero) y año más frecuente
+
+    El nombre de la carpeta cuenta doble: suele estar más limpio que los archivos.
+    """
+    votes: Counter = Counter()
+    originals: Dict[str, str] = {}
+    years: Counter = Counter()
+
+    def add(name, weight):
+        title, year = parse_release_name(name)
+        key = normalize(title)
+        if not key or key.isdigit():
+            return
+        votes[key] += weight
+        originals.setdefault(key, title)
+        if year:
+            years[year] += weight
+
+    add(folder_name, 2)
+    for file_name in list(file_names)[:SAMPLE_FILES]:
+        add(file_name, 1)
+    titles = [originals[key] for key, _ in votes.most_common()]
+    year = years.most_common(1)[0][0] if years else None
+    return titles, year
+
+
+def title_similarity(a: str, b: str) -> float:
+    """Parecido entre dos títulos (0-1): secuencia de caracteres o coincidencia de palabras"""
+    a, b = normalize(a), normalize(b)
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    ratio = SequenceMatcher(None, a, b).ratio()
+    words_a, words_b = set(a.split()), set(b.split())
+    overlap = len(words_a & words_b) / len(words_a | words_b)
+    return max(ratio, overlap)
+
+
+def result_titles(result: Dict) -> List[str]:
+    """Títulos de un resultado de TMDB o Jikan"""
+    keys = ('name', 'original_name', 'title', 'title_english')
+    return [result[key] for key in keys if result.get(key)]
+
+
+def result_year(result: Dict) -> str:
+    return str(result.get('year') or (result.get('first_air_date') or '')[:4] or '')
+
+
+def score_result(title: str, year: Optional[str], result: Dict) -> float:
+    """Confianza de que el resultado sea la serie buscada (0-1)"""
+    score = max((title_similarity(title, candidate) for candidate in result_titles(result)), default=0.0)
+    found_year = result_year(result)
+    if year and found_year:
+        # El año confirma o desmiente títulos parecidos ("Dune" 1984/2021)
+        score += 0.1 if abs(int(found_year) - int(year)) <= 1 else -0.15
+    return max(0.0, min(score, 1.0))
+
+
+class Identification:
+    """Resultado de identificar una carpeta"""
+
+    def __init__(self, folder: str, titles: List[str], year: Optional[str]):
+        self.folder = folder
+        self.titles = titles
+        self.year = year
+        self.result: Optional[Dict] = None
+        self.source: Optional[str] = None
+        self.query = titles[0] if titles else ""
+        self.score = 0.0
+        self.threshold = DEFAULT_THRESHOLD
+
+    @property
+    def confident(self) -> bool:
+        return self.result is not None and self.score >= self.threshold
+
+    @property
+    def name(self) -> str:
+        if not self.result:
+            return ""
+        return self.result.get('name') or self.result.get('title') or ""
+
+    @property
+    def summary(self) -> str:
+        if not self.result:
+            return f"❓ {self.folder}: sin resultados para '{self.query}'"
+        icon = "✅" if self.confident else "⚠️"
+        year = result_year(self.result)
+        return (f"{icon} {self.folder} → {self.name}{f' ({year})' if year else ''} "
+                f"[{self.source}:{self.result.get('id')}] {self.score:.0%}")
+
+    def to_dict(self) -> Dict:
+        return {
+            'folder': self.folder,
+            'query': self.query,
+            'year': self.year,
+            'source': self.source,
+            'score': round(self.score, 3),
+            'confident': self.confident,
+            'result': self.result
+        }
+
+
+class SeriesIdentifier:
+    """Identifica series en lote usando una función de búsqueda de metadatos
+
+    search(query, source) debe devolver resultados con el formato de
+    MetadataSearcher; la caché, el límite de peticiones y la agrupación de
+    consultas repetidas los aplica esa capa, así que varias carpetas de la
+    misma serie solo cuestan una petición.
+    """
+
+    def __init__(self, search: Callable[[str, str], List[Dict]], sources: Sequence[str] = ("tmdb",),
+                 threshold: float = DEFAULT_THRESHOLD, max_candidates: int = 2, max_workers: int = 4):
+        self.search = search
+        self.sources = list(sources)
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self.max_workers = max_workers
+
+    def identify(self, folder_name: str, file_names: Iterable[str] = ()) -> Identification:
+        """Mejor resultado para una carpeta; se detiene en la primera fuente con confianza suficiente"""
+        titles, year = candidate_titles(folder_name, file_names)
+        identification = Identification(folder_name, titles, year)
+        identification.threshold = self.threshold
+
+        for source in self.sources:
+            for title in titles[:self.max_candidates]:
+                for result in self.search(title, source) or []:
+                    score = score_result(title, year, result)
+                    if score > identification.score:
+                        identification.result = result
+                        identification.source = result.get('source', source)
+                        identification.query = title
+                        identification.score = score
+                if identification.confident:
+                    return identification
+        return identification
+
+    def identify_many(self, folders: Iterable[Tuple[str, List[str]]],
+                      on_result: Optional[Callable[[int, Identification], None]] = None,
+                      cancel_token=None) -> List[Identification]:
+        """Identifica muchas carpetas (nombre, archivos) en paralelo, conservando el orden"""
+        folders = list(folders)
+        results: List[Optional[Identification]] = [None] * len(folders)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="identify") as executor:
+            futures = {}
+            for index, (folder_name, file_names) in enumerate(folders):
+                futures[executor.submit(self._identify_unless_cancelled, folder_name, file_names,
+                                        cancel_token)] = index
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index] = future.result()
+                if on_result and results[index] is not None:
+                    on_result(index, results[index])
+        return [result for result in results if result is not None]
+
+    def _identify_unless_cancelled(self, folder_name, file_names, cancel_token):
+        if cancel_token is not None and cancel_token.is_cancelled:
+            return None
+        return self.identify(folder_name, file_names)
+
+
+def list_video_names(folder: Path, limit: int = SAMPLE_FILES) -> List[str]:
+    """Nombres de videos de una carpeta y sus subcarpetas de temporada"""
+    names = []
+    for path in sorted(folder.rglob('*')):
+        if path.is_file() and path.suffix.lower() in VIDEO_EXTENSIONS:
+            names.append(path.name)
+            if len(names) >= limit:
+                break
+    return names
+
+
+def scan_series_folders(root: str) -> List[Tuple[str, List[str]]]:
+    """Carpetas de series (primer nivel) de un directorio, con algunos de sus videos"""
+    folders = []
+    for path in sorted(Path(root).iterdir()):
+        if path.is_dir():
+            file_names = list_video_names(path)
+            if file_names:
+                folders.append((path.name, file_names))
+    return folders
+
+
+def main():
+    """Comando: python -m app.identifier <carpeta> [--source tmdb] [--threshold 0.8] [--json salida.json]"""
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from app.config import get_config_manager
+    from app.utils import MetadataSearcher
+
+    parser = argparse.ArgumentParser(description="Identifica las series de un directorio de descargas")
+    parser.add_argument("root", help="Directorio con una carpeta por serie")
+    parser.add_argument("--source", action="append", choices=["tmdb", "jikan", "offline"],
+                        help="Fuentes a consultar, en orden (por defecto las de la configuración)")
+    parser.add_argument("--threshold", type=float, help="Parecido mínimo para aceptar un resultado")
+    parser.add_argument("--json", help="Guardar los resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    config = get_config_manager()
+    searcher = MetadataSearcher(config)
+    identifier = SeriesIdentifier(
+        searcher.search,
+        args.source or config.get("metadata", "identify_sources", ["tmdb", "jikan"]),
+        args.threshold or config.get("metadata", "identify_threshold", DEFAULT_THRESHOLD))
+
+    folders = scan_series_folders(args.root)
+    print(f"📁 {len(folders)} carpetas de series en {args.root}")
+    results = identifier.identify_many(folders, lambda index, result: print(result.summary))
+    confident = sum(1 for result in results if result.confident)
+    print(f"📊 {confident}/{len(results)} identificadas con confianza")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([result.to_dict() for result in results], f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caché persistente de respuestas de metadatos (TMDB, Jikan)
+Guarda en SQLite cada respuesta por fuente + consulta normalizada o ID, con
+caducidad configurable y entrega de datos vencidos mientras se revalidan en
+segundo plano (stale-while-revalidate)
+"""
+
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DAY_SECONDS = 24 * 3600
+
+
+def normalize_query(query: Any) -> str:
+    """Consulta normalizada: sin mayúsculas, forma Unicode NFKC y espacios simples"""
+    text = unicodedata.normalize("NFKC", str(query)).casefold()
+    return " ".join(text.split())
+
+
+def make_key(source: str, kind: str, query: Any) -> str:
+    """Clave de caché: fuente, tipo de petición y consulta normalizada (o ID)"""
+    return f"{source}:{kind}:{normalize_query(query)}"
+
+
+class MetadataCache:
+    """Caché de metadatos en SQLite con caducidad y revalidación en segundo plano
+
+    - ttl: segundos durante los que una respuesta es fresca
+    - stale_ttl: segundos adicionales durante los que una respuesta vencida
+      se entrega al instante mientras se actualiza en segundo plano
+    """
+
+    def __init__(self, db_path: str, ttl: float = 7 * DAY_SECONDS, stale_ttl: float = 30 * DAY_SECONDS):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._metrics = {"hits": 0, "misses": 0, "stale_hits": 0, "revalidations": 0, "errors": 0}
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, source TEXT NOT NULL, value TEXT NOT NULL, stored_at REAL NOT NULL)")
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Respuesta guardada y su antigüedad en segundos (None si no existe)"""
+        with self._lock:
+            row = self._conn.execute("SELECT value, stored_at FROM responses WHERE key = ?",
+                                     (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0]), time.time() - row[1]
+        except ValueError:
+            return None
+
+    def put(self, key: str, value: Any):
+        """Guarda una respuesta (debe poder serializarse como JSON)"""
+        source = key.split(":", 1)[0]
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO responses (key, source, value, stored_at) "
+                               "VALUES (?, ?, ?, ?)",
+                               (key, source, json.dumps(value, ensure_ascii=False), time.time()))
+
+    def _count(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """Respuesta desde la caché o desde la red
+
+        Fresca: se entrega sin red. Vencida (dentro de stale_ttl): se entrega
+        al instante y se revalida en segundo plano. Si no hay entrada utilizable
+        se llama a fetch(); sus excepciones se propagan y no se guarda nada.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            value, age = entry
+            if age < self.ttl:
+                self._count("hits")
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._revalidate(key, fetch)
+                return value
+
+        self._count("misses")
+        value = fetch()
+        self.put(key, value)
+        return value
+
+    def _revalidate(self, key: str, fetch: Callable[[], Any]):
+        """Actualiza una entrada vencida en segundo plano (una sola vez por clave)"""
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def run():
+            try:
+                self.put(key, fetch())
+                self._count("revalidations")
+            except Exception:
+                self._count("errors")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def wait_revalidations(self, timeout: float = 10.0) -> bool:
+        """Espera a que terminen las revalidaciones en curso"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._revalidating:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de uso: aciertos, fallos, entradas vencidas servidas y tasa de acierto"""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def purge(self, max_age: Optional[float] = None) -> int:
+        """Elimina las entradas más antiguas que max_age (por defecto, las inutilizables)"""
+        limit = self.ttl + self.stale_ttl if max_age is None else max_age
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - limit,))
+        return cursor.rowcount
+
+    def clear(self) -> int:
+        """Vacía la caché; retorna las entradas eliminadas"""
+        return self.purge(-DAY_SECONDS)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_metadata_cache(config_manager) -> Optional[MetadataCache]:
+    """Caché de metadatos según la configuración (None si está desactivada)"""
+    if config_manager is None or not config_manager.get("metadata", "cache_metadata", True):
+        return None
+    ttl_days = config_manager.get("metadata", "cache_duration_days", 7)
+    stale_days = config_manager.get("metadata", "cache_stale_days", 30)
+    cache_file = config_manager.get_path("metadata", "cache_file", "metadata_cache.db")
+    return MetadataCache(str(cache_file), float(ttl_days) * DAY_SECONDS, float(stale_days) * DAY_SECONDS)
+
+
+def main():
+    """Comando: python -m app.metadata_cache [--clear | --purge]"""
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from app.config import get_config_manager
+
+    parser = argparse.ArgumentParser(description="Mantenimiento de la caché de metadatos")
+    parser.add_argument("--clear", action="store_true", help="Eliminar todas las respuestas")
+    parser.add_argument("--purge", action="store_true", help="Eliminar las respuestas ya inutilizables")
+    args = parser.parse_args()
+
+    cache = get_metadata_cache(get_config_manager())
+    if cache is None:
+        print("ℹ️ La caché de metadatos está desactivada (metadata.cache_metadata)")
+        return
+    print(f"📦 Caché: {cache.stats()['entries']} respuestas en {cache.db_path}")
+    if args.clear:
+        print(f"🧹 Eliminadas {cache.clear()} respuestas")
+    elif args.purge:
+        print(f"🧹 Eliminadas {cache.purge()} respuestas vencidas")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ Contiene las clases y estructuras de datos principales
 import os
 import re
 import json
+import shutil
 import subprocess
 from pathlib import Path
 from datetime import datetime
@@ -54,6 +55,63 @@ class VideoFile:
         video_file.episode_number = data.get('episode_number')
         return video_file
 
+class EpisodeIndex:
+    """Títulos de episodios indexados por (temporada, episodio) y por número absoluto
+    
+    Se llena una vez por temporada desde la capa de metadatos; después todas
+    las consultas son en memoria. La numeración absoluta (habitual en anime)
+    sigue el orden de las temporadas regulares, sin los especiales (temporada 0).
+    """
+    
+    def __init__(self):
+        self._titles: Dict[Tuple[int, int], str] = {}
+        self._episodes: Dict[Tuple[int, int], Dict] = {}
+        self._seasons: Dict[int, List[int]] = {}
+        self._explicit_absolute: Dict[int, Tuple[int, int]] = {}
+        self._absolute: Dict[int, Tuple[int, int]] = {}
+    
+    def add_season(self, season_number: int, episodes: List[Dict]):
+        """Agrega una temporada: episodios con 'episode_number', 'name' y opcionalmente 'absolute_number'"""
+        numbers = []
+        for episode in episodes:
+            try:
+                number = int(episode.get('episode_number'))
+            except (TypeError, ValueError):
+                continue
+            numbers.append(number)
+            self._titles[(season_number, number)] = (episode.get('name') or '').strip()
+            self._episodes[(season_number, number)] = episode
+            if episode.get('absolute_number'):
+                self._explicit_absolute[int(episode['absolute_number'])] = (season_number, number)
+        self._seasons[season_number] = sorted(numbers)
+        
+        # Numeración absoluta: correlativa por temporadas, salvo la que indique la fuente
+        self._absolute = {}
+        absolute = 0
+        for number in sorted(n for n in self._seasons if n > 0):
+            for episode_number in self._seasons[number]:
+                absolute += 1
+                self._absolute[absolute] = (number, episode_number)
+        self._absolute.update(self._explicit_absolute)
+    
+    def has_season(self, season_number: int) -> bool:
+        return season_number in self._seasons
+    
+    def title(self, season_number: int, episode_number: int) -> str:
+        """Título del episodio ('' si no se conoce)"""
+        return self._titles.get((season_number, episode_number), '')
+    
+    def episode(self, season_number: int, episode_number: int) -> Optional[Dict]:
+        """Datos completos del episodio tal como los entregó la fuente (fecha, sinopsis...)"""
+        return self._episodes.get((season_number, episode_number))
+    
+    def resolve_absolute(self, absolute_number: int) -> Optional[Tuple[int, int]]:
+        """(temporada, episodio) correspondiente a un número absoluto"""
+        return self._absolute.get(absolute_number)
+    
+    def __len__(self) -> int:
+        return len(self._titles)
+
 class SeriesMetadata:
     """Metadatos de una serie"""
     
@@ -66,6 +124,12 @@ class SeriesMetadata:
         self.start_episode = start_episode
         self.tmdb_data = None
         self.jikan_data = None
+        # Detalles completos de la fuente (precargados al buscar)
+        self.details: Optional[Dict] = None
+        # Títulos de episodios (se cargan una vez por temporada antes de procesar)
+        self.episode_index: Optional[EpisodeIndex] = None
+        # Los archivos usan numeración absoluta (anime): se traduce a temporada/episodio
+        self.absolute_numbering = False
     
     def generate_series_folder_name(self) -> str:
         """Genera el nombre de la carpeta de la serie"""
@@ -80,23 +144,30 @@ class SeriesMetadata:
         """Genera el nombre de la carpeta de temporada"""
         return f"Season {self.season.zfill(2)}"
     
+    def resolve_episode(self, episode_num: int) -> Tuple[int, int]:
+        """(temporada, episodio) de un archivo, traduciendo la numeración absoluta si procede"""
+        season_num = int(self.season) if str(self.season).isdigit() else 1
+        if self.absolute_numbering and self.episode_index:
+            return self.episode_index.resolve_absolute(episode_num) or (season_num, episode_num)
+        return season_num, episode_num
+    
     def generate_episode_name(self, episode_num: int, original_name: str) -> str:
         """Genera el nombre del episodio"""
         # Extraer extensión del archivo original
         original_path = Path(original_name)
         extension = original_path.suffix
         
+        season_num, episode_num = self.resolve_episode(episode_num)
+        
         # Formato: SeriesName - S01E01 - EpisodeTitle.ext
-        episode_name = f"{self.name} - S{self.season.zfill(2)}E{str(episode_num).zfill(2)}"
+        episode_name = f"{self.name} - S{str(season_num).zfill(2)}E{str(episode_num).zfill(2)}"
         
-        # Si hay datos de TMDB, agregar título del episodio
-        if self.tmdb_data and hasattr(self.tmdb_data, 'episodes'):
-            try:
-                episode_title = self.tmdb_data.episodes[episode_num - 1].name
-                if episode_title:
-                    episode_name += f" - {episode_title}"
-            except (IndexError, AttributeError):
-                pass
+        # Si hay títulos cargados, agregar el del episodio
+        if self.episode_index:
+            # Sin caracteres no válidos en nombres de archivo ("Parte 1: ...")
+            episode_title = re.sub(r'[<>:"/\\|?*]', '', self.episode_index.title(season_num, episode_num)).strip()
+            if episode_title:
+                episode_name += f" - {episode_title}"
         
         return episode_name + extension
 
@@ -170,6 +241,11 @@ class SeriesModel:
                 return
         
         # Buscar en PATH del sistema
+        system_ffmpeg = shutil.which('ffmpeg')
+        if system_ffmpeg:
+            self.ffmpeg_path = system_ffmpeg
+            return
+        
         try:
             result = subprocess.run(['where', 'ffmpeg'], 
                                   capture_output=True, text=True, shell=True)
@@ -218,8 +294,9 @@ class SeriesModel:
             return []
         
         try:
+            ffmpeg_file = Path(self.ffmpeg_path)
             cmd = [
-                self.ffmpeg_path.replace('ffmpeg.exe', 'ffprobe.exe'),
+                str(ffmpeg_file.with_name(ffmpeg_file.name.replace('ffmpeg', 'ffprobe'))),
                 '-v', 'quiet',
                 '-print_format', 'json',
                 '-show_streams',
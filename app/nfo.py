@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Archivos NFO para Jellyfin/Kodi (tvshow.nfo, season.nfo y uno por episodio)
+Se escriben en flujo con un generador XML (que escapa el texto) desde los
+metadatos ya cargados, en un hilo de E/S aparte a medida que termina cada
+episodio: no hay peticiones por episodio ni una pasada final en serie
+"""
+
+import os
+import copy
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait as wait_futures
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+from xml.sax.saxutils import XMLGenerator
+
+INDENT = "  "
+
+
+class NfoDocument:
+    """Escritor XML en flujo: cada elemento se escribe (escapado) al emitirlo"""
+
+    def __init__(self, stream):
+        self._xml = XMLGenerator(stream, encoding="utf-8", short_empty_elements=True)
+        self._depth = 0
+
+    def start_document(self, root: str):
+        self._xml.startDocument()
+        self.start(root)
+
+    def end_document(self, root: str):
+        self.end(root)
+        self._xml.ignorableWhitespace("\n")
+        self._xml.endDocument()
+
+    def start(self, name: str, attrs: Optional[Dict[str, str]] = None):
+        if self._depth:
+            self._newline()
+        self._xml.startElement(name, attrs or {})
+        self._depth += 1
+
+    def end(self, name: str):
+        self._depth -= 1
+        self._newline()
+        self._xml.endElement(name)
+
+    def element(self, name: str, value, attrs: Optional[Dict[str, str]] = None):
+        """Elemento de texto; los valores vacíos no se escriben"""
+        if value is None or value == "":
+            return
+        self._newline()
+        self._xml.startElement(name, attrs or {})
+        self._xml.characters(str(value))
+        self._xml.endElement(name)
+
+    def _newline(self):
+        self._xml.ignorableWhitespace("\n" + INDENT * self._depth)
+
+
+def write_nfo(path: Path, root: str, fill: Callable[[NfoDocument], None]):
+    """Escribe un NFO en un temporal de la misma carpeta y lo renombra"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            document = NfoDocument(f)
+            document.start_document(root)
+            fill(document)
+            document.end_document(root)
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
+
+def _names(items: Optional[Iterable]) -> List[str]:
+    """Nombres de géneros/cadenas ([{'name': ...}] o cadenas sueltas)"""
+    names = []
+    for item in items or []:
+        name = item.get('name') if isinstance(item, dict) else item
+        if name:
+            names.append(str(name))
+    return names
+
+
+def _year(date: Optional[str]) -> str:
+    return date[:4] if date and date[:4].isdigit() else ""
+
+
+def write_tvshow_nfo(path: Path, metadata, details: Optional[Dict] = None):
+    """tvshow.nfo con los datos de TMDB o Jikan (y sus detalles, si están cargados)"""
+    details = details or {}
+
+    def fill(doc: NfoDocument):
+        if metadata.tmdb_data:
+            data = dict(metadata.tmdb_data, **details)
+            doc.element("title", data.get('name') or metadata.name)
+            doc.element("originaltitle", data.get('original_name'))
+            doc.element("showtitle", data.get('name') or metadata.name)
+            doc.element("plot", data.get('overview'))
+            doc.element("year", _year(data.get('first_air_date')) or metadata.year)
+            doc.element("premiered", data.get('first_air_date'))
+            doc.element("status", data.get('status'))
+            doc.element("rating", data.get('vote_average'))
+            doc.element("votes", data.get('vote_count'))
+            for genre in _names(data.get('genres')):
+                doc.element("genre", genre)
+            for studio in _names(data.get('networks')):
+                doc.element("studio", studio)
+            doc.element("uniqueid", data.get('id'), {"type": "tmdb", "default": "true"})
+            doc.element("tmdbid", data.get('id'))
+        else:
+            data = dict(metadata.jikan_data or {}, **details)
+            doc.element("title", metadata.name or data.get('title'))
+            doc.element("originaltitle", data.get('title'))
+            doc.element("showtitle", metadata.name or data.get('title'))
+            doc.element("plot", data.get('synopsis'))
+            doc.element("year", data.get('year') or metadata.year)
+            doc.element("status", data.get('status'))
+            doc.element("rating", data.get('score'))
+            for genre in _names(data.get('genres')):
+                doc.element("genre", genre)
+            doc.element("uniqueid", data.get('id') or data.get('mal_id'), {"type": "mal", "default": "true"})
+
+    write_nfo(path, "tvshow", fill)
+
+
+def write_season_nfo(path: Path, metadata, season_number: int, details: Optional[Dict] = None):
+    """season.nfo; nombre, sinopsis y fecha de la temporada si vienen en los detalles de TMDB"""
+    season = next((entry for entry in (details or {}).get('seasons') or []
+                   if entry.get('season_number') == season_number), {})
+
+    def fill(doc: NfoDocument):
+        doc.element("title", season.get('name') or f"Season {season_number:02d}")
+        doc.element("showtitle", metadata.name)
+        doc.element("seasonnumber", season_number)
+        doc.element("plot", season.get('overview'))
+        doc.element("premiered", season.get('air_date'))
+        doc.element("year", _year(season.get('air_date')))
+
+    write_nfo(path, "season", fill)
+
+
+def write_episode_nfo(path: Path, show_name: str, season_number: int, episode_number: int,
+                      episode: Optional[Dict] = None):
+    """NFO de un episodio con los datos de la temporada ya cargada (EpisodeIndex)"""
+    episode = episode or {}
+
+    def fill(doc: NfoDocument):
+        doc.element("title", episode.get('name') or f"Episodio {episode_number}")
+        doc.element("showtitle", show_name)
+        doc.element("season", season_number)
+        doc.element("episode", episode_number)
+        doc.element("plot", episode.get('overview'))
+        doc.element("aired", episode.get('air_date'))
+
+    write_nfo(path, "episodedetails", fill)
+
+
+class NfoWriter:
+    """Escribe los NFO en un hilo de E/S aparte, a medida que se piden
+
+    Cada escritura toma una copia de los metadatos en el momento de pedirla,
+    así que el procesamiento sigue sin esperar al disco.
+    """
+
+    def __init__(self, on_log: Optional[Callable[[str], None]] = None):
+        self.on_log = on_log
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nfo")
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def _log(self, message: str):
+        if self.on_log:
+            self.on_log(message)
+
+    def _submit(self, path: Path, write: Callable[[], None]) -> Future:
+        def run():
+            try:
+                write()
+            except OSError as e:
+                self._log(f"❌ Error escribiendo {path.name}: {e}")
+                return None
+            with self._lock:
+                self.written += 1
+            return path
+
+        future = self._executor.submit(run)
+        with self._lock:
+            self._futures = [f for f in self._futures if not f.done()] + [future]
+        return future
+
+    def write_series(self, metadata, series_dir: Path, season_dir: Optional[Path] = None,
+                     get_details: Optional[Callable[[], Optional[Dict]]] = None) -> List[Future]:
+        """tvshow.nfo en la carpeta de la serie y season.nfo en la de la temporada
+
+        get_details se llama en el hilo de E/S (p. ej. detalles desde la caché).
+        """
+        snapshot = copy.copy(metadata)
+        season_number = int(snapshot.season) if str(snapshot.season).isdigit() else 1
+        state = {}
+
+        def details():
+            if 'details' not in state:
+                state['details'] = snapshot.details or (get_details() if get_details else None)
+            return state['details']
+
+        futures = [self._submit(series_dir / "tvshow.nfo",
+                                lambda: write_tvshow_nfo(series_dir / "tvshow.nfo", snapshot, details()))]
+        if season_dir is not None:
+            futures.append(self._submit(season_dir / "season.nfo",
+                                        lambda: write_season_nfo(season_dir / "season.nfo", snapshot,
+                                                                 season_number, details())))
+        return futures
+
+    def write_episode(self, metadata, episode_num: int, video_path: Path) -> Future:
+        """NFO junto al archivo del episodio (mismo nombre, extensión .nfo)"""
+        season_number, episode_number = metadata.resolve_episode(episode_num)
+        episode = metadata.episode_index.episode(season_number, episode_number) if metadata.episode_index else None
+        path = video_path.with_suffix(".nfo")
+        return self._submit(path, lambda: write_episode_nfo(path, metadata.name, season_number,
+                                                            episode_number, episode))
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que terminen las escrituras pendientes; False si vence el tiempo"""
+        with self._lock:
+            pending = list(self._futures)
+        _, not_done = wait_futures(pending, timeout=timeout)
+        return not not_done
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
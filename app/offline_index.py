@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice local de metadatos para buscar sin conexión
+Importa volcados JSON lines de TMDB (exportaciones diarias o respuestas
+guardadas) y de MyAnimeList en SQLite con un índice FTS5 de trigramas, que
+tolera errores de escritura y responde en milisegundos sin red. Las
+importaciones son incrementales: un volcado más nuevo solo reescribe las
+entradas que cambiaron.
+"""
+
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Fuentes del índice: los IDs de MyAnimeList son los que usa Jikan
+SOURCE_ALIASES = {"tmdb": "tmdb", "mal": "jikan", "myanimelist": "jikan", "jikan": "jikan"}
+IMPORT_BATCH_SIZE = 5000
+# Candidatos de FTS que se reordenan por similitud con la consulta
+CANDIDATE_LIMIT = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    source TEXT NOT NULL,
+    ext_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    search_text TEXT NOT NULL,
+    year TEXT NOT NULL DEFAULT '',
+    popularity REAL NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    import_id INTEGER NOT NULL,
+    UNIQUE (source, ext_id)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS series_fts USING fts5(
+    search_text, content='series', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS series_ai AFTER INSERT ON series BEGIN
+    INSERT INTO series_fts(rowid, search_text) VALUES (new.rowid, new.search_text);
+END;
+CREATE TRIGGER IF NOT EXISTS series_ad AFTER DELETE ON series BEGIN
+    INSERT INTO series_fts(series_fts, rowid, search_text) VALUES ('delete', old.rowid, old.search_text);
+END;
+CREATE TRIGGER IF NOT EXISTS series_au AFTER UPDATE OF search_text ON series BEGIN
+    INSERT INTO series_fts(series_fts, rowid, search_text) VALUES ('delete', old.rowid, old.search_text);
+    INSERT INTO series_fts(rowid, search_text) VALUES (new.rowid, new.search_text);
+END;
+CREATE TABLE IF NOT EXISTS imports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    file_size INTEGER NOT NULL,
+    file_mtime REAL NOT NULL,
+    rows INTEGER NOT NULL DEFAULT 0,
+    imported_at REAL NOT NULL
+);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Texto de búsqueda: minúsculas, sin acentos y con espacios simples"""
+    text = unicodedata.normalize("NFKD", unicodedata.normalize("NFKC", str(text)).casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.split())
+
+
+def _tmdb_entry(record: Dict) -> Optional[Tuple[str, str, List[str], str, float, Dict]]:
+    """(id, título, alternativos, año, popularidad, resultado) de una línea de TMDB"""
+    if record.get('adult') or record.get('id') is None:
+        return None
+    name = record.get('name') or record.get('original_name') or ''
+    first_air_date = record.get('first_air_date') or ''
+    result = {
+        'id': record['id'],
+        'name': name,
+        'original_name': record.get('original_name', name),
+        'overview': record.get('overview', ''),
+        'first_air_date': first_air_date,
+        'vote_average': record.get('vote_average', 0),
+        'poster_path': record.get('poster_path')
+    }
+    alternatives = [record.get('original_name') or ''] + list(record.get('alternative_titles') or [])
+    return (str(record['id']), name, alternatives, first_air_date[:4],
+            float(record.get('popularity') or 0), result)
+
+
+def _mal_entry(record: Dict) -> Optional[Tuple[str, str, List[str], str, float, Dict]]:
+    """(id, título, alternativos, año, popularidad, resultado) de una línea de MyAnimeList"""
+    anime_id = record.get('mal_id', record.get('id'))
+    title = record.get('title') or ''
+    if anime_id is None or not title:
+        return None
+    image_url = record.get('image_url') or \
+        ((record.get('images') or {}).get('jpg') or {}).get('image_url', '')
+    result = {
+        'id': anime_id,
+        'title': title,
+        'title_english': record.get('title_english'),
+        'synopsis': record.get('synopsis', ''),
+        'year': record.get('year'),
+        'score': record.get('score'),
+        'episodes': record.get('episodes'),
+        'status': record.get('status', ''),
+        'image_url': image_url
+    }
+    alternatives = [record.get('title_english') or '', record.get('title_japanese') or '']
+    alternatives += list(record.get('title_synonyms') or record.get('synonyms') or [])
+    # Popularidad: en MAL el puesto 1 es el más popular
+    members = record.get('members') or 0
+    popularity = float(members) if members else 1.0 / (record.get('popularity') or 1e6)
+    return (str(anime_id), title, alternatives, str(record.get('year') or ''), popularity, result)
+
+
+ENTRY_PARSERS = {
+    "tmdb": _tmdb_entry,
+    "jikan": _mal_entry
+}
+
+
+def iter_dump(file_path: str) -> Iterator[Dict]:
+    """Registros de un volcado JSON lines (las líneas dañadas se ignoran)"""
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+class OfflineIndex:
+    """Índice SQLite FTS5 de series de TMDB y MyAnimeList"""
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def import_dump(self, file_path: str, source: str, prune: bool = False, force: bool = False,
+                    on_progress: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+        """Importa un volcado JSON lines de forma incremental
+
+        Solo se reescriben las entradas nuevas o modificadas. Un volcado ya
+        importado (mismo nombre, tamaño y fecha) se omite salvo con force.
+        Con prune (volcado completo) se eliminan las entradas de la fuente que
+        ya no aparecen. Retorna contadores: read, added, updated, unchanged,
+        skipped, removed y already_imported (1 si el volcado se omitió).
+        """
+        source = SOURCE_ALIASES[source.lower()]
+        parse = ENTRY_PARSERS[source]
+        stat = Path(file_path).stat()
+        counts = {"read": 0, "added": 0, "updated": 0, "unchanged": 0, "skipped": 0, "removed": 0,
+                  "already_imported": 0}
+
+        with self._lock:
+            seen = self._conn.execute(
+                "SELECT 1 FROM imports WHERE source = ? AND file_name = ? AND file_size = ? AND file_mtime = ?",
+                (source, Path(file_path).name, stat.st_size, stat.st_mtime)).fetchone()
+            if seen and not force:
+                counts["already_imported"] = 1
+                return counts
+            with self._conn:
+                import_id = self._conn.execute(
+                    "INSERT INTO imports (source, file_name, file_size, file_mtime, imported_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (source, Path(file_path).name, stat.st_size, stat.st_mtime, time.time())).lastrowid
+
+        try:
+            batch = []
+            for record in iter_dump(file_path):
+                counts["read"] += 1
+                entry = parse(record)
+                if entry is None:
+                    counts["skipped"] += 1
+                    continue
+                ext_id, title, alternatives, year, popularity, result = entry
+                titles = [title] + [alt for alt in alternatives if alt and alt != title]
+                search_text = " | ".join(dict.fromkeys(normalize_text(t) for t in titles))
+                batch.append((source, ext_id, title, search_text, year, popularity,
+                              json.dumps(result, ensure_ascii=False, sort_keys=True), import_id))
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    self._write_batch(batch, counts)
+                    batch = []
+                    if on_progress:
+                        on_progress(counts["read"])
+            if batch:
+                self._write_batch(batch, counts)
+
+            with self._lock, self._conn:
+                if prune:
+                    counts["removed"] = self._conn.execute(
+                        "DELETE FROM series WHERE source = ? AND import_id < ?", (source, import_id)).rowcount
+                self._conn.execute("UPDATE imports SET rows = ? WHERE id = ?", (counts["read"], import_id))
+        except BaseException:
+            # Importación interrumpida: sin el registro, el volcado se vuelve a importar
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM imports WHERE id = ?", (import_id,))
+            raise
+        if on_progress:
+            on_progress(counts["read"])
+        return counts
+
+    def _write_batch(self, batch: List[Tuple], counts: Dict[str, int]):
+        """Inserta o actualiza un lote en una sola transacción"""
+        with self._lock, self._conn:
+            for row in batch:
+                existing = self._conn.execute(
+                    "SELECT data, search_text, popularity FROM series WHERE source = ? AND ext_id = ?",
+                    row[:2]).fetchone()
+                if existing is None:
+                    self._conn.execute(
+                        "INSERT INTO series (source, ext_id, title, search_text, year, popularity, data, import_id) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+                    counts["added"] += 1
+                elif existing == (row[6], row[3], row[5]):
+                    # Sin cambios: solo se marca como vista (no toca el índice FTS)
+                    self._conn.execute("UPDATE series SET import_id = ? WHERE source = ? AND ext_id = ?",
+                                       (row[7], row[0], row[1]))
+                    counts["unchanged"] += 1
+                else:
+                    self._conn.execute(
+                        "UPDATE series SET title = ?, search_text = ?, year = ?, popularity = ?, data = ?, "
+                        "import_id = ? WHERE source = ? AND ext_id = ?",
+                        (row[2], row[3], row[4], row[5], row[6], row[7], row[0], row[1]))
+                    counts["updated"] += 1
+
+    def search(self, query: str, source: Optional[str] = None, limit: int = 10) -> List[Dict]:
+        """Series más parecidas a la consulta, sin red
+
+        Primero se buscan las que contienen la consulta; si no bastan, las que
+        comparten más trigramas (tolera errores de escritura). Los candidatos se
+        ordenan por similitud con el título y, a igualdad, por popularidad. Cada
+        resultado lleva 'source' ("tmdb" o "jikan") con el formato de esa fuente.
+        """
+        text = normalize_text(query)
+        if not text:
+            return []
+        source_filter = SOURCE_ALIASES.get(source.lower()) if source else None
+
+        candidates = {}
+        if len(text) < 3:
+            # El tokenizador de trigramas necesita al menos 3 caracteres
+            self._collect(candidates, "SELECT rowid, source, search_text, popularity, data FROM series "
+                                      "WHERE search_text LIKE ? {source} ORDER BY popularity DESC LIMIT ?",
+                          ['%' + text.replace('%', '') + '%'], source_filter)
+        else:
+            phrase = '"' + text.replace('"', '""') + '"'
+            self._collect(candidates, "SELECT s.rowid, s.source, s.search_text, s.popularity, s.data "
+                                      "FROM series_fts JOIN series s ON s.rowid = series_fts.rowid "
+                                      "WHERE series_fts MATCH ? {source} ORDER BY rank LIMIT ?",
+                          [phrase], source_filter)
+            if len(candidates) < limit:
+                trigrams = {text[i:i + 3] for i in range(len(text) - 2)}
+                fuzzy = " OR ".join('"' + gram.replace('"', '""') + '"' for gram in sorted(trigrams))
+                self._collect(candidates, "SELECT s.rowid, s.source, s.search_text, s.popularity, s.data "
+                                          "FROM series_fts JOIN series s ON s.rowid = series_fts.rowid "
+                                          "WHERE series_fts MATCH ? {source} ORDER BY rank LIMIT ?",
+                              [fuzzy], source_filter)
+
+        ranked = sorted(candidates.values(), key=lambda c: (-self._similarity(text, c[0]), -c[1]))
+        results = []
+        for _, _, source_name, data in ranked[:limit]:
+            result = json.loads(data)
+            result['source'] = source_name
+            results.append(result)
+        return results
+
+    def _collect(self, candidates: Dict, sql: str, params: List, source: Optional[str]):
+        params = list(params)
+        if source:
+            sql = sql.replace("{source}", "AND s.source = ?" if "s.rowid" in sql else "AND source = ?")
+            params.append(source)
+        else:
+            sql = sql.replace(" {source}", "")
+        params.append(CANDIDATE_LIMIT)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        for rowid, source_name, search_text, popularity, data in rows:
+            candidates.setdefault(rowid, (search_text, popularity, source_name, data))
+
+    @staticmethod
+    def _similarity(query: str, search_text: str) -> float:
+        """Mayor parecido entre la consulta y cualquiera de los títulos de la entrada"""
+        best = 0.0
+        for title in search_text.split(" | "):
+            score = SequenceMatcher(None, query, title).ratio()
+            if query in title:
+                # Contener la consulta completa pesa más que un parecido parcial
+                score = max(score, 0.6 + 0.4 * len(query) / max(len(title), 1))
+            best = max(best, score)
+        return best
+
+    def stats(self) -> Dict[str, int]:
+        """Entradas por fuente e importaciones realizadas"""
+        with self._lock:
+            stats = dict(self._conn.execute("SELECT source, COUNT(*) FROM series GROUP BY source").fetchall())
+            stats["imports"] = self._conn.execute("SELECT COUNT(*) FROM imports").fetchone()[0]
+        return stats
+
+    def optimize(self):
+        """Compacta el índice FTS tras importaciones grandes"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO series_fts(series_fts) VALUES ('optimize')")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_offline_index(config_manager, create: bool = False) -> Optional[OfflineIndex]:
+    """Índice local según la configuración (None si todavía no se ha importado nada)"""
+    if config_manager is None:
+        return None
+    index_file = config_manager.get_path("metadata", "offline_index_file", "metadata_offline.db")
+    if not create and not index_file.exists():
+        return None
+    return OfflineIndex(str(index_file))
+
+
+def main():
+    """Comando: python -m app.offline_index import|search|stats ..."""
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from app.config import get_config_manager
+
+    parser = argparse.ArgumentParser(description="Índice local de metadatos para buscar sin conexión")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Importar un volcado JSON lines")
+    import_parser.add_argument("dump", help="Archivo .json/.jsonl (una serie por línea)")
+    import_parser.add_argument("--source", required=True, choices=sorted(SOURCE_ALIASES),
+                               help="Origen del volcado (tmdb o mal)")
+    import_parser.add_argument("--prune", action="store_true",
+                               help="Volcado completo: eliminar las series que ya no aparecen")
+    import_parser.add_argument("--force", action="store_true", help="Reimportar aunque ya se haya importado")
+    search_parser = subparsers.add_parser("search", help="Buscar en el índice")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--source", choices=sorted(SOURCE_ALIASES))
+    subparsers.add_parser("stats", help="Mostrar el contenido del índice")
+    args = parser.parse_args()
+
+    index = get_offline_index(get_config_manager(), create=True)
+    if args.command == "import":
+        start = time.monotonic()
+        counts = index.import_dump(args.dump, args.source, prune=args.prune, force=args.force,
+                                   on_progress=lambda read: print(f"\r📥 {read} líneas leídas", end=""))
+        print()
+        if counts["already_imported"]:
+            print("ℹ️ Este volcado ya estaba importado (usa --force para repetir)")
+        else:
+            index.optimize()
+            print(f"✅ {counts['added']} nuevas, {counts['updated']} actualizadas, "
+                  f"{counts['unchanged']} sin cambios, {counts['removed']} eliminadas "
+                  f"en {time.monotonic() - start:.1f}s")
+    elif args.command == "search":
+        start = time.monotonic()
+        results = index.search(args.query, args.source)
+        elapsed = (time.monotonic() - start) * 1000
+        for result in results:
+            title = result.get('name') or result.get('title')
+            year = (result.get('first_air_date') or '')[:4] or result.get('year') or ''
+            print(f"[{result['source']}:{result['id']}] {title} ({year})")
+        print(f"🔍 {len(results)} resultados en {elapsed:.1f} ms")
+    else:
+        for key, value in index.stats().items():
+            print(f"{key}: {value}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
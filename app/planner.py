@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planificador previo de lotes
+Estima el tamaño de salida y el tiempo de cada trabajo antes de procesar
+y lo compara con el espacio libre del disco destino
+"""
+
+import json
+import shutil
+from pathlib import Path
+from datetime import datetime
+from typing import List, Dict, Optional
+
+# Resoluciones de salida (igual que FFmpegProcessor.convert_video)
+RESOLUTION_SIZES = {
+    "1080p": (1920, 1080),
+    "720p": (1280, 720),
+    "480p": (854, 480),
+    "360p": (640, 360)
+}
+
+# Nivel de compresión -> CRF usado por FFmpegProcessor.convert_video
+COMPRESSION_CRF = {
+    "High": 18,
+    "Medium": 23,
+    "Low": 28
+}
+
+# Bits por píxel aproximados de libx264 (preset medium) según CRF
+CRF_BITS_PER_PIXEL = {
+    18: 0.14,
+    23: 0.085,
+    28: 0.05,
+    35: 0.025
+}
+
+# Bitrate por defecto de los codecs de audio con pérdida de FFmpeg
+AUDIO_CODEC_BITRATES = {
+    "mp3": 128000,
+    "aac": 128000
+}
+
+# Velocidades por defecto cuando no hay historial
+DEFAULT_COPY_BYTES_PER_SECOND = 100 * 1024 * 1024
+DEFAULT_SPEED_FACTORS = {
+    "convert": 1.0,         # segundos de video por segundo real
+    "extract_audio": 20.0
+}
+
+# Sobrecarga aproximada del contenedor
+CONTAINER_OVERHEAD = 1.02
+
+
+def format_bytes(size_bytes: float) -> str:
+    """Formatea un tamaño en bytes de forma legible"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(size_bytes) < 1024.0:
+            return f"{size_bytes:.1f} {unit}"
+        size_bytes /= 1024.0
+    return f"{size_bytes:.1f} TB"
+
+
+def format_duration(seconds: float) -> str:
+    """Formatea una duración en segundos como HH:MM:SS"""
+    seconds = int(max(seconds, 0))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+def get_free_space(directory: str) -> int:
+    """Obtiene el espacio libre del dispositivo que contendrá el directorio"""
+    path = Path(directory).absolute()
+    # El destino puede no existir todavía: usar el primer ancestro existente
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    return shutil.disk_usage(str(path)).free
+
+
+class SpeedHistory:
+    """Historial de velocidad de procesamiento para estimar tiempos"""
+
+    def __init__(self, history_file: str = "encode_history.json", smoothing: float = 0.3):
+        self.history_file = Path(history_file)
+        self.smoothing = smoothing
+        self.speeds: Dict[str, float] = {}
+        self._load()
+
+    def _load(self):
+        """Carga el historial de velocidades"""
+        try:
+            if self.history_file.exists():
+                with open(self.history_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    self.speeds = data.get('speeds', {}) if isinstance(data, dict) else {}
+        except Exception as e:
+            print(f"Error cargando historial de velocidad: {e}")
+            self.speeds = {}
+
+    def save(self):
+        """Guarda el historial de velocidades"""
+        try:
+            data = {
+                'speeds': self.speeds,
+                'last_updated': datetime.now().isoformat()
+            }
+            with open(self.history_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            print(f"Error guardando historial de velocidad: {e}")
+
+    @staticmethod
+    def make_key(operation_mode: str, resolution: str = "Original",
+                 compression_level: str = "Medium") -> str:
+        """Genera la clave del historial para una configuración"""
+        if operation_mode == "convert":
+            return f"convert:{resolution}:{compression_level}"
+        return operation_mode
+
+    def get_speed(self, key: str) -> Optional[float]:
+        """Obtiene la velocidad registrada para una clave"""
+        return self.speeds.get(key)
+
+    def record(self, key: str, amount: float, elapsed_seconds: float):
+        """Registra una medición (segundos de media o bytes por segundo real)"""
+        if amount <= 0 or elapsed_seconds <= 0:
+            return
+        speed = amount / elapsed_seconds
+        previous = self.speeds.get(key)
+        if previous:
+            # Media móvil exponencial para adaptarse a cambios de hardware
+            speed = previous * (1 - self.smoothing) + speed * self.smoothing
+        self.speeds[key] = speed
+        self.save()
+
+
+class PlannedJob:
+    """Estimación de un trabajo individual del lote"""
+
+    def __init__(self, name: str, duration: float = 0.0, estimated_bytes: int = 0,
+                 estimated_seconds: float = 0.0, exact: bool = False):
+        self.name = name
+        self.duration = duration
+        self.estimated_bytes = estimated_bytes
+        self.estimated_seconds = estimated_seconds
+        self.exact = exact
+
+    def to_dict(self) -> Dict:
+        """Convierte el objeto a diccionario"""
+        return {
+            'name': self.name,
+            'duration': self.duration,
+            'estimated_bytes': self.estimated_bytes,
+            'estimated_seconds': self.estimated_seconds,
+            'exact': self.exact
+        }
+
+
+class BatchPlan:
+    """Plan de un lote completo con su comparación de espacio libre"""
+
+    def __init__(self, jobs: List[PlannedJob], free_bytes: int, reserve_bytes: int = 0):
+        self.jobs = jobs
+        self.free_bytes = free_bytes
+        self.reserve_bytes = reserve_bytes
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(job.estimated_bytes for job in self.jobs)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(job.estimated_seconds for job in self.jobs)
+
+    @property
+    def available_bytes(self) -> int:
+        return max(self.free_bytes - self.reserve_bytes, 0)
+
+    @property
+    def fits(self) -> bool:
+        return self.total_bytes <= self.available_bytes
+
+    @property
+    def fitting_count(self) -> int:
+        """Cantidad de trabajos (en orden) que caben en el espacio disponible"""
+        used = 0
+        for i, job in enumerate(self.jobs):
+            used += job.estimated_bytes
+            if used > self.available_bytes:
+                return i
+        return len(self.jobs)
+
+    def trim(self) -> 'BatchPlan':
+        """Devuelve un plan recortado a los trabajos que caben"""
+        return BatchPlan(self.jobs[:self.fitting_count], self.free_bytes, self.reserve_bytes)
+
+    def format_report(self) -> List[str]:
+        """Genera un reporte legible del plan"""
+        lines = [f"📐 Plan del lote: {len(self.jobs)} trabajos"]
+        for job in self.jobs:
+            mark = "=" if job.exact else "≈"
+            lines.append(f"   • {job.name}: {mark}{format_bytes(job.estimated_bytes)}, "
+                         f"≈{format_duration(job.estimated_seconds)}")
+        lines.append(f"💾 Tamaño estimado total: {format_bytes(self.total_bytes)}")
+        lines.append(f"⏱️ Tiempo estimado total: {format_duration(self.total_seconds)}")
+        lines.append(f"🗄️ Espacio libre en destino: {format_bytes(self.free_bytes)} "
+                     f"(reserva {format_bytes(self.reserve_bytes)})")
+        if self.fits:
+            lines.append("✅ El lote cabe en el disco destino")
+        else:
+            missing = self.total_bytes - self.available_bytes
+            lines.append(f"❌ Faltan {format_bytes(missing)} en el disco destino; "
+                         f"caben {self.fitting_count} de {len(self.jobs)} trabajos")
+        return lines
+
+
+class BatchPlanner:
+    """Estima tamaño y tiempo de un lote antes de iniciarlo"""
+
+    def __init__(self, ffmpeg_processor=None, speed_history: SpeedHistory = None,
+                 reserve_mb: int = 1024):
+        self.ffmpeg_processor = ffmpeg_processor
+        self.speed_history = speed_history or SpeedHistory()
+        self.reserve_bytes = max(int(reserve_mb), 0) * 1024 * 1024
+
+    def plan(self, video_files: List, output_directory: str, operation_mode: str,
+             resolution: str = "Original", compression_level: str = "Medium",
+             audio_mode: str = "keep_all", selected_audio_track: str = "0",
+             audio_format: str = "mp3") -> BatchPlan:
+        """Genera el plan de un lote"""
+        jobs = []
+        for video_file in video_files:
+            jobs.append(self.estimate_job(
+                str(video_file.path), video_file.name, operation_mode, resolution,
+                compression_level, audio_mode, selected_audio_track, audio_format
+            ))
+        return BatchPlan(jobs, get_free_space(output_directory), self.reserve_bytes)
+
+    def estimate_job(self, input_path: str, name: str, operation_mode: str,
+                     resolution: str = "Original", compression_level: str = "Medium",
+                     audio_mode: str = "keep_all", selected_audio_track: str = "0",
+                     audio_format: str = "mp3") -> PlannedJob:
+        """Estima el tamaño y tiempo de un trabajo individual"""
+        source_size = self._get_source_size(input_path)
+
+        if operation_mode == "rename":
+            # Copia exacta: el tamaño de salida es el de origen
+            speed = self.speed_history.get_speed("rename") or DEFAULT_COPY_BYTES_PER_SECOND
+            return PlannedJob(name, 0.0, source_size, source_size / speed, exact=True)
+
+        info = self._probe(input_path)
+        duration = self._get_duration(info)
+
+        if operation_mode == "extract_audio":
+            audio_stream = self._get_audio_stream(info, selected_audio_track)
+            bitrate = self._estimate_audio_bitrate(audio_format, audio_stream)
+            estimated_bytes = int(duration * bitrate / 8 * CONTAINER_OVERHEAD)
+        else:
+            estimated_bytes = self._estimate_video_bytes(
+                info, duration, source_size, resolution, compression_level,
+                audio_mode, selected_audio_track
+            )
+
+        key = SpeedHistory.make_key(operation_mode, resolution, compression_level)
+        speed = self.speed_history.get_speed(key) or DEFAULT_SPEED_FACTORS.get(operation_mode, 1.0)
+        estimated_seconds = duration / speed if duration else 0.0
+
+        return PlannedJob(name, duration, estimated_bytes, estimated_seconds)
+
+    def _probe(self, input_path: str) -> Dict:
+        """Obtiene la información de ffprobe del archivo"""
+        if not self.ffmpeg_processor:
+            return {}
+        return self.ffmpeg_processor.get_video_info(input_path) or {}
+
+    @staticmethod
+    def _get_source_size(input_path: str) -> int:
+        try:
+            return Path(input_path).stat().st_size
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _get_duration(info: Dict) -> float:
+        try:
+            return float(info.get('format', {}).get('duration', 0) or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def _get_streams(info: Dict, codec_type: str) -> List[Dict]:
+        return [s for s in info.get('streams', []) if s.get('codec_type') == codec_type]
+
+    def _get_audio_stream(self, info: Dict, selected_track: str) -> Optional[Dict]:
+        audio_streams = self._get_streams(info, 'audio')
+        if not audio_streams:
+            return None
+        try:
+            index = int(selected_track)
+        except ValueError:
+            index = 0
+        return audio_streams[index] if index < len(audio_streams) else audio_streams[0]
+
+    @staticmethod
+    def _stream_bitrate(stream: Optional[Dict]) -> int:
+        if not stream:
+            return 0
+        try:
+            return int(stream.get('bit_rate', 0) or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def _estimate_audio_bitrate(self, audio_format: str, stream: Optional[Dict]) -> int:
+        """Estima el bitrate de audio extraído según el formato"""
+        if audio_format == "wav":
+            sample_rate = int((stream or {}).get('sample_rate', 48000) or 48000)
+            channels = int((stream or {}).get('channels', 2) or 2)
+            return sample_rate * channels * 16
+        return AUDIO_CODEC_BITRATES.get(audio_format, AUDIO_CODEC_BITRATES["mp3"])
+
+    @staticmethod
+    def _parse_frame_rate(stream: Dict) -> float:
+        rate = stream.get('avg_frame_rate') or stream.get('r_frame_rate') or "0/0"
+        try:
+            num, den = rate.split('/')
+            return float(num) / float(den) if float(den) else 0.0
+        except (ValueError, ZeroDivisionError):
+            return 0.0
+
+    def _estimate_video_bytes(self, info: Dict, duration: float, source_size: int,
+                              resolution: str, compression_level: str, audio_mode: str,
+                              selected_audio_track: str) -> int:
+        """Estima el tamaño de un video recodificado con libx264"""
+        video_streams = self._get_streams(info, 'video')
+        if not duration or not video_streams:
+            # Sin información de ffprobe: asumir tamaño de origen
+            return int(source_size * CONTAINER_OVERHEAD)
+
+        video = video_streams[0]
+        width, height = RESOLUTION_SIZES.get(
+            resolution, (int(video.get('width', 1920) or 1920), int(video.get('height', 1080) or 1080))
+        )
+        fps = self._parse_frame_rate(video) or 24.0
+        crf = COMPRESSION_CRF.get(compression_level, 23)  # 23 es el CRF por defecto de libx264
+        video_bitrate = CRF_BITS_PER_PIXEL[crf] * width * height * fps
+
+        # Recodificar rara vez supera el bitrate de origen
+        source_video_bitrate = self._stream_bitrate(video)
+        if source_video_bitrate and resolution == "Original":
+            video_bitrate = min(video_bitrate, source_video_bitrate * 1.1)
+
+        if audio_mode == "keep_all":
+            # Audio copiado: mismo bitrate que el origen
+            audio_bitrate = sum(self._stream_bitrate(s) for s in self._get_streams(info, 'audio'))
+        else:
+            # Audio recodificado con el AAC por defecto de FFmpeg
+            audio_bitrate = AUDIO_CODEC_BITRATES["aac"] if self._get_streams(info, 'audio') else 0
+
+        return int((video_bitrate + audio_bitrate) * duration / 8 * CONTAINER_OVERHEAD)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Control de procesos externos (FFmpeg)
+Prioridad de CPU/E/S, registro de procesos en ejecución, cancelación
+y vigilancia de procesos estancados
+"""
+
+import os
+import re
+import sys
+import time
+import ctypes
+import platform
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PRIORITY_MODES = ["normal", "background"]
+
+# Clases de E/S de Linux (ioprio)
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASSES = {
+    "best_effort": 2,
+    "idle": 3
+}
+# Nivel dentro de best-effort (0 = máxima, 7 = mínima prioridad)
+IOPRIO_BEST_EFFORT_LOW = 7
+IOPRIO_BEST_EFFORT_NORMAL = 4
+
+# Número de syscall ioprio_set según arquitectura
+IOPRIO_SET_SYSCALLS = {
+    "x86_64": 251,
+    "i386": 289,
+    "i686": 289,
+    "aarch64": 30,
+    "armv7l": 314
+}
+
+# Clases de prioridad de Windows
+WINDOWS_PRIORITY_CLASSES = {
+    "normal": 0x00000020,      # NORMAL_PRIORITY_CLASS
+    "background": 0x00004000   # BELOW_NORMAL_PRIORITY_CLASS
+}
+WINDOWS_PROCESS_SET_INFORMATION = 0x0200
+
+
+def _ioprio_value(io_class: str, level: int) -> int:
+    class_value = IOPRIO_CLASSES.get(io_class, IOPRIO_CLASSES["best_effort"])
+    data = 0 if class_value == IOPRIO_CLASSES["idle"] else level
+    return (class_value << IOPRIO_CLASS_SHIFT) | data
+
+
+def set_io_priority(pid: int, io_class: str = "idle", level: int = IOPRIO_BEST_EFFORT_LOW) -> bool:
+    """Establece la clase de E/S de un proceso en Linux (syscall ioprio_set o ionice)"""
+    if not sys.platform.startswith("linux"):
+        return False
+
+    syscall_number = IOPRIO_SET_SYSCALLS.get(platform.machine())
+    if syscall_number is not None:
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            result = libc.syscall(syscall_number, IOPRIO_WHO_PROCESS, pid,
+                                  _ioprio_value(io_class, level))
+            if result == 0:
+                return True
+        except Exception:
+            pass
+
+    # Fallback: utilidad ionice
+    try:
+        class_value = IOPRIO_CLASSES.get(io_class, IOPRIO_CLASSES["best_effort"])
+        cmd = ['ionice', '-c', str(class_value)]
+        if class_value == IOPRIO_CLASSES["best_effort"]:
+            cmd.extend(['-n', str(level)])
+        cmd.extend(['-p', str(pid)])
+        return subprocess.run(cmd, capture_output=True, timeout=5).returncode == 0
+    except Exception:
+        return False
+
+
+def set_cpu_priority(pid: int, mode: str, nice_value: int = 10) -> bool:
+    """Establece la prioridad de CPU de un proceso"""
+    try:
+        if os.name == "nt":
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.OpenProcess(WINDOWS_PROCESS_SET_INFORMATION, False, pid)
+            if not handle:
+                return False
+            try:
+                return bool(kernel32.SetPriorityClass(handle, WINDOWS_PRIORITY_CLASSES[mode]))
+            finally:
+                kernel32.CloseHandle(handle)
+
+        target = nice_value if mode == "background" else 0
+        os.setpriority(os.PRIO_PROCESS, pid, target)
+        return True
+    except Exception:
+        # Volver a prioridad normal requiere privilegios en POSIX
+        return False
+
+
+def apply_priority(pid: int, mode: str, nice_value: int = 10, io_class: str = "idle") -> bool:
+    """Aplica el modo de prioridad (CPU y E/S) a un proceso en ejecución"""
+    cpu_ok = set_cpu_priority(pid, mode, nice_value)
+    if mode == "background":
+        io_ok = set_io_priority(pid, io_class, IOPRIO_BEST_EFFORT_LOW)
+    else:
+        io_ok = set_io_priority(pid, "best_effort", IOPRIO_BEST_EFFORT_NORMAL)
+    return cpu_ok and (io_ok or not sys.platform.startswith("linux"))
+
+
+def get_popen_priority_kwargs(mode: str) -> Dict:
+    """Argumentos de Popen para lanzar un proceso ya con la prioridad indicada
+
+    Solo en Windows; en POSIX la prioridad se aplica al pid tras lanzarlo
+    (preexec_fn no es seguro con varios hilos).
+    """
+    if mode == "background" and os.name == "nt":
+        return {'creationflags': WINDOWS_PRIORITY_CLASSES["background"]}
+    return {}
+
+
+class ProcessRegistry:
+    """Registro seguro entre hilos de los procesos FFmpeg en ejecución"""
+
+    def __init__(self):
+        self._processes: List[subprocess.Popen] = []
+        self._lock = threading.Lock()
+
+    def register(self, process: subprocess.Popen):
+        with self._lock:
+            self._processes.append(process)
+
+    def unregister(self, process: subprocess.Popen):
+        with self._lock:
+            if process in self._processes:
+                self._processes.remove(process)
+
+    def running(self) -> List[subprocess.Popen]:
+        """Procesos registrados que siguen en ejecución"""
+        with self._lock:
+            return [p for p in self._processes if p.poll() is None]
+
+    def apply_priority(self, mode: str, nice_value: int = 10, io_class: str = "idle") -> Dict[int, bool]:
+        """Cambia en vivo la prioridad de todos los procesos en ejecución"""
+        return {process.pid: apply_priority(process.pid, mode, nice_value, io_class)
+                for process in self.running()}
+
+
+def terminate_process(process: subprocess.Popen, grace_period: float = 0.5) -> bool:
+    """Termina un proceso con SIGTERM y escala a SIGKILL tras el periodo de gracia"""
+    if process.poll() is not None:
+        return True
+    try:
+        process.terminate()
+        process.wait(timeout=grace_period)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        try:
+            process.wait(timeout=grace_period)
+        except subprocess.TimeoutExpired:
+            return False
+    except OSError:
+        pass
+    return process.poll() is not None
+
+
+class CancellationToken:
+    """Token de cancelación que llega hasta los procesos FFmpeg en ejecución"""
+
+    def __init__(self, grace_period: float = 0.5):
+        self.grace_period = grace_period
+        self.cancel_latency: Optional[float] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._attached: Dict[subprocess.Popen, Optional[str]] = {}
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def attach(self, process: subprocess.Popen, output_path: Optional[str] = None):
+        """Asocia un proceso (y su salida parcial) al token"""
+        with self._lock:
+            self._attached[process] = output_path
+        # Si ya se canceló, detener el proceso recién lanzado
+        if self.is_cancelled:
+            self._stop(process, output_path)
+
+    def detach(self, process: subprocess.Popen):
+        with self._lock:
+            self._attached.pop(process, None)
+
+    def wait(self, timeout: float) -> bool:
+        """Espera hasta la cancelación o el tiempo indicado"""
+        return self._event.wait(timeout)
+
+    def cancel(self) -> float:
+        """Cancela: termina los procesos, borra salidas parciales y retorna la latencia"""
+        started = time.monotonic()
+        self._event.set()
+        with self._lock:
+            attached = list(self._attached.items())
+
+        # Enviar SIGTERM a todos antes de esperar a ninguno
+        for process, _ in attached:
+            if process.poll() is None:
+                try:
+                    process.terminate()
+                except OSError:
+                    pass
+        for process, output_path in attached:
+            self._stop(process, output_path)
+
+        self.cancel_latency = time.monotonic() - started
+        return self.cancel_latency
+
+    def _stop(self, process: subprocess.Popen, output_path: Optional[str]):
+        terminate_process(process, self.grace_period)
+        if output_path:
+            remove_partial_output(output_path)
+
+
+# Marcadores de avance de FFmpeg: -progress (out_time, total_size) y estadísticas (time=, size=)
+PROGRESS_PATTERN = re.compile(r'\b(out_time_us|out_time_ms|out_time|total_size|time|size)=\s*([^\s]+)')
+
+
+class StallWatchdog:
+    """Vigila el avance de un proceso y lo detiene si deja de progresar"""
+
+    def __init__(self, process: subprocess.Popen, stall_timeout: float,
+                 check_interval: float = 1.0, grace_period: float = 0.5):
+        self.process = process
+        self.stall_timeout = stall_timeout
+        self.check_interval = min(check_interval, stall_timeout / 2)
+        self.grace_period = grace_period
+        self.stalled = False
+        self._markers: Dict[str, str] = {}
+        self._last_progress = time.monotonic()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def start(self) -> 'StallWatchdog':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def feed(self, line: str):
+        """Procesa una línea de salida buscando avance real (tiempo o tamaño)"""
+        for key, value in PROGRESS_PATTERN.findall(line):
+            if value in ('N/A', '0', '00:00:00.000000'):
+                continue
+            if self._markers.get(key) != value:
+                self._markers[key] = value
+                self._last_progress = time.monotonic()
+
+    @property
+    def seconds_since_progress(self) -> float:
+        return time.monotonic() - self._last_progress
+
+    def _watch(self):
+        while not self._stop_event.wait(self.check_interval):
+            if self.process.poll() is not None:
+                return
+            if self.seconds_since_progress > self.stall_timeout:
+                self.stalled = True
+                terminate_process(self.process, self.grace_period)
+                return
+
+
+def remove_partial_output(output_path: str) -> bool:
+    """Elimina un archivo de salida incompleto"""
+    try:
+        path = Path(output_path)
+        if path.exists():
+            path.unlink()
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Límite de peticiones a las APIs de metadatos (Jikan, TMDB)
+Un limitador compartido por fuente que respeta sus ventanas de peticiones,
+reintenta las respuestas 429 esperando lo indicado en Retry-After y agrupa las
+peticiones idénticas simultáneas en una sola llamada a la red
+"""
+
+import time
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+# Límites publicados por cada API: (peticiones, segundos)
+SOURCE_LIMITS = {
+    "jikan": ((3, 1.0), (60, 60.0)),
+    "tmdb": ((40, 10.0),)
+}
+# Holgura añadida a cada ventana: la llegada al servidor no coincide exactamente con el envío
+WINDOW_MARGIN = 0.05
+# Espera inicial cuando un 429 no trae Retry-After (se duplica en cada reintento)
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+MAX_RETRIES = 4
+# Intervalo máximo de espera, para atender enseguida una cancelación
+MAX_WAIT_SLICE = 0.1
+
+
+class RateLimitError(Exception):
+    """La API siguió respondiendo 429 tras agotar los reintentos"""
+
+
+class RequestCancelled(Exception):
+    """La petición se canceló mientras esperaba su turno"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Segundos indicados por una cabecera Retry-After (número o fecha HTTP)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_throttle_delay(error: BaseException) -> Tuple[bool, Optional[float]]:
+    """(es un 429, espera indicada por el servidor) para una excepción de la API
+
+    Reconoce requests.HTTPError y las excepciones de las librerías que exponen
+    status_code o response.
+    """
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(error, 'status_code', None)
+    if status != 429:
+        return False, None
+    headers = getattr(response, 'headers', None) or getattr(error, 'headers', None) or {}
+    return True, parse_retry_after(headers.get('Retry-After'))
+
+
+class RateLimiter:
+    """Limitador de ventanas deslizantes: nunca más de N peticiones en T segundos
+
+    Con varias ventanas (p. ej. 3/s y 60/min) una petición espera hasta que
+    todas tienen hueco. penalize() bloquea todas las peticiones durante el
+    tiempo que pida el servidor tras un 429.
+    """
+
+    def __init__(self, limits: Sequence[Tuple[int, float]], margin: float = WINDOW_MARGIN):
+        self.limits = [(int(count), float(period)) for count, period in limits]
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._windows = [deque() for _ in self.limits]
+        self._blocked_until = 0.0
+        self._metrics = {"requests": 0, "waited": 0.0, "throttled": 0}
+
+    def _wait_time(self, now: float) -> float:
+        # Se llama con el bloqueo tomado
+        wait = self._blocked_until - now
+        for (count, period), stamps in zip(self.limits, self._windows):
+            window = period + self.margin
+            while stamps and now - stamps[0] >= window:
+                stamps.popleft()
+            if len(stamps) >= count:
+                wait = max(wait, stamps[len(stamps) - count] + window - now)
+        return wait
+
+    def acquire(self, cancel_token=None) -> bool:
+        """Espera turno para una petición; retorna False si se cancela"""
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    for stamps in self._windows:
+                        stamps.append(now)
+                    self._metrics["requests"] += 1
+                    self._metrics["waited"] += now - start
+                    return True
+            if cancel_token is not None and cancel_token.is_cancelled:
+                return False
+            time.sleep(min(wait, MAX_WAIT_SLICE))
+
+    def penalize(self, delay: float):
+        """Detiene todas las peticiones durante delay segundos (respuesta 429)"""
+        with self._lock:
+            self._metrics["throttled"] += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._metrics)
+
+
+class _InFlight:
+    """Petición en curso compartida por varias llamadas idénticas"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class RequestCoalescer:
+    """Agrupa las llamadas simultáneas con la misma clave en una sola ejecución"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _InFlight] = {}
+        self.coalesced = 0
+
+    def run(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """Ejecuta fetch, o espera el resultado de una llamada idéntica ya en curso"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _InFlight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fetch()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class SourceLimiter:
+    """Límite, reintentos ante 429 y agrupación de peticiones de una fuente"""
+
+    def __init__(self, limits: Sequence[Tuple[int, float]], max_retries: int = MAX_RETRIES,
+                 base_backoff: float = BASE_BACKOFF, max_backoff: float = MAX_BACKOFF,
+                 margin: float = WINDOW_MARGIN):
+        self.limiter = RateLimiter(limits, margin)
+        self.coalescer = RequestCoalescer()
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+    def call(self, fetch: Callable[[], Any], cancel_token=None) -> Any:
+        """Ejecuta una petición a la red respetando el límite
+
+        Ante un 429 espera lo indicado en Retry-After (o un tiempo creciente)
+        y reintenta; los demás errores se propagan sin reintentar.
+        """
+        for attempt in range(self.max_retries + 1):
+            if not self.limiter.acquire(cancel_token):
+                raise RequestCancelled("Petición cancelada")
+            try:
+                return fetch()
+            except Exception as e:
+                throttled, retry_after = get_throttle_delay(e)
+                if not throttled:
+                    raise
+                if attempt == self.max_retries:
+                    raise RateLimitError(f"Límite de peticiones superado tras {attempt + 1} intentos") from e
+                if retry_after is None:
+                    retry_after = self.base_backoff * 2 ** attempt
+                self.limiter.penalize(min(retry_after, self.max_backoff))
+
+    def run(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """Ejecuta fetch agrupando las llamadas simultáneas con la misma clave"""
+        return self.coalescer.run(key, fetch)
+
+    def stats(self) -> Dict[str, float]:
+        stats = self.limiter.stats()
+        stats["coalesced"] = self.coalescer.coalesced
+        return stats
+
+
+_limiters: Dict[str, SourceLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_source_limiter(source: str) -> SourceLimiter:
+    """Limitador compartido por todo el proceso para una fuente de metadatos"""
+    with _limiters_lock:
+        if source not in _limiters:
+            _limiters[source] = SourceLimiter(SOURCE_LIMITS.get(source, ((10, 1.0),)))
+        return _limiters[source]
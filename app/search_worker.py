@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Búsqueda de metadatos en segundo plano
+Agrupa las pulsaciones de teclas (debounce), descarta las consultas superadas
+por otras más recientes y entrega los resultados al hilo de la interfaz
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait as wait_futures
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .process_control import CancellationToken
+
+# Resultado de una búsqueda: (consulta, fuente, resultados, error)
+ResultsCallback = Callable[[str, str, List[Dict], Optional[Exception]], None]
+# Detalles de un resultado: (fuente, id, cancel_token) -> dict o None
+DetailsFetcher = Callable[[str, object, CancellationToken], Optional[Dict]]
+
+
+class MetadataSearchWorker:
+    """Ejecuta búsquedas fuera del hilo de la interfaz
+
+    - search(query, source): función bloqueante que consulta la API
+    - deliver(fn): ejecuta fn en el hilo de la interfaz (p. ej. root.after(0, fn))
+    - debounce: segundos sin nuevas pulsaciones antes de lanzar la búsqueda
+    Solo se entregan los resultados de la consulta más reciente.
+    """
+
+    def __init__(self, search: Callable[[str, str], List[Dict]],
+                 deliver: Callable[[Callable[[], None]], None],
+                 debounce: float = 0.35, min_length: int = 2, max_workers: int = 2):
+        self.search = search
+        self.deliver = deliver
+        self.debounce = debounce
+        self.min_length = min_length
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="metadata-search")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._timer: Optional[threading.Timer] = None
+        self.superseded = 0
+
+    def request(self, query: str, source: str, on_results: ResultsCallback, immediate: bool = False) -> bool:
+        """Programa una búsqueda; retorna False si la consulta es demasiado corta
+
+        Cada llamada reemplaza a la anterior: la pendiente se cancela y los
+        resultados de una búsqueda ya lanzada se descartan al llegar. Las
+        búsquedas inmediatas (botón Buscar, Enter) no exigen longitud mínima.
+        """
+        query = query.strip()
+        with self._lock:
+            generation = self._supersede()
+            if not query or (not immediate and len(query) < self.min_length):
+                return False
+            if immediate or self.debounce <= 0:
+                self._executor.submit(self._run, generation, query, source, on_results)
+            else:
+                self._timer = threading.Timer(self.debounce, self._submit,
+                                              args=(generation, query, source, on_results))
+                self._timer.daemon = True
+                self._timer.start()
+        return True
+
+    def cancel(self):
+        """Descarta la búsqueda pendiente y los resultados en curso"""
+        with self._lock:
+            self._supersede()
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _supersede(self) -> int:
+        # Se llama con el bloqueo tomado
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._generation += 1
+        return self._generation
+
+    def _is_current(self, generation: int) -> bool:
+        with self._lock:
+            return generation == self._generation
+
+    def _submit(self, generation: int, query: str, source: str, on_results: ResultsCallback):
+        if self._is_current(generation):
+            self._executor.submit(self._run, generation, query, source, on_results)
+
+    def _run(self, generation: int, query: str, source: str, on_results: ResultsCallback):
+        if not self._is_current(generation):
+            return
+        results, error = [], None
+        try:
+            results = self.search(query, source) or []
+        except Exception as e:
+            error = e
+
+        if not self._is_current(generation):
+            with self._lock:
+                self.superseded += 1
+            return
+
+        def deliver():
+            # Una consulta más reciente pudo llegar mientras se encolaba la entrega
+            if self._is_current(generation):
+                on_results(query, source, results, error)
+
+        self.deliver(deliver)
+
+
+class DetailsPrefetcher:
+    """Pide en segundo plano los detalles de los primeros resultados de una búsqueda
+
+    Al elegir uno de ellos los detalles ya están en memoria (y en la caché de
+    metadatos). Cada precarga cancela la anterior: las peticiones que aún no
+    empezaron se descartan y las que esperan turno en el limitador lo abandonan.
+    """
+
+    def __init__(self, get_details: DetailsFetcher, top_n: int = 3, max_workers: int = 3):
+        self.get_details = get_details
+        self.top_n = top_n
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="metadata-prefetch")
+        self._lock = threading.Lock()
+        self._token = CancellationToken()
+        self._futures: Dict[Tuple[str, str], Future] = {}
+        self.cancelled = 0
+
+    def prefetch(self, results: List[Dict], source: str) -> int:
+        """Programa los detalles de los top_n primeros resultados; retorna cuántos"""
+        with self._lock:
+            self._cancel_locked()
+            token = self._token = CancellationToken()
+            for result in results[:self.top_n]:
+                # Los resultados del índice local indican su fuente
+                result_source = result.get('source', source)
+                item_id = result.get('id')
+                if item_id is None or result_source not in ("tmdb", "jikan"):
+                    continue
+                key = (result_source, str(item_id))
+                self._futures[key] = self._executor.submit(self._fetch, token, result_source, item_id)
+            return len(self._futures)
+
+    def _fetch(self, token: CancellationToken, source: str, item_id) -> Optional[Dict]:
+        if token.is_cancelled:
+            return None
+        try:
+            return self.get_details(source, item_id, token)
+        except Exception:
+            return None
+
+    def get(self, source: str, item_id) -> Optional[Dict]:
+        """Detalles ya precargados (None si no se pidieron o aún no llegaron)"""
+        with self._lock:
+            future = self._futures.get((source, str(item_id)))
+        if future is None or not future.done() or future.cancelled():
+            return None
+        return future.result()
+
+    def cancel(self):
+        """Cancela la precarga en curso (p. ej. al empezar otra búsqueda)"""
+        with self._lock:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        # Se llama con el bloqueo tomado
+        self._token.cancel()
+        for future in self._futures.values():
+            if future.cancel():
+                self.cancelled += 1
+        self._futures = {}
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que termine la precarga actual; False si vence el tiempo"""
+        with self._lock:
+            pending = list(self._futures.values())
+        _, not_done = wait_futures(pending, timeout=timeout)
+        return not not_done
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
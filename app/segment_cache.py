@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caché en disco de segmentos HLS
+Permite reanudar descargas interrumpidas sin volver a bajar lo ya descargado.
+Los segmentos se guardan por URI (sin parámetros volátiles) y rango de bytes,
+con límite de tamaño total y expulsión de los menos usados (LRU)
+"""
+
+import os
+import sys
+import shutil
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+from typing import Dict, Optional, Tuple, Iterable
+
+# Parámetros de consulta que cambian en cada petición (firmas, caducidad, sesión)
+VOLATILE_QUERY_PARAMS = (
+    "token", "expires", "exp", "e", "st", "signature", "sig", "hash",
+    "auth", "hdnts", "hdntl", "policy", "key-pair-id", "session", "sid", "t"
+)
+VOLATILE_QUERY_PREFIXES = ("x-amz-", "x-goog-")
+
+SEGMENT_SUFFIX = ".seg"
+
+
+def normalize_uri(uri: str, volatile_params: Iterable[str] = VOLATILE_QUERY_PARAMS) -> str:
+    """URI sin parámetros volátiles, con los parámetros restantes ordenados"""
+    parsed = urlparse(uri)
+    volatile = {name.lower() for name in volatile_params}
+    query = [(key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+             if key.lower() not in volatile and not key.lower().startswith(VOLATILE_QUERY_PREFIXES)]
+    return urlunparse(parsed._replace(query=urlencode(sorted(query)), fragment=""))
+
+
+def link_or_copy(source: Path, destination: Path):
+    """Enlaza (hard link) un archivo o lo copia si el sistema no lo permite"""
+    destination.unlink(missing_ok=True)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+class SegmentCache:
+    """Caché de segmentos con verificación de tamaño y expulsión LRU
+
+    Cada entrada es un archivo '<hash>-<tamaño>.seg'; el tamaño en el nombre
+    permite verificar la integridad sin índice adicional y la fecha de
+    modificación marca el último uso.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 4096 * 1024 * 1024,
+                 volatile_params: Iterable[str] = VOLATILE_QUERY_PARAMS):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.volatile_params = tuple(volatile_params)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Path, int]] = {}
+        self._scan()
+
+    def _scan(self):
+        """Carga las entradas existentes (y descarta temporales incompletos)"""
+        for path in self.cache_dir.glob("*/*"):
+            if path.suffix != SEGMENT_SUFFIX:
+                path.unlink(missing_ok=True)
+                continue
+            digest, _, size = path.stem.rpartition("-")
+            if digest and size.isdigit():
+                self._entries[digest] = (path, int(size))
+
+    def make_key(self, uri: str, byte_range: Optional[Tuple[int, int]] = None) -> str:
+        """Clave estable de un segmento: URI normalizada + rango de bytes"""
+        key = normalize_uri(uri, self.volatile_params)
+        if byte_range:
+            key += f"#{byte_range[1]}+{byte_range[0]}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, uri: str, byte_range: Optional[Tuple[int, int]] = None) -> Optional[Path]:
+        """Ruta del segmento en caché si existe y su tamaño es correcto"""
+        digest = self.make_key(uri, byte_range)
+        with self._lock:
+            entry = self._entries.get(digest)
+        if entry is None:
+            return None
+
+        path, size = entry
+        try:
+            valid = path.stat().st_size == size and (not byte_range or size == byte_range[0])
+        except OSError:
+            valid = False
+        if not valid:
+            self._remove(digest)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, uri: str, byte_range: Optional[Tuple[int, int]], source: Path) -> Optional[Path]:
+        """Guarda en caché un segmento ya descargado (sin volver a escribirlo si es posible)"""
+        digest = self.make_key(uri, byte_range)
+        size = source.stat().st_size
+        path = self.cache_dir / digest[:2] / f"{digest}-{size}{SEGMENT_SUFFIX}"
+        path.parent.mkdir(exist_ok=True)
+        temp_path = path.with_suffix(".part")
+        try:
+            link_or_copy(source, temp_path)
+            temp_path.replace(path)
+        except OSError:
+            temp_path.unlink(missing_ok=True)
+            return None
+
+        with self._lock:
+            previous = self._entries.get(digest)
+            self._entries[digest] = (path, size)
+        if previous and previous[0] != path:
+            previous[0].unlink(missing_ok=True)
+        return path
+
+    def _remove(self, digest: str) -> int:
+        with self._lock:
+            entry = self._entries.pop(digest, None)
+        if entry is None:
+            return 0
+        entry[0].unlink(missing_ok=True)
+        return entry[1]
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(size for _, size in self._entries.values())
+
+    @property
+    def entry_count(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def evict(self, max_bytes: Optional[int] = None) -> Tuple[int, int]:
+        """Expulsa los segmentos menos usados hasta quedar bajo el límite
+
+        Retorna (archivos eliminados, bytes liberados).
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        total = self.total_bytes
+        if total <= limit:
+            return 0, 0
+
+        def last_used(item):
+            try:
+                return item[1][0].stat().st_mtime
+            except OSError:
+                return 0
+
+        with self._lock:
+            entries = sorted(self._entries.items(), key=last_used)
+
+        removed = freed = 0
+        for digest, _ in entries:
+            if total - freed <= limit:
+                break
+            freed += self._remove(digest)
+            removed += 1
+        return removed, freed
+
+    def clear(self) -> Tuple[int, int]:
+        """Vacía la caché; retorna (archivos eliminados, bytes liberados)"""
+        return self.evict(0)
+
+
+def get_segment_cache(config_manager) -> Optional[SegmentCache]:
+    """Caché de segmentos según la configuración (None si está desactivada)"""
+    max_mb = config_manager.get("converter", "segment_cache_mb", 4096)
+    if not max_mb:
+        return None
+    cache_dir = Path(config_manager.get_temp_folder()) / "segments"
+    volatile_params = config_manager.get("converter", "volatile_query_params", VOLATILE_QUERY_PARAMS)
+    return SegmentCache(str(cache_dir), int(max_mb) * 1024 * 1024, volatile_params)
+
+
+def main():
+    """Comando de limpieza: python -m app.segment_cache [--clear | --max-mb N]"""
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from app.config import get_config_manager
+
+    parser = argparse.ArgumentParser(description="Limpieza de la caché de segmentos HLS")
+    parser.add_argument("--clear", action="store_true", help="Eliminar todos los segmentos")
+    parser.add_argument("--max-mb", type=int, help="Reducir la caché hasta este tamaño (MB)")
+    args = parser.parse_args()
+
+    config_manager = get_config_manager()
+    cache_dir = Path(config_manager.get_temp_folder()) / "segments"
+    max_mb = config_manager.get("converter", "segment_cache_mb", 4096) or 0
+    cache = SegmentCache(str(cache_dir), max_mb * 1024 * 1024)
+
+    size_mb = cache.total_bytes / (1024 * 1024)
+    print(f"📦 Caché: {cache.entry_count} segmentos, {size_mb:.1f} MB en {cache_dir}")
+    if args.clear:
+        removed, freed = cache.clear()
+    elif args.max_mb is not None:
+        removed, freed = cache.evict(args.max_mb * 1024 * 1024)
+    else:
+        removed, freed = cache.evict()
+    print(f"🧹 Eliminados {removed} segmentos ({freed / (1024 * 1024):.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
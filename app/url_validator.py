@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Validación previa de URLs de episodios
+Comprueba en paralelo que cada lista M3U8 responde y que su primer y último
+segmento están accesibles, para detectar enlaces caídos, caducados o
+bloqueados antes de empezar la conversión
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Callable, Tuple
+
+import requests
+
+from .hls import HLSDownloader, HLSError, HLSSegment, MediaPlaylist, DEFAULT_HEADERS, is_hls_url
+from .http_client import get_http_client
+
+# Estados de una URL validada
+STATUS_OK = "ok"
+STATUS_NOT_FOUND = "no encontrado"
+STATUS_FORBIDDEN = "acceso denegado"
+STATUS_UNREACHABLE = "sin conexión"
+STATUS_INVALID = "lista no válida"
+STATUS_ERROR = "error"
+
+
+class ValidationResult:
+    """Resultado de validar la URL de un episodio"""
+
+    def __init__(self, url: str, status: str = STATUS_OK, message: str = ""):
+        self.url = url
+        self.status = status
+        self.message = message
+        self.duration = 0.0
+        self.segment_count = 0
+        self.encrypted = False
+        # Variantes disponibles [(resolución, kbps)] y altura de la elegida
+        self.variants: List[Tuple[str, int]] = []
+        self.variant_height = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_OK
+
+    @property
+    def summary(self) -> str:
+        """Texto breve para mostrar en la lista de episodios"""
+        if not self.ok:
+            return f"❌ {self.status}"
+        parts = ["✅"]
+        if self.duration:
+            minutes, seconds = divmod(int(self.duration), 60)
+            parts.append(f"{minutes}:{seconds:02d}")
+        if self.variant_height:
+            parts.append(f"{self.variant_height}p")
+        if self.encrypted:
+            parts.append("🔒")
+        return " ".join(parts)
+
+
+def classify_status_code(status_code: int) -> str:
+    """Estado correspondiente a un código HTTP de error"""
+    if status_code in (404, 410):
+        return STATUS_NOT_FOUND
+    if status_code in (401, 403, 451):
+        # Token caducado o bloqueo geográfico
+        return STATUS_FORBIDDEN
+    return STATUS_ERROR
+
+
+class URLValidator:
+    """Valida varias URLs a la vez con un número acotado de peticiones en vuelo"""
+
+    def __init__(self, session: requests.Session = None, max_workers: int = 8, timeout: float = 15):
+        self.max_workers = max(int(max_workers), 1)
+        self.session = session or get_http_client()
+        self.timeout = timeout
+        self.downloader = HLSDownloader(session=self.session, max_workers=self.max_workers,
+                                        timeout=timeout)
+
+    def validate(self, url: str, target_height: Optional[int] = None) -> ValidationResult:
+        """Valida una URL: lista de reproducción, variantes y primer/último segmento"""
+        result = ValidationResult(url)
+        try:
+            if not is_hls_url(url):
+                self._check_resource(url)
+                return result
+
+            playlist = self.downloader.fetch_media_playlist(url, target_height)
+            self._record_playlist(result, playlist)
+            if not playlist.segments:
+                result.status = STATUS_INVALID
+                result.message = "La lista no contiene segmentos"
+                return result
+
+            segments = playlist.segments[:1] + playlist.segments[-1:] if len(playlist.segments) > 1 \
+                else playlist.segments
+            for segment in segments:
+                self._check_resource(segment.uri, segment)
+        except requests.HTTPError as e:
+            status_code = e.response.status_code if e.response is not None else 0
+            result.status = classify_status_code(status_code)
+            result.message = f"HTTP {status_code}: {e.response.url if e.response is not None else url}"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            result.status = STATUS_UNREACHABLE
+            result.message = str(e)
+        except HLSError as e:
+            result.status = STATUS_INVALID
+            result.message = str(e)
+        except (requests.RequestException, ValueError) as e:
+            result.status = STATUS_ERROR
+            result.message = str(e)
+        return result
+
+    def validate_all(self, urls: List[str], target_height: Optional[int] = None,
+                     on_result: Optional[Callable[[int, ValidationResult], None]] = None,
+                     cancel_token=None) -> List[Optional[ValidationResult]]:
+        """Valida todas las URLs en paralelo; on_result recibe (índice, resultado) al terminar cada una
+
+        Las URLs repetidas se validan una sola vez. Al cancelar no se inician
+        nuevas validaciones y las pendientes quedan como None.
+        """
+        results: List[Optional[ValidationResult]] = [None] * len(urls)
+        positions = {}
+        for index, url in enumerate(urls):
+            positions.setdefault(url, []).append(index)
+        lock = threading.Lock()
+
+        def run(url: str) -> Optional[ValidationResult]:
+            if cancel_token is not None and cancel_token.is_cancelled:
+                return None
+            return self.validate(url, target_height)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(run, url): url for url in positions}
+            for future in as_completed(futures):
+                result = future.result()
+                if result is None:
+                    continue
+                with lock:
+                    for index in positions[futures[future]]:
+                        results[index] = result
+                        if on_result:
+                            on_result(index, result)
+        return results
+
+    def _record_playlist(self, result: ValidationResult, playlist: MediaPlaylist):
+        """Guarda duración, segmentos y variantes de la lista"""
+        result.duration = playlist.total_duration
+        result.segment_count = len(playlist.segments)
+        result.encrypted = playlist.is_encrypted
+        result.variants = [(f"{v.resolution[0]}x{v.resolution[1]}" if v.resolution else "?",
+                            v.bandwidth // 1000) for v in playlist.variants]
+        if playlist.variant:
+            result.variant_height = playlist.variant.height
+
+    def _check_resource(self, url: str, segment: Optional[HLSSegment] = None):
+        """Comprueba que un recurso responde (HEAD y, si el servidor no lo admite, GET de 1 byte)
+
+        Lanza requests.HTTPError si el recurso no está accesible.
+        """
+        response = self.session.head(url, headers=DEFAULT_HEADERS, timeout=self.timeout, allow_redirects=True)
+        response.close()
+        if response.ok:
+            return
+
+        # Muchos CDN (y URLs firmadas solo para GET) rechazan HEAD: pedir el primer byte
+        start = segment.byte_range[1] if segment is not None and segment.byte_range else 0
+        with self.session.get(url, headers=dict(DEFAULT_HEADERS, Range=f"bytes={start}-{start}"), timeout=self.timeout,
+                              stream=True) as response:
+            response.raise_for_status()
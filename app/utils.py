@@ -4,19 +4,34 @@
 Utilidades y funciones auxiliares para el Organizador de Series
 """
 
+import io
+import os
 import subprocess
+import shutil
 import json
-import requests
+import time
+import threading
+from collections import deque
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import IO, List, Dict, Optional, Tuple, Callable
+
+from .metadata_cache import get_metadata_cache, make_key
+from .rate_limit import get_source_limiter, RequestCancelled
+from .http_client import get_http_client
+from .offline_index import get_offline_index
+from .model import EpisodeIndex
+from .process_control import (ProcessRegistry, CancellationToken, StallWatchdog, PRIORITY_MODES,
+                              get_popen_priority_kwargs, apply_priority,
+                              remove_partial_output, terminate_process)
 
 try:
-    from tmdbv3api import TMDb, TV
+    from tmdbv3api import TMDb, TV, Season
     TMDB_AVAILABLE = True
 except ImportError:
     TMDB_AVAILABLE = False
     TMDb = None
     TV = None
+    Season = None
 
 try:
     from jikan_api import JikanAPI, AnimeResult
@@ -26,11 +41,50 @@ except ImportError:
     JikanAPI = None
     AnimeResult = None
 
+# Modos de salida: estándar o reproducibles mientras se escriben (MP4 fragmentado, MKV)
+OUTPUT_MODES = ["standard", "fragmented", "mkv"]
+MP4_SUFFIXES = ('.mp4', '.m4v', '.mov')
+FRAGMENTED_MOVFLAGS = '+frag_keyframe+empty_moov+default_base_moof'
+
+# Espacio reservado para el índice (moov) al copiar streams: así queda al
+# principio en una sola pasada. Se estima por muestra suponiendo el peor caso
+# habitual (video a 60 fps y audio AAC a 48 kHz); si no alcanza, FFmpeg falla
+# y se repite con +faststart
+MOOV_BYTES_PER_SAMPLE = 16
+MOOV_SAMPLES_PER_SECOND = 60 + 48000 / 1024
+MOOV_RESERVE_MARGIN = 64 * 1024
+MOOV_RESERVE_ERROR = "reserved_moov_size is too small"
+
+class CommandResult:
+    """Resultado de una ejecución de FFmpeg"""
+    
+    def __init__(self, return_code: int, output: str = "", stalled: bool = False,
+                 cancelled: bool = False):
+        self.return_code = return_code
+        self.output = output
+        self.stalled = stalled
+        self.cancelled = cancelled
+    
+    @property
+    def success(self) -> bool:
+        return self.return_code == 0 and not self.stalled and not self.cancelled
+
 class FFmpegProcessor:
     """Procesador de video usando FFmpeg"""
     
     def __init__(self, ffmpeg_path: str = None):
         self.ffmpeg_path = ffmpeg_path or self._find_ffmpeg()
+        
+        # Prioridad de ejecución y procesos activos
+        self.priority_mode = "normal"
+        self.background_nice = 10
+        self.background_io_class = "idle"
+        self.process_registry = ProcessRegistry()
+        
+        # Vigilancia de procesos estancados
+        self.stall_timeout = 120
+        self.max_retries = 2
+        self.retry_backoff = 5
     
     def _find_ffmpeg(self) -> Optional[str]:
         """Busca FFmpeg en el sistema"""
@@ -52,6 +106,10 @@ class FFmpegProcessor:
                 return str(ffmpeg_path.absolute())
         
         # Buscar en PATH del sistema
+        system_ffmpeg = shutil.which('ffmpeg')
+        if system_ffmpeg:
+            return system_ffmpeg
+        
         try:
             result = subprocess.run(['where', 'ffmpeg'], 
                                   capture_output=True, text=True, shell=True)
@@ -66,13 +124,257 @@ class FFmpegProcessor:
         """Verifica si FFmpeg está disponible"""
         return self.ffmpeg_path is not None
     
+    def configure_priority(self, mode: str = "normal", nice_value: int = 10,
+                           io_class: str = "idle"):
+        """Configura la prioridad con la que se lanzan los procesos FFmpeg"""
+        self.priority_mode = mode if mode in PRIORITY_MODES else "normal"
+        self.background_nice = nice_value
+        self.background_io_class = io_class
+    
+    def set_priority_mode(self, mode: str) -> Dict[int, bool]:
+        """Cambia el modo de prioridad, también para los procesos en ejecución"""
+        self.configure_priority(mode, self.background_nice, self.background_io_class)
+        return self.process_registry.apply_priority(
+            self.priority_mode, self.background_nice, self.background_io_class
+        )
+    
+    def start_process(self, cmd: List[str], **popen_kwargs) -> subprocess.Popen:
+        """Lanza un proceso FFmpeg con la prioridad configurada y lo registra"""
+        popen_kwargs.update(get_popen_priority_kwargs(self.priority_mode))
+        process = subprocess.Popen(cmd, **popen_kwargs)
+        if self.priority_mode == "background" and os.name != "nt":
+            apply_priority(process.pid, self.priority_mode, self.background_nice, self.background_io_class)
+        self.process_registry.register(process)
+        return process
+    
+    def finish_process(self, process: subprocess.Popen) -> int:
+        """Espera a que termine un proceso y lo quita del registro"""
+        try:
+            return process.wait()
+        finally:
+            self.process_registry.unregister(process)
+    
+    def configure_watchdog(self, stall_timeout: float = 120, max_retries: int = 2,
+                           retry_backoff: float = 5):
+        """Configura la detección de procesos estancados y los reintentos"""
+        self.stall_timeout = stall_timeout
+        self.max_retries = max(int(max_retries), 0)
+        self.retry_backoff = retry_backoff
+    
+    def run_command(self, cmd: List[str], output_path: str = None,
+                    on_output: Optional[Callable[[str], None]] = None,
+                    cancel_token: Optional[CancellationToken] = None,
+                    stall_timeout: Optional[float] = None,
+                    stdin_feeder: Optional[Callable[[IO[bytes]], None]] = None) -> CommandResult:
+        """Ejecuta FFmpeg leyendo su salida línea a línea
+        
+        Si se indica stall_timeout, el proceso se detiene cuando su salida no
+        muestra avance (tiempo o tamaño) durante ese número de segundos.
+        Con stdin_feeder, un hilo escribe la entrada del proceso (-i pipe:0);
+        si el alimentador falla, el proceso se detiene y el resultado es un error.
+        """
+        # stderr se combina con stdout para que nunca se llene un pipe sin leer
+        feed_errors = []
+        if stdin_feeder:
+            process = self.start_process(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.STDOUT)
+            lines = io.TextIOWrapper(process.stdout, errors='replace')
+            threading.Thread(target=self._feed_stdin, args=(process, stdin_feeder, feed_errors),
+                             daemon=True).start()
+        else:
+            process = self.start_process(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                         stderr=subprocess.STDOUT, text=True,
+                                         universal_newlines=True, bufsize=1)
+            lines = process.stdout
+        if cancel_token:
+            cancel_token.attach(process, output_path)
+        watchdog = StallWatchdog(process, stall_timeout).start() if stall_timeout else None
+        
+        tail = deque(maxlen=20)
+        try:
+            for output in lines:
+                line = output.strip()
+                if not line:
+                    continue
+                tail.append(line)
+                if watchdog:
+                    watchdog.feed(line)
+                if on_output:
+                    on_output(line)
+        finally:
+            return_code = self.finish_process(process)
+            if watchdog:
+                watchdog.stop()
+            if cancel_token:
+                cancel_token.detach(process)
+        
+        if feed_errors:
+            # Entrada incompleta: la salida estaría truncada aunque FFmpeg termine bien
+            tail.append(f"Error en la entrada: {feed_errors[0]}")
+            return_code = return_code or 1
+        
+        result = CommandResult(return_code, '\n'.join(tail),
+                               stalled=bool(watchdog and watchdog.stalled),
+                               cancelled=bool(cancel_token and cancel_token.is_cancelled))
+        if (result.cancelled or result.stalled or feed_errors) and output_path:
+            remove_partial_output(output_path)
+        
+        return result
+    
+    def _feed_stdin(self, process: subprocess.Popen, stdin_feeder: Callable[[IO[bytes]], None],
+                    feed_errors: List[Exception]):
+        """Alimenta la entrada del proceso y la cierra al terminar"""
+        try:
+            stdin_feeder(process.stdin)
+        except Exception as e:
+            if process.poll() is None:
+                feed_errors.append(e)
+                terminate_process(process)
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+    
+    def run_with_retries(self, cmd: List[str], output_path: str = None,
+                         on_output: Optional[Callable[[str], None]] = None,
+                         cancel_token: Optional[CancellationToken] = None,
+                         retry_on_error: bool = False,
+                         on_retry: Optional[Callable[[int, CommandResult], None]] = None,
+                         stdin_feeder: Optional[Callable[[IO[bytes]], None]] = None) -> CommandResult:
+        """Ejecuta FFmpeg con vigilancia de estancamiento y reintentos con espera creciente
+        
+        Se reintenta si el proceso se estanca (o si falla, con retry_on_error)
+        hasta max_retries veces antes de dar el trabajo por fallido.
+        """
+        attempt = 0
+        while True:
+            result = self.run_command(cmd, output_path, on_output, cancel_token, self.stall_timeout,
+                                      stdin_feeder)
+            if result.success or result.cancelled:
+                return result
+            
+            # Espacio reservado insuficiente: repetir en el acto con la reubicación clásica
+            if MOOV_RESERVE_ERROR in result.output and '-moov_size' in cmd:
+                print("⚠️ Espacio reservado para el índice insuficiente, usando +faststart")
+                if output_path:
+                    remove_partial_output(output_path)
+                cmd = self._faststart_fallback(cmd)
+                continue
+            if not (result.stalled or retry_on_error) or attempt >= self.max_retries:
+                return result
+            
+            attempt += 1
+            if on_retry:
+                on_retry(attempt, result)
+            if output_path:
+                remove_partial_output(output_path)
+            
+            # Espera exponencial interrumpible por la cancelación
+            delay = self.retry_backoff * (2 ** (attempt - 1))
+            if cancel_token:
+                if cancel_token.wait(delay):
+                    return CommandResult(result.return_code, result.output, cancelled=True)
+            else:
+                time.sleep(delay)
+    
+    def _report_retry(self, attempt: int, result: CommandResult):
+        """Informa de un reintento"""
+        reason = "sin avance" if result.stalled else f"código {result.return_code}"
+        print(f"🔁 Reintento {attempt}/{self.max_retries} ({reason})")
+    
+    def get_progressive_path(self, output_path: str, output_mode: str = "standard") -> str:
+        """Ruta donde FFmpeg escribe durante la conversión (el modo MKV usa su extensión)"""
+        if output_mode == "mkv" and Path(output_path).suffix.lower() in MP4_SUFFIXES:
+            return str(Path(output_path).with_suffix('.mkv'))
+        return output_path
+    
+    def get_output_args(self, output_path: str, output_mode: str = "standard",
+                        copy_duration: float = 0) -> List[str]:
+        """Opciones de contenedor para el modo de salida indicado
+        
+        Los MP4 estándar llevan siempre el índice al principio (faststart).
+        Con copy_duration (duración de una copia de streams) se reserva el
+        espacio del índice y se escribe en una sola pasada, sin reescribir el
+        archivo al terminar.
+        """
+        if Path(output_path).suffix.lower() not in MP4_SUFFIXES:
+            return []
+        if output_mode == "fragmented":
+            return ['-movflags', FRAGMENTED_MOVFLAGS]
+        if output_mode == "standard":
+            if copy_duration > 0:
+                return ['-moov_size', str(self.estimate_moov_size(copy_duration))]
+            return ['-movflags', '+faststart']
+        return []
+    
+    def estimate_moov_size(self, duration: float) -> int:
+        """Bytes a reservar para el índice de un MP4 de la duración indicada"""
+        samples = duration * MOOV_SAMPLES_PER_SECOND
+        return int(samples * MOOV_BYTES_PER_SAMPLE) + MOOV_RESERVE_MARGIN
+    
+    def _faststart_fallback(self, cmd: List[str]) -> List[str]:
+        """Cambia la reserva del índice (-moov_size) por la reubicación con +faststart"""
+        fallback = list(cmd)
+        index = fallback.index('-moov_size')
+        fallback[index:index + 2] = ['-movflags', '+faststart']
+        return fallback
+    
+    def needs_finalize(self, output_path: str, output_mode: str = "standard") -> bool:
+        """Indica si la salida progresiva debe convertirse después en un MP4 normal"""
+        return output_mode in ("fragmented", "mkv") and Path(output_path).suffix.lower() in MP4_SUFFIXES
+    
+    def finalize_output(self, progressive_path: str, output_path: str,
+                        cancel_token: Optional[CancellationToken] = None,
+                        duration: float = 0) -> bool:
+        """Reescribe una salida progresiva (fMP4/MKV) como MP4 normal con faststart
+        
+        Se copian todos los streams sin recodificar y, si se conoce la duración
+        (o puede obtenerse con ffprobe), el índice se escribe al principio en
+        una sola pasada. Se escribe en un temporal que solo sustituye al
+        destino si termina bien; si falla, se conserva la salida progresiva,
+        que sigue siendo reproducible (también al reescribir un archivo sobre
+        sí mismo).
+        """
+        output_file = Path(output_path)
+        temp_path = output_file.with_name(f"{output_file.stem}.finalizing{output_file.suffix}")
+        if not duration:
+            duration = self.get_duration(progressive_path)
+        # Todos los streams (subtítulos, capítulos, adjuntos) y los metadatos del original
+        cmd = [self.ffmpeg_path, '-i', progressive_path, '-map', '0', '-map_metadata', '0', '-c', 'copy']
+        cmd.extend(self.get_output_args(str(temp_path), "standard", duration))
+        cmd.extend(['-y', str(temp_path)])
+        
+        result = self.run_command(cmd, str(temp_path), cancel_token=cancel_token,
+                                  stall_timeout=self.stall_timeout)
+        if not result.success and MOOV_RESERVE_ERROR in result.output:
+            remove_partial_output(str(temp_path))
+            result = self.run_command(self._faststart_fallback(cmd), str(temp_path),
+                                      cancel_token=cancel_token, stall_timeout=self.stall_timeout)
+        if not result.success or not temp_path.exists():
+            remove_partial_output(str(temp_path))
+            return False
+        
+        temp_path.replace(output_file)
+        if Path(progressive_path) != output_file:
+            remove_partial_output(progressive_path)
+        return True
+    
+    def get_ffprobe_path(self) -> Optional[str]:
+        """Obtiene la ruta de ffprobe junto a FFmpeg"""
+        if not self.ffmpeg_path:
+            return None
+        ffmpeg_file = Path(self.ffmpeg_path)
+        probe_name = ffmpeg_file.name.replace('ffmpeg', 'ffprobe')
+        return str(ffmpeg_file.with_name(probe_name))
+    
     def get_video_info(self, file_path: str) -> Dict:
         """Obtiene información del video"""
         if not self.ffmpeg_path:
             return {}
         
         try:
-            ffprobe_path = self.ffmpeg_path.replace('ffmpeg.exe', 'ffprobe.exe')
+            ffprobe_path = self.get_ffprobe_path()
             cmd = [
                 ffprobe_path,
                 '-v', 'quiet',
@@ -92,6 +394,16 @@ class FFmpegProcessor:
         
         return {}
     
+    def get_duration(self, file_path: str) -> float:
+        """Duración en segundos según ffprobe (0 si no se puede obtener)"""
+        ffprobe_path = self.get_ffprobe_path()
+        if not ffprobe_path or not Path(ffprobe_path).exists() and not shutil.which(ffprobe_path):
+            return 0
+        try:
+            return float(self.get_video_info(file_path).get('format', {}).get('duration', 0))
+        except (TypeError, ValueError):
+            return 0
+    
     def get_audio_tracks(self, file_path: str) -> List[Dict]:
         """Obtiene información de las pistas de audio"""
         video_info = self.get_video_info(file_path)
@@ -113,8 +425,15 @@ class FFmpegProcessor:
     
     def convert_video(self, input_path: str, output_path: str, resolution: str = "Original",
                      compression_level: str = "Medium", audio_mode: str = "keep_all",
-                     selected_audio_track: str = "0") -> bool:
-        """Convierte un archivo de video con manejo mejorado de errores y progreso en tiempo real"""
+                     selected_audio_track: str = "0",
+                     cancel_token: Optional[CancellationToken] = None,
+                     output_mode: str = "standard") -> bool:
+        """Convierte un archivo de video con manejo mejorado de errores y progreso en tiempo real
+        
+        El modo "standard" escribe el MP4 con el índice al principio (faststart);
+        output_mode "fragmented" o "mkv" escribe una salida reproducible durante
+        la conversión y al terminar la convierte en un MP4 normal con faststart.
+        """
         if not self.ffmpeg_path:
             print("❌ FFmpeg no está disponible")
             return False
@@ -179,8 +498,10 @@ class FFmpegProcessor:
             # Configurar codec de video
             cmd.extend(['-c:v', 'libx264', '-preset', 'medium'])
             
-            # Archivo de salida
-            cmd.extend(['-y', output_path])
+            # Archivo de salida (progresivo si el modo lo pide)
+            progressive_path = self.get_progressive_path(output_path, output_mode)
+            cmd.extend(self.get_output_args(progressive_path, output_mode))
+            cmd.extend(['-y', progressive_path])
             
             if is_url:
                 print(f"🔄 Iniciando conversión desde URL")
@@ -189,39 +510,40 @@ class FFmpegProcessor:
             print(f"📝 Comando: {' '.join(cmd[:3])} ... [parámetros de conversión]")
             
             # Ejecutar conversión con progreso en tiempo real
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, 
-                                     text=True, universal_newlines=True)
+            progress_info = {}
             
-            # Monitorear progreso
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    line = output.strip()
-                    if line.startswith('frame='):
-                        # Extraer información de progreso
-                        parts = line.split()
-                        frame_info = {}
-                        for part in parts:
-                            if '=' in part:
-                                key, value = part.split('=', 1)
-                                frame_info[key] = value
-                        
-                        if 'frame' in frame_info and 'time' in frame_info:
-                            print(f"⏳ Progreso: frame {frame_info['frame']}, tiempo {frame_info['time']}")
+            def handle_output(line: str):
+                # -progress pipe:1 emite una clave=valor por línea
+                if '=' not in line:
+                    return
+                key, value = line.split('=', 1)
+                progress_info[key.strip()] = value.strip()
+                if key.strip() == 'progress' and 'frame' in progress_info:
+                    print(f"⏳ Progreso: frame {progress_info['frame']}, "
+                          f"tiempo {progress_info.get('out_time', '?')}")
             
-            # Esperar a que termine el proceso
-            return_code = process.wait()
+            result = self.run_with_retries(cmd, progressive_path, handle_output, cancel_token,
+                                           retry_on_error=is_url, on_retry=self._report_retry)
+            
+            if result.cancelled:
+                print(f"🛑 Conversión cancelada: {output_file.name}")
+                return False
             
-            if return_code == 0:
+            if result.success:
+                if self.needs_finalize(output_path, output_mode):
+                    print(f"🎞️ Finalizando con faststart: {output_file.name}")
+                    if not self.finalize_output(progressive_path, output_path, cancel_token):
+                        print(f"⚠️ No se pudo finalizar; se conserva {Path(progressive_path).name}")
+                        return False
                 print(f"✅ Conversión exitosa: {output_file.name}")
                 return True
+            elif result.stalled:
+                print(f"⏰ Conversión estancada sin avance tras {self.max_retries} reintentos")
+                return False
             else:
-                stderr_output = process.stderr.read()
-                print(f"❌ Error en conversión (código {return_code})")
-                if stderr_output:
-                    print(f"📋 Error FFmpeg: {stderr_output[-500:]}")  # Últimos 500 caracteres
+                print(f"❌ Error en conversión (código {result.return_code})")
+                if result.output:
+                    print(f"📋 Error FFmpeg: {result.output[-500:]}")  # Últimos 500 caracteres
                 return False
             
         except Exception as e:
@@ -229,7 +551,8 @@ class FFmpegProcessor:
             return False
     
     def extract_audio(self, input_path: str, output_path: str, 
-                     audio_format: str = "mp3", selected_track: str = "0") -> bool:
+                     audio_format: str = "mp3", selected_track: str = "0",
+                     cancel_token: Optional[CancellationToken] = None) -> bool:
         """Extrae audio de un archivo de video con manejo mejorado de errores y progreso en tiempo real"""
         if not self.ffmpeg_path:
             print("❌ FFmpeg no está disponible")
@@ -286,55 +609,73 @@ class FFmpegProcessor:
             print(f"📝 Formato: {audio_format.upper()}, Pista: {selected_track}")
             
             # Ejecutar extracción con progreso en tiempo real
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, 
-                                     text=True, universal_newlines=True)
+            progress_info = {}
             
-            # Monitorear progreso
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    line = output.strip()
-                    if line.startswith('size='):
-                        # Extraer información de progreso para audio
-                        parts = line.split()
-                        progress_info = {}
-                        for part in parts:
-                            if '=' in part:
-                                key, value = part.split('=', 1)
-                                progress_info[key] = value
-                        
-                        if 'size' in progress_info and 'time' in progress_info:
-                            print(f"⏳ Progreso: tamaño {progress_info['size']}, tiempo {progress_info['time']}")
+            def handle_output(line: str):
+                # -progress pipe:1 emite una clave=valor por línea
+                if '=' not in line:
+                    return
+                key, value = line.split('=', 1)
+                progress_info[key.strip()] = value.strip()
+                if key.strip() == 'progress' and 'total_size' in progress_info:
+                    print(f"⏳ Progreso: tamaño {progress_info['total_size']}, "
+                          f"tiempo {progress_info.get('out_time', '?')}")
+            
+            result = self.run_with_retries(cmd, output_path, handle_output, cancel_token,
+                                           on_retry=self._report_retry)
             
-            # Esperar a que termine el proceso
-            return_code = process.wait()
+            if result.cancelled:
+                print(f"🛑 Extracción cancelada: {output_file.name}")
+                return False
             
-            if return_code == 0:
+            if result.success:
                 print(f"✅ Audio extraído exitosamente: {output_file.name}")
                 return True
+            elif result.stalled:
+                print(f"⏰ Extracción estancada sin avance tras {self.max_retries} reintentos")
+                return False
             else:
-                stderr_output = process.stderr.read()
-                print(f"❌ Error en extracción de audio (código {return_code})")
-                if stderr_output:
-                    print(f"📋 Error FFmpeg: {stderr_output[-500:]}")  # Últimos 500 caracteres
+                print(f"❌ Error en extracción de audio (código {result.return_code})")
+                if result.output:
+                    print(f"📋 Error FFmpeg: {result.output[-500:]}")  # Últimos 500 caracteres
                 return False
             
         except Exception as e:
             print(f"❌ Error inesperado extrayendo audio: {e}")
             return False
 
+# API REST de Jikan (para los listados de episodios, que la librería no pagina)
+JIKAN_API_URL = "https://api.jikan.moe/v4"
+
+
 class MetadataSearcher:
-    """Buscador de metadatos de series"""
+    """Buscador de metadatos de series
     
-    def __init__(self):
+    Con config_manager, las respuestas se guardan en la caché persistente
+    (metadata.cache_metadata / cache_duration_days). Las peticiones a la red
+    pasan por el limitador compartido de cada fuente (app.rate_limit).
+    """
+    
+    def __init__(self, config_manager=None):
         self.tmdb = None
         self.jikan = None
+        self.cache = get_metadata_cache(config_manager)
+        # Índice local importado de volcados (python -m app.offline_index import ...)
+        self.offline_index = get_offline_index(config_manager)
+        self.jikan_api_url = JIKAN_API_URL
+        # Sesión compartida: conexiones persistentes, reintentos y métricas por servidor
+        self.http = get_http_client(config_manager)
+        # Episodios por (fuente, serie, temporada): cada temporada se pide una sola vez
+        self._season_episodes: Dict[Tuple[str, str, int], List[Dict]] = {}
+        self._season_lock = threading.Lock()
         
         if TMDB_AVAILABLE:
             try:
-                self.tmdb = TMDb()
+                try:
+                    self.tmdb = TMDb(session=self.http)
+                except TypeError:
+                    # Versiones de tmdbv3api sin sesión configurable
+                    self.tmdb = TMDb()
                 # Aquí deberías configurar tu API key de TMDB
                 # self.tmdb.api_key = 'tu_api_key_aqui'
             except:
@@ -346,87 +687,265 @@ class MetadataSearcher:
             except:
                 pass
     
+    def _cached(self, source: str, kind: str, query, fetch: Callable[[], object], cancel_token=None):
+        """Respuesta desde la caché o llamando a fetch (que lanza excepción si falla)
+        
+        Las consultas idénticas simultáneas comparten una sola llamada y las que
+        llegan a la red respetan el límite de peticiones de la fuente. Con
+        cancel_token, la espera de turno se abandona al cancelarse
+        (RequestCancelled).
+        """
+        limiter = get_source_limiter(source)
+        key = make_key(source, kind, query)
+        
+        def network():
+            return limiter.call(fetch, cancel_token)
+        
+        def run():
+            if self.cache is None:
+                return limiter.run(key, network)
+            return limiter.run(key, lambda: self.cache.get_or_fetch(key, network))
+        
+        try:
+            return run()
+        except RequestCancelled:
+            if cancel_token is not None and cancel_token.is_cancelled:
+                raise
+            # Se unió a una precarga que se canceló: se repite por cuenta propia
+            return run()
+    
+    def peek_cached(self, source: str, kind: str, query):
+        """Respuesta guardada utilizable (fresca o vencida), sin acceder a la red"""
+        if self.cache is None:
+            return None
+        entry = self.cache.get(make_key(source, kind, query))
+        if entry is None or entry[1] >= self.cache.ttl + self.cache.stale_ttl:
+            return None
+        return entry[0]
+    
+    def get_cache_stats(self) -> Optional[Dict]:
+        """Métricas de la caché de metadatos (None si está desactivada)"""
+        return self.cache.stats() if self.cache else None
+    
+    def get_http_stats(self) -> Dict[str, Dict[str, float]]:
+        """Latencia media/máxima, bytes/s y errores de cada servidor consultado"""
+        return self.http.stats()
+    
+    def get_rate_limit_stats(self, source: str) -> Dict:
+        """Peticiones, segundos de espera, respuestas 429 y llamadas agrupadas de una fuente"""
+        return get_source_limiter(source).stats()
+    
+    def search(self, query: str, source: str = "tmdb") -> List[Dict]:
+        """Busca en la fuente indicada ("tmdb", "jikan" u "offline")"""
+        searches = {"tmdb": self.search_tmdb, "jikan": self.search_jikan, "offline": self.search_offline}
+        search = searches.get(source)
+        return search(query) if search else []
+    
     def search_tmdb(self, query: str) -> List[Dict]:
         """Busca series en TMDB"""
         if not self.tmdb or not TMDB_AVAILABLE:
             return []
         
         try:
-            tv = TV()
-            results = tv.search(query)
-            
-            formatted_results = []
-            for result in results[:10]:  # Limitar a 10 resultados
-                formatted_result = {
-                    'id': result.id,
-                    'name': result.name,
-                    'original_name': result.original_name,
-                    'overview': result.overview,
-                    'first_air_date': result.first_air_date,
-                    'vote_average': result.vote_average,
-                    'poster_path': result.poster_path
-                }
-                formatted_results.append(formatted_result)
-            
-            return formatted_results
-            
+            return self._cached("tmdb", "search", query, lambda: self._fetch_tmdb_search(query))
         except Exception as e:
             print(f"Error buscando en TMDB: {e}")
             return []
     
+    def _fetch_tmdb_search(self, query: str) -> List[Dict]:
+        tv = TV()
+        results = tv.search(query)
+        
+        formatted_results = []
+        for result in results[:10]:  # Limitar a 10 resultados
+            formatted_result = {
+                'id': result.id,
+                'name': result.name,
+                'original_name': result.original_name,
+                'overview': result.overview,
+                'first_air_date': result.first_air_date,
+                'vote_average': result.vote_average,
+                'poster_path': result.poster_path,
+                'backdrop_path': getattr(result, 'backdrop_path', None)
+            }
+            formatted_results.append(formatted_result)
+        
+        return formatted_results
+    
     def search_jikan(self, query: str) -> List[Dict]:
         """Busca anime en Jikan (MyAnimeList)"""
         if not self.jikan or not JIKAN_AVAILABLE:
             return []
         
         try:
-            results = self.jikan.search_anime(query, limit=10)
-            
-            formatted_results = []
-            for result in results:
-                formatted_result = {
-                    'id': result.mal_id,
-                    'title': result.title,
-                    'title_english': result.title_english,
-                    'synopsis': result.synopsis,
-                    'year': result.year,
-                    'score': result.score,
-                    'episodes': result.episodes,
-                    'status': result.status,
-                    'image_url': result.image_url
-                }
-                formatted_results.append(formatted_result)
-            
-            return formatted_results
-            
+            return self._cached("jikan", "search", query, lambda: self._fetch_jikan_search(query))
         except Exception as e:
             print(f"Error buscando en Jikan: {e}")
             return []
     
-    def get_tmdb_details(self, series_id: int) -> Optional[Dict]:
+    def _fetch_jikan_search(self, query: str) -> List[Dict]:
+        results = self.jikan.search_anime(query, limit=10)
+        
+        formatted_results = []
+        for result in results:
+            formatted_result = {
+                'id': result.mal_id,
+                'title': result.title,
+                'title_english': result.title_english,
+                'synopsis': result.synopsis,
+                'year': result.year,
+                'score': result.score,
+                'episodes': result.episodes,
+                'status': result.status,
+                'image_url': result.image_url
+            }
+            formatted_results.append(formatted_result)
+        
+        return formatted_results
+    
+    def search_offline(self, query: str) -> List[Dict]:
+        """Busca en el índice local (sin red); cada resultado indica su fuente en 'source'"""
+        if not self.offline_index:
+            return []
+        
+        try:
+            return self.offline_index.search(query)
+        except Exception as e:
+            print(f"Error buscando en el índice local: {e}")
+            return []
+    
+    def get_details(self, source: str, item_id, cancel_token=None) -> Optional[Dict]:
+        """Detalles completos de un resultado de "tmdb" o "jikan" """
+        if source == "tmdb":
+            return self.get_tmdb_details(item_id, cancel_token)
+        if source == "jikan":
+            return self.get_jikan_details(item_id, cancel_token)
+        return None
+    
+    def get_tmdb_details(self, series_id: int, cancel_token=None) -> Optional[Dict]:
         """Obtiene detalles completos de una serie de TMDB"""
         if not self.tmdb or not TMDB_AVAILABLE:
             return None
         
         try:
-            tv = TV()
-            details = tv.details(series_id)
-            return details.__dict__
+            return self._cached("tmdb", "details", series_id,
+                                lambda: to_plain_data(TV().details(series_id)), cancel_token)
+        except RequestCancelled:
+            return None
         except Exception as e:
             print(f"Error obteniendo detalles de TMDB: {e}")
             return None
     
-    def get_jikan_details(self, anime_id: int) -> Optional[Dict]:
+    def get_jikan_details(self, anime_id: int, cancel_token=None) -> Optional[Dict]:
         """Obtiene detalles completos de un anime de Jikan"""
         if not self.jikan or not JIKAN_AVAILABLE:
             return None
         
         try:
-            details = self.jikan.get_anime_details(anime_id)
-            return details.__dict__ if details else None
+            def fetch():
+                details = self.jikan.get_anime_details(anime_id)
+                return to_plain_data(details) if details else None
+            return self._cached("jikan", "details", anime_id, fetch, cancel_token)
+        except RequestCancelled:
+            return None
         except Exception as e:
             print(f"Error obteniendo detalles de Jikan: {e}")
             return None
+    
+    def get_tmdb_season(self, series_id, season_number: int) -> List[Dict]:
+        """Episodios de una temporada de TMDB (número, título, fecha y sinopsis)"""
+        if not self.tmdb or not TMDB_AVAILABLE:
+            return []
+        
+        def fetch():
+            details = to_plain_data(Season().details(series_id, season_number))
+            return [{
+                'episode_number': episode.get('episode_number'),
+                'name': episode.get('name', ''),
+                'air_date': episode.get('air_date', ''),
+                'overview': episode.get('overview', '')
+            } for episode in details.get('episodes', [])]
+        
+        return self._season_cached("tmdb", series_id, season_number,
+                                   lambda: self._cached("tmdb", "season", f"{series_id}/{season_number}", fetch))
+    
+    def get_jikan_episodes(self, anime_id) -> List[Dict]:
+        """Episodios de un anime de Jikan (la API los pagina de 100 en 100)"""
+        def fetch_page(page):
+            response = self.http.get(f"{self.jikan_api_url}/anime/{anime_id}/episodes",
+                                     params={'page': page})
+            response.raise_for_status()
+            return response.json()
+        
+        def fetch_all():
+            episodes = []
+            page = 1
+            while True:
+                data = self._cached("jikan", "episodes", f"{anime_id}/{page}",
+                                    lambda: fetch_page(page))
+                for episode in data.get('data', []):
+                    episodes.append({
+                        'episode_number': episode.get('mal_id'),
+                        'name': episode.get('title') or '',
+                        'air_date': (episode.get('aired') or '')[:10],
+                        'absolute_number': episode.get('mal_id')
+                    })
+                if not data.get('pagination', {}).get('has_next_page'):
+                    return episodes
+                page += 1
+        
+        return self._season_cached("jikan", anime_id, 1, fetch_all)
+    
+    def _season_cached(self, source: str, series_id, season_number: int,
+                       fetch: Callable[[], List[Dict]]) -> List[Dict]:
+        """Episodios de una temporada, pedidos una sola vez por sesión (los errores no se guardan)"""
+        key = (source, str(series_id), season_number)
+        with self._season_lock:
+            if key in self._season_episodes:
+                return self._season_episodes[key]
+        try:
+            episodes = fetch()
+        except Exception as e:
+            print(f"Error obteniendo episodios de {source.upper()}: {e}")
+            return []
+        with self._season_lock:
+            self._season_episodes[key] = episodes
+        return episodes
+    
+    def get_episode_index(self, source: str, series_id, season_number: int,
+                          absolute: bool = False) -> EpisodeIndex:
+        """Índice de títulos para nombrar una temporada completa
+        
+        Con absolute=True (anime numerado de forma absoluta) se cargan todas las
+        temporadas regulares de TMDB para traducir el número absoluto. En Jikan
+        cada entrada es una temporada y sus episodios ya vienen numerados.
+        """
+        index = EpisodeIndex()
+        if source == "jikan":
+            index.add_season(season_number, self.get_jikan_episodes(series_id))
+            return index
+        
+        seasons = [season_number]
+        if absolute:
+            details = self.get_tmdb_details(series_id) or {}
+            seasons = sorted({season.get('season_number') for season in details.get('seasons', [])
+                              if season.get('season_number')} | {season_number})
+        for number in seasons:
+            index.add_season(number, self.get_tmdb_season(series_id, number))
+        return index
+
+
+def to_plain_data(value):
+    """Convierte objetos de las librerías de metadatos en dict/list simples (serializables)"""
+    if isinstance(value, dict):
+        return {str(key): to_plain_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain_data(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, '__dict__'):
+        return {key: to_plain_data(item) for key, item in vars(value).items() if not key.startswith('_')}
+    return str(value)
 
 class FileUtils:
     """Utilidades para manejo de archivos"""
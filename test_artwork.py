@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para la descarga de imágenes de Jellyfin
+"""
+
+import io
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from PIL import Image
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.artwork import ArtworkCache, ArtworkFetcher, plan_artwork
+from app.config import ConfigManager
+from app.controller import SeriesController
+from app.model import SeriesMetadata
+from test_hls_downloader import StandInServer
+
+
+def _image(size, image_format, color):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+POSTER = _image((800, 1200), "JPEG", (200, 30, 30))
+FANART = _image((1920, 1080), "PNG", (30, 30, 200))
+SEASON = _image((600, 900), "JPEG", (30, 200, 30))
+
+
+def test_content_addressed_cache():
+    """Una imagen se guarda una vez por contenido, con miniatura, y no se vuelve a descargar"""
+    print("🧪 Probando caché de imágenes...")
+    server = StandInServer({'/a/poster.jpg': POSTER, '/b/same.jpg': POSTER, '/page.html': b'<html>'})
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ArtworkCache(temp_dir)
+            first = cache.fetch(server.url + '/a/poster.jpg')
+            second = cache.fetch(server.url + '/b/same.jpg')
+            assert first == second and first.suffix == '.jpg'
+            assert len(list((Path(temp_dir) / "blobs").rglob("*.jpg"))) == 1
+            with Image.open(cache.thumbnail_path(first.name)) as thumbnail:
+                assert thumbnail.size[0] <= 300 and thumbnail.size[1] <= 450
+
+            try:
+                cache.fetch(server.url + '/page.html')
+                assert False, "Una página HTML no es una imagen"
+            except ValueError:
+                pass
+
+            requests_before = len(server.requests)
+            reopened = ArtworkCache(temp_dir)
+            assert reopened.fetch(server.url + '/a/poster.jpg') == first
+            assert len(server.requests) == requests_before
+    finally:
+        server.close()
+    print("✅ Un blob por contenido, miniatura creada, sin descargas repetidas")
+    return True
+
+
+def test_background_download_into_folders():
+    """Las imágenes deben descargarse en paralelo sin bloquear y acabar en las carpetas Jellyfin"""
+    print("🧪 Probando descarga en segundo plano...")
+    files = {'/p/poster.bin': POSTER, '/p/fanart.bin': FANART, '/p/season1.bin': SEASON}
+    server = StandInServer(files, delay=0.3)
+    details = {'poster_path': '/poster.bin', 'backdrop_path': '/fanart.bin',
+               'seasons': [{'season_number': 0, 'poster_path': '/otra.bin'},
+                           {'season_number': 1, 'poster_path': '/season1.bin'}]}
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = ConfigManager(str(Path(temp_dir) / "config.json"))
+            config.set("metadata", "tmdb_image_url", server.url + "/p")
+            controller = SeriesController(config)
+            controller.apply_metadata({'id': 1396, 'name': 'Breaking Bad', 'first_air_date': '2008-01-20',
+                                       'poster_path': '/poster.bin'}, "tmdb")
+            controller.update_series_metadata(season="1")
+
+            work_dir = Path(temp_dir) / "Breaking Bad (2008) [tmdbid-1396]" / "Season 01"
+            work_dir.mkdir(parents=True)
+            with mock.patch.object(controller.metadata_searcher, "get_tmdb_details", return_value=details):
+                start = time.monotonic()
+                assert controller.start_artwork_download(work_dir, jellyfin_structure=True)
+                assert time.monotonic() - start < 0.1, "No debe bloquear el procesamiento"
+                assert controller.artwork_fetcher.wait(timeout=10)
+
+            series_dir = work_dir.parent
+            assert (series_dir / "poster.jpg").read_bytes() == POSTER
+            # Caché por defecto junto a la configuración, no en el directorio actual
+            assert controller.artwork_fetcher.cache.cache_dir == Path(temp_dir) / "artwork_cache"
+            assert (series_dir / "fanart.png").read_bytes() == FANART
+            assert (work_dir / "poster.jpg").read_bytes() == SEASON
+            # Descargas simultáneas: las 3 imágenes no suman 3 × 0.3 s
+            assert time.monotonic() - start < 0.8
+            controller.metadata_searcher.cache.close()
+    finally:
+        server.close()
+    print("✅ Póster, fanart y póster de temporada guardados en paralelo")
+    return True
+
+
+def test_plan_and_existing_files():
+    """Jikan solo aporta póster y las imágenes existentes no se sobrescriben"""
+    print("🧪 Probando plan de imágenes...")
+    metadata = SeriesMetadata(name="Naruto")
+    metadata.jikan_data = {'id': 20, 'image_url': 'https://cdn.myanimelist.net/images/anime/13/17405.jpg'}
+    jobs = plan_artwork(metadata, None, Path("/series"), Path("/series/Season 01"), 1)
+    assert jobs == [('https://cdn.myanimelist.net/images/anime/13/17405.jpg', Path("/series/poster"))]
+    assert plan_artwork(SeriesMetadata(name="Sin datos"), None, Path("/s"), None, 1) == []
+
+    server = StandInServer({'/poster.jpg': POSTER})
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            existing = Path(temp_dir) / "poster.png"
+            existing.write_bytes(FANART)
+            fetcher = ArtworkFetcher(ArtworkCache(str(Path(temp_dir) / "cache")))
+            futures = fetcher.submit([(server.url + '/poster.jpg', Path(temp_dir) / "poster")])
+            assert futures[0].result(timeout=5) == existing
+            assert existing.read_bytes() == FANART and not server.requests
+            fetcher.submit([(server.url + '/poster.jpg', Path(temp_dir) / "poster")], overwrite=True)
+            assert fetcher.wait(timeout=5)
+            assert (Path(temp_dir) / "poster.jpg").read_bytes() == POSTER
+            fetcher.shutdown()
+    finally:
+        server.close()
+    print("✅ Plan correcto y archivos existentes respetados")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_content_addressed_cache,
+        test_background_download_into_folders,
+        test_plan_and_existing_files
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para la limitación de ancho de banda (token bucket)
+Usa un servidor HTTP local como sustituto de un origen HLS real
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.bandwidth import TokenBucket, BandwidthLimiter, mbps_to_bytes
+from app.hls import HLSDownloader
+from app.process_control import CancellationToken
+from test_hls_downloader import StandInServer
+
+KB = 1024
+
+
+def _consume(bucket, total, chunk=64 * KB, cancel_token=None):
+    """Consume 'total' bytes en bloques y retorna el tiempo empleado"""
+    start = time.monotonic()
+    for _ in range(total // chunk):
+        if not bucket.consume(chunk, cancel_token):
+            break
+    return time.monotonic() - start
+
+
+def test_token_bucket_rate():
+    """El caudal medio debe coincidir con el límite tras la ráfaga inicial"""
+    print("🧪 Probando caudal de la cubeta...")
+    bucket = TokenBucket(1024 * KB)
+    # 512 KB de ráfaga + 1024 KB a 1 MB/s ≈ 1 s
+    elapsed = _consume(bucket, 1536 * KB)
+    assert 0.8 < elapsed < 1.4, f"Tiempo inesperado: {elapsed:.2f}s"
+    assert _consume(TokenBucket(0), 100 * 1024 * KB) < 0.1
+    assert mbps_to_bytes(8) == 1000000
+    print(f"✅ 1.5 MB a 1 MB/s en {elapsed:.2f}s")
+    return True
+
+
+def test_runtime_rate_change_and_cancel():
+    """Un cambio de límite o una cancelación deben liberar las esperas en curso"""
+    print("🧪 Probando cambio de límite y cancelación...")
+    bucket = TokenBucket(64 * KB)
+    done = threading.Event()
+
+    def slow_consumer():
+        # Sin cambios tardaría unos 10 s
+        bucket.consume(640 * KB + 32 * KB)
+        done.set()
+
+    threading.Thread(target=slow_consumer, daemon=True).start()
+    time.sleep(0.2)
+    start = time.monotonic()
+    bucket.set_rate(0)
+    assert done.wait(1.0), "El cambio de límite no liberó la espera"
+    assert time.monotonic() - start < 0.5
+
+    token = CancellationToken()
+    bucket.set_rate(64 * KB)
+    threading.Timer(0.2, token.cancel).start()
+    start = time.monotonic()
+    assert not bucket.consume(640 * KB, token)
+    assert time.monotonic() - start < 0.6
+    print("✅ Esperas liberadas al cambiar el límite o cancelar")
+    return True
+
+
+def test_downloader_respects_global_and_episode_limits():
+    """Las descargas de segmentos deben respetar el límite por episodio y el global"""
+    print("🧪 Probando límites en el descargador HLS...")
+    segment_size = 128 * KB
+    lines = ["#EXTM3U", "#EXT-X-TARGETDURATION:4"]
+    files = {}
+    for i in range(4):
+        lines += ["#EXTINF:4.0,", f"seg{i}.ts"]
+        files[f"/show/seg{i}.ts"] = bytes([i]) * segment_size
+    lines.append("#EXT-X-ENDLIST")
+    files["/show/index.m3u8"] = "\n".join(lines).encode()
+    server = StandInServer(files)
+
+    def download(limiter, work_dir):
+        downloader = HLSDownloader(max_workers=4, timeout=5, throttle=limiter.episode_throttle())
+        try:
+            downloader.download(f"{server.url}/show/index.m3u8", work_dir)
+        finally:
+            downloader.session.close()
+
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Por episodio: 256 KB/s; 512 KB = 128 KB de ráfaga + 384 KB ≈ 1.5 s
+            limiter = BandwidthLimiter(episode_rate=256 * KB)
+            start = time.monotonic()
+            download(limiter, Path(temp_dir) / "ep1")
+            episode_elapsed = time.monotonic() - start
+            assert 1.2 < episode_elapsed < 2.5, f"Tiempo inesperado: {episode_elapsed:.2f}s"
+
+            # Global: 512 KB/s compartidos por dos episodios (1 MB) ≈ 1.5 s
+            limiter = BandwidthLimiter(global_rate=512 * KB)
+            start = time.monotonic()
+            threads = [threading.Thread(target=download, args=(limiter, Path(temp_dir) / f"g{n}"))
+                       for n in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            global_elapsed = time.monotonic() - start
+            assert 1.2 < global_elapsed < 2.5, f"Tiempo inesperado: {global_elapsed:.2f}s"
+            assert (Path(temp_dir) / "g1" / "seg_00003.ts").stat().st_size == segment_size
+    finally:
+        server.close()
+    print(f"✅ Episodio en {episode_elapsed:.2f}s, dos episodios con límite global en {global_elapsed:.2f}s")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_token_bucket_rate,
+        test_runtime_rate_change_and_cancel,
+        test_downloader_respects_global_and_episode_limits
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para el planificador previo de lotes
+Verifica estimaciones de tamaño/tiempo y el recorte por falta de espacio
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.config import ConfigManager
+from app.controller import SeriesController
+from app.model import VideoFile
+from app.planner import BatchPlanner, BatchPlan, PlannedJob, SpeedHistory
+
+
+class FakeProbe:
+    """Sustituto de FFmpegProcessor que devuelve información fija de ffprobe"""
+
+    def get_video_info(self, file_path):
+        return {
+            'format': {'duration': '1440.0'},
+            'streams': [
+                {'codec_type': 'video', 'width': 1920, 'height': 1080,
+                 'avg_frame_rate': '24000/1001', 'bit_rate': '8000000'},
+                {'codec_type': 'audio', 'bit_rate': '192000',
+                 'sample_rate': '48000', 'channels': 2}
+            ]
+        }
+
+
+def _make_files(temp_path, count, size):
+    files = []
+    for i in range(count):
+        file_path = temp_path / f"episode_{i + 1}.mkv"
+        file_path.write_bytes(b"\0" * size)
+        files.append(VideoFile(str(file_path)))
+    return files
+
+
+def test_rename_is_exact():
+    """La copia debe estimar exactamente el tamaño de origen"""
+    print("🧪 Probando estimación exacta de copia...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        history = SpeedHistory(str(temp_path / "history.json"))
+        planner = BatchPlanner(FakeProbe(), history, reserve_mb=0)
+        files = _make_files(temp_path, 3, 4096)
+
+        plan = planner.plan(files, temp_dir, "rename")
+
+        assert plan.total_bytes == 3 * 4096
+        assert all(job.exact for job in plan.jobs)
+        assert plan.fits
+    print("✅ Estimación de copia correcta")
+    return True
+
+
+def test_convert_estimate_scales_with_resolution():
+    """Una resolución menor debe producir una estimación menor"""
+    print("🧪 Probando estimación de conversión...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        history = SpeedHistory(str(temp_path / "history.json"))
+        planner = BatchPlanner(FakeProbe(), history, reserve_mb=0)
+        files = _make_files(temp_path, 1, 1024)
+
+        full = planner.plan(files, temp_dir, "convert", "Original", "Medium").jobs[0]
+        small = planner.plan(files, temp_dir, "convert", "480p", "Medium").jobs[0]
+
+        assert full.duration == 1440.0
+        assert 0 < small.estimated_bytes < full.estimated_bytes
+        # Sin historial se asume tiempo real (1x)
+        assert abs(full.estimated_seconds - 1440.0) < 1
+    print("✅ Estimación de conversión coherente")
+    return True
+
+
+def test_speed_history_is_used():
+    """El historial de velocidad debe ajustar el tiempo estimado"""
+    print("🧪 Probando historial de velocidad...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        history = SpeedHistory(str(temp_path / "history.json"))
+        key = SpeedHistory.make_key("convert", "720p", "Medium")
+        history.record(key, 1440.0, 360.0)
+
+        # Recargar desde disco
+        reloaded = SpeedHistory(str(temp_path / "history.json"))
+        assert abs(reloaded.get_speed(key) - 4.0) < 0.01
+
+        planner = BatchPlanner(FakeProbe(), reloaded, reserve_mb=0)
+        files = _make_files(temp_path, 1, 1024)
+        job = planner.plan(files, temp_dir, "convert", "720p", "Medium").jobs[0]
+        assert abs(job.estimated_seconds - 360.0) < 1
+    print("✅ Historial de velocidad aplicado")
+    return True
+
+
+def test_failed_plan_does_not_reuse_previous_batch():
+    """Si la estimación falla no deben registrarse velocidades del lote anterior"""
+    print("🧪 Probando fallo del plan tras un lote anterior...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        controller = SeriesController(ConfigManager(str(temp_path / "config.json")))
+        controller.speed_history = SpeedHistory(str(temp_path / "history.json"))
+        controller.model.video_files = _make_files(temp_path, 2, 1024)
+        previous = BatchPlan([PlannedJob("ep1", duration=1440.0), PlannedJob("ep2", duration=1440.0)],
+                             free_bytes=10 ** 9)
+        args = ("convert", temp_dir, "720p", "Medium", "keep_all", "0", "mp3")
+
+        with mock.patch.object(controller, "plan_batch", return_value=previous):
+            assert controller._run_preflight(*args) == 2
+        assert controller.current_plan is previous
+
+        with mock.patch.object(controller, "plan_batch", side_effect=OSError("ffprobe no disponible")):
+            assert controller._run_preflight(*args) == 2
+        assert controller.current_plan is None
+
+        key = SpeedHistory.make_key("convert", "720p", "Medium")
+        controller._record_speed(key, 0, "convert", 360.0)
+        assert controller.speed_history.get_speed(key) is None
+        assert not (temp_path / "history.json").exists()
+        controller.metadata_searcher.cache.close()
+    print("✅ Sin plan no se registran velocidades")
+    return True
+
+
+def test_trim_when_disk_is_full():
+    """El plan debe detectar falta de espacio y recortar en orden"""
+    print("🧪 Probando recorte por falta de espacio...")
+    jobs = [PlannedJob(f"ep{i}", estimated_bytes=100) for i in range(5)]
+    plan = BatchPlan(jobs, free_bytes=350, reserve_bytes=50)
+
+    assert not plan.fits
+    assert plan.fitting_count == 3
+    trimmed = plan.trim()
+    assert len(trimmed.jobs) == 3 and trimmed.fits
+    assert any("Faltan" in line for line in plan.format_report())
+    print("✅ Recorte correcto")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_rename_is_exact,
+        test_convert_estimate_scales_with_resolution,
+        test_speed_history_is_used,
+        test_failed_plan_does_not_reuse_previous_batch,
+        test_trim_when_disk_is_full
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para la importación de listas de episodios (M3U, URLs, CSV)
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.episode_import import import_episodes, save_episode_list, EpisodeImportError
+
+
+def test_import_m3u_and_url_list():
+    """Debe leer nombres de #EXTINF, descartar duplicados y numerar desde el inicio"""
+    print("🧪 Probando importación M3U y lista de URLs...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        m3u = Path(temp_dir) / "serie.m3u"
+        m3u.write_text("﻿#EXTM3U\n"
+                       "#EXTINF:-1 tvg-id=\"x\",Capítulo uno\n"
+                       "https://cdn.example/ep1/index.m3u8\n"
+                       "\n"
+                       "#EXTINF:-1,Capítulo dos\n"
+                       "https://cdn.example/ep2/index.m3u8\n"
+                       "https://cdn.example/ep1/index.m3u8\n"
+                       "not-a-url\n", encoding="utf-8")
+        existing = [{'number': '05', 'name': 'Previo', 'url': 'https://cdn.example/ep2/index.m3u8'}]
+        imported, duplicates = import_episodes(str(m3u), start_number=5, existing=existing)
+        assert [e['url'] for e in imported] == ["https://cdn.example/ep1/index.m3u8"]
+        assert imported[0] == {'number': '06', 'name': 'Capítulo uno',
+                               'url': 'https://cdn.example/ep1/index.m3u8'}
+        assert duplicates == 2
+
+        urls = Path(temp_dir) / "urls.txt"
+        urls.write_text("# episodios\nhttps://a/1.m3u8 Piloto\nhttps://a/2.m3u8\n", encoding="utf-8")
+        imported, _ = import_episodes(str(urls), start_number=1)
+        assert [(e['number'], e['name']) for e in imported] == [("01", "Piloto"), ("02", "Episodio 2")]
+
+        hls = Path(temp_dir) / "stream.m3u8"
+        hls.write_text("#EXTM3U\n#EXT-X-TARGETDURATION:4\n#EXTINF:4.0,\nseg0.ts\n", encoding="utf-8")
+        try:
+            import_episodes(str(hls))
+            assert False, "Una lista HLS no debe importarse como episodios"
+        except EpisodeImportError:
+            pass
+    print("✅ M3U y lista de URLs importadas")
+    return True
+
+
+def test_import_csv():
+    """Debe aceptar CSV con encabezado en cualquier orden o sin encabezado"""
+    print("🧪 Probando importación CSV...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with_header = Path(temp_dir) / "lista.csv"
+        with_header.write_text("number,url,name\n"
+                               "10,https://a/10.m3u8,\"Diez, el regreso\"\n"
+                               ",https://a/11.m3u8,\n", encoding="utf-8")
+        imported, _ = import_episodes(str(with_header), start_number=1)
+        assert imported == [
+            {'number': '10', 'name': 'Diez, el regreso', 'url': 'https://a/10.m3u8'},
+            {'number': '11', 'name': 'Episodio 11', 'url': 'https://a/11.m3u8'}
+        ]
+
+        positional = Path(temp_dir) / "sin_encabezado.csv"
+        positional.write_text("https://a/1.m3u8;Uno;3\nhttps://a/2.m3u8;Dos\n", encoding="utf-8")
+        imported, _ = import_episodes(str(positional), start_number=1)
+        assert [(e['number'], e['name']) for e in imported] == [("03", "Uno"), ("04", "Dos")]
+
+        # Un número explícito menor que el contador no hace saltar el siguiente
+        lower = Path(temp_dir) / "repetido.csv"
+        lower.write_text("url,number\nhttps://a/e1.m3u8,\nhttps://a/e2.m3u8,\n"
+                         "https://a/e1b.m3u8,1\nhttps://a/e3.m3u8,\n", encoding="utf-8")
+        imported, _ = import_episodes(str(lower), start_number=1)
+        assert [e['number'] for e in imported] == ["01", "02", "01", "03"]
+    print("✅ CSV importado")
+    return True
+
+
+def test_import_large_list_in_batches():
+    """Miles de entradas deben importarse rápido y entregarse por lotes"""
+    print("🧪 Probando importación de una lista grande...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        m3u = Path(temp_dir) / "grande.m3u8"
+        with open(m3u, "w", encoding="utf-8") as f:
+            f.write("#EXTM3U\n")
+            for i in range(5000):
+                f.write(f"#EXTINF:-1,Episodio {i}\nhttps://cdn.example/{i % 4000}/index.m3u8\n")
+        batches = []
+        start = time.monotonic()
+        imported, duplicates = import_episodes(str(m3u), on_batch=lambda batch: batches.append(len(batch)),
+                                               batch_size=500)
+        elapsed = time.monotonic() - start
+        assert len(imported) == 4000 and duplicates == 1000
+        assert sum(batches) == 4000 and max(batches) == 500
+        assert imported[-1]['number'] == "4000"
+        assert elapsed < 2.0, f"Importación demasiado lenta: {elapsed:.2f}s"
+    print(f"✅ 5000 entradas leídas en {elapsed:.2f}s")
+    return True
+
+
+def test_atomic_save():
+    """Un fallo al guardar no debe dañar la lista existente ni dejar temporales"""
+    print("🧪 Probando guardado atómico...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        target = Path(temp_dir) / "episodios.json"
+        episodes = [{'number': '01', 'name': 'Piloto', 'url': 'https://a/1.m3u8'}]
+        save_episode_list(str(target), episodes)
+        assert json.loads(target.read_text(encoding="utf-8")) == episodes
+
+        with mock.patch("app.episode_import.json.dump", side_effect=OSError("disco lleno")):
+            try:
+                save_episode_list(str(target), episodes * 2)
+                assert False, "El error debe propagarse"
+            except OSError:
+                pass
+        assert json.loads(target.read_text(encoding="utf-8")) == episodes
+        assert [p.name for p in Path(temp_dir).iterdir()] == ["episodios.json"]
+    print("✅ Lista conservada tras un guardado fallido")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_import_m3u_and_url_list,
+        test_import_csv,
+        test_import_large_list_in_batches,
+        test_atomic_save
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para los títulos de episodios por temporada
+"""
+
+import os
+import sys
+import json
+import threading
+from types import SimpleNamespace
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.model import EpisodeIndex, SeriesMetadata
+from app.utils import MetadataSearcher
+from app.controller import SeriesController
+
+
+def _episodes(count, prefix):
+    return [{'episode_number': n, 'name': f"{prefix} {n}"} for n in range(1, count + 1)]
+
+
+def _tmdb_season(series_id, season_number):
+    count = {1: 12, 2: 13}[season_number]
+    episodes = [SimpleNamespace(episode_number=n, name=f"T{season_number} cap {n}", air_date="",
+                                overview="") for n in range(1, count + 1)]
+    return SimpleNamespace(season_number=season_number, episodes=episodes)
+
+
+def test_index_and_episode_names():
+    """Los títulos deben aparecer en el nombre, también con numeración absoluta"""
+    print("🧪 Probando índice de episodios y nombres...")
+    index = EpisodeIndex()
+    index.add_season(2, _episodes(13, "Segunda"))
+    index.add_season(1, _episodes(12, "Primera"))
+    index.add_season(0, _episodes(2, "Especial"))
+    index.add_season(1, _episodes(12, "Primera") + [{'episode_number': 'x', 'name': 'roto'}])
+    assert len(index) == 27
+    assert index.resolve_absolute(12) == (1, 12)
+    assert index.resolve_absolute(14) == (2, 2)
+    assert index.resolve_absolute(26) is None
+
+    metadata = SeriesMetadata(name="Serie", season="2")
+    # Antes: tmdb_data es un dict de apply_metadata y el título nunca aparecía
+    metadata.tmdb_data = {'id': 1, 'name': 'Serie'}
+    assert metadata.generate_episode_name(3, "a.mkv") == "Serie - S02E03.mkv"
+    metadata.episode_index = index
+    assert metadata.generate_episode_name(3, "a.mkv") == "Serie - S02E03 - Segunda 3.mkv"
+    assert metadata.generate_episode_name(40, "a.mp4") == "Serie - S02E40.mp4"
+
+    metadata.absolute_numbering = True
+    assert metadata.generate_episode_name(15, "a.mkv") == "Serie - S02E03 - Segunda 3.mkv"
+
+    index.add_season(3, [{'episode_number': 1, 'name': 'Parte 1: ¿Fin?'}])
+    metadata.absolute_numbering = False
+    metadata.season = "3"
+    assert metadata.generate_episode_name(1, "a.mkv") == "Serie - S03E01 - Parte 1 ¿Fin.mkv"
+    print("✅ Títulos y numeración absoluta correctos")
+    return True
+
+
+def test_season_fetched_once():
+    """Nombrar una temporada completa debe pedir sus episodios una sola vez"""
+    print("🧪 Probando carga única por temporada...")
+    season = mock.MagicMock()
+    season.return_value.details.side_effect = _tmdb_season
+    tv = mock.MagicMock()
+    tv.return_value.details.return_value = SimpleNamespace(
+        id=7, seasons=[SimpleNamespace(season_number=0), SimpleNamespace(season_number=1),
+                       SimpleNamespace(season_number=2)])
+
+    with mock.patch("app.utils.TMDB_AVAILABLE", True), mock.patch("app.utils.Season", season), \
+            mock.patch("app.utils.TV", tv):
+        controller = SeriesController()
+        controller.metadata_searcher.tmdb = object()
+        controller.apply_metadata({'id': 7, 'name': 'Serie', 'first_air_date': '2020-01-01'}, "tmdb")
+        controller.update_series_metadata(season="1")
+
+        assert controller.load_episode_titles() == 12
+        names = [controller.metadata.generate_episode_name(n, "x.mkv") for n in range(1, 13)]
+        assert controller.load_episode_titles() == 12
+        assert names[0] == "Serie - S01E01 - T1 cap 1.mkv"
+        assert season.return_value.details.call_count == 1
+
+        # Numeración absoluta: se cargan todas las temporadas regulares (sin repetir la 1)
+        controller.metadata.absolute_numbering = True
+        index = controller.metadata_searcher.get_episode_index("tmdb", 7, 1, absolute=True)
+        controller.metadata.episode_index = index
+        assert controller.metadata.generate_episode_name(20, "x.mkv") == "Serie - S02E08 - T2 cap 8.mkv"
+        assert season.return_value.details.call_count == 2
+    print("✅ Una petición por temporada, nombres en memoria")
+    return True
+
+
+def test_jikan_episode_pages():
+    """Los episodios de Jikan deben leerse de todas las páginas"""
+    print("🧪 Probando episodios paginados de Jikan...")
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            page = int(parse_qs(url.query)['page'][0])
+            requests_seen.append((url.path, page))
+            first = (page - 1) * 100 + 1
+            last = min(page * 100, 130)
+            body = json.dumps({
+                'data': [{'mal_id': n, 'title': f"Ep {n}", 'aired': "2004-10-05T00:00:00+00:00"}
+                         for n in range(first, last + 1)],
+                'pagination': {'has_next_page': last < 130}
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        searcher = MetadataSearcher()
+        searcher.jikan_api_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+        index = searcher.get_episode_index("jikan", 269, 1)
+        assert len(index) == 130
+        assert index.title(1, 130) == "Ep 130"
+        assert index.resolve_absolute(101) == (1, 101)
+        searcher.get_episode_index("jikan", 269, 1)
+        assert requests_seen == [('/anime/269/episodes', 1), ('/anime/269/episodes', 2)]
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    print("✅ 130 episodios en 2 páginas")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_index_and_episode_names,
+        test_season_fetched_once,
+        test_jikan_episode_pages
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para la cola de episodios en paralelo
+Verifica límites globales, por servidor, por ancho de banda y la detención
+"""
+
+import os
+import sys
+import time
+import threading
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.bandwidth import TokenBucket
+from app.episode_queue import EpisodeQueue, EpisodeJob, FetchEncodePipeline, ThroughputMeter
+from app.process_control import CancellationToken
+
+
+class ConcurrencyProbe:
+    """Trabajo de prueba que registra cuántos episodios corren a la vez"""
+
+    def __init__(self, duration=0.1):
+        self.duration = duration
+        self.active = {}
+        self.max_total = 0
+        self.max_per_host = {}
+        self.started = []
+        self._lock = threading.Lock()
+
+    def __call__(self, job):
+        with self._lock:
+            self.started.append(job.index)
+            self.active[job.host] = self.active.get(job.host, 0) + 1
+            self.max_total = max(self.max_total, sum(self.active.values()))
+            self.max_per_host[job.host] = max(self.max_per_host.get(job.host, 0), self.active[job.host])
+        time.sleep(self.duration)
+        with self._lock:
+            self.active[job.host] -= 1
+        return True
+
+
+def test_limits_are_respected():
+    """No deben superarse el límite global ni el límite por servidor"""
+    print("🧪 Probando límites de concurrencia...")
+    jobs = [EpisodeJob(i, f"http://host{i % 2}.example/ep{i}.m3u8") for i in range(12)]
+    probe = ConcurrencyProbe()
+    started = time.monotonic()
+    EpisodeQueue(max_parallel=3, max_per_host=2).run(jobs, probe)
+    elapsed = time.monotonic() - started
+
+    assert all(job.success for job in jobs)
+    assert probe.max_total == 3
+    assert max(probe.max_per_host.values()) <= 2
+    # Secuencial serían 1.2 s; con 3 a la vez ~0.4 s
+    assert elapsed < 0.9, f"Demasiado lento: {elapsed:.2f}s"
+    print(f"✅ 12 episodios en {elapsed:.2f}s")
+    return True
+
+
+def test_other_hosts_are_not_blocked():
+    """Un servidor saturado no debe bloquear episodios de otros servidores"""
+    print("🧪 Probando episodios de varios servidores...")
+    jobs = [EpisodeJob(i, "http://busy.example/ep.m3u8") for i in range(4)]
+    jobs.append(EpisodeJob(4, "http://other.example/ep.m3u8"))
+    probe = ConcurrencyProbe()
+    EpisodeQueue(max_parallel=3, max_per_host=1).run(jobs, probe)
+    assert probe.started.index(4) <= 1
+    print("✅ El otro servidor no esperó a la cola")
+    return True
+
+
+def test_bandwidth_blocks_admission():
+    """Con el ancho de banda saturado no deben admitirse más episodios"""
+    print("🧪 Probando admisión por ancho de banda...")
+    queue = EpisodeQueue(max_parallel=4, max_per_host=4, max_bandwidth=1000, admit_interval=0.05)
+
+    def saturating(job):
+        for _ in range(6):
+            queue.report_bytes(2000)
+            time.sleep(0.05)
+        return True
+
+    probe = ConcurrencyProbe(duration=0)
+    jobs = [EpisodeJob(i, "http://host.example/ep.m3u8") for i in range(3)]
+    queue.run(jobs, lambda job: probe(job) and saturating(job))
+    assert probe.max_total == 1
+
+    # El límite se lee de la cubeta global: quitarlo en vivo admite el resto
+    bucket = TokenBucket(1000)
+    queue = EpisodeQueue(max_parallel=4, max_per_host=4, admit_interval=0.05, bandwidth_bucket=bucket)
+    threading.Timer(0.1, bucket.set_rate, args=(0,)).start()
+    probe = ConcurrencyProbe(duration=0.4)
+    jobs = [EpisodeJob(i, "http://host.example/ep.m3u8") for i in range(3)]
+    queue.run(jobs, lambda job: queue.report_bytes(2000) or probe(job))
+    assert probe.max_total == 3 and queue.max_bandwidth == 0
+    print("✅ Episodios admitidos de uno en uno y límite actualizado en vivo")
+    return True
+
+
+def test_stop_prevents_new_episodes():
+    """Al cancelar no deben iniciarse más episodios"""
+    print("🧪 Probando detención de la cola...")
+    token = CancellationToken()
+    jobs = [EpisodeJob(i, "http://host.example/ep.m3u8") for i in range(10)]
+    probe = ConcurrencyProbe(duration=0.2)
+    threading.Timer(0.1, token.cancel).start()
+    started = time.monotonic()
+    EpisodeQueue(max_parallel=2, max_per_host=2).run(jobs, probe, token)
+
+    assert len(probe.started) == 2
+    assert all(job.success is None for job in jobs[2:])
+    assert time.monotonic() - started < 1
+    print("✅ Cola detenida")
+    return True
+
+
+def test_pipeline_overlaps_fetch_and_encode():
+    """La descarga del siguiente episodio debe solaparse con la codificación"""
+    print("🧪 Probando descarga y codificación encadenadas...")
+    events = []
+    lock = threading.Lock()
+
+    def fetch(job):
+        time.sleep(0.1)
+        with lock:
+            events.append(("fetched", job.index, time.monotonic()))
+        return {'bytes': 100}
+
+    def encode(job, source):
+        time.sleep(0.1)
+        with lock:
+            events.append(("encoded", job.index, time.monotonic()))
+        return True
+
+    jobs = [EpisodeJob(i, "http://host.example/ep.m3u8") for i in range(6)]
+    pipeline = FetchEncodePipeline(EpisodeQueue(max_parallel=1), encode_workers=1, max_prefetch=1)
+    started = time.monotonic()
+    pipeline.run(jobs, fetch, encode)
+    elapsed = time.monotonic() - started
+
+    assert all(job.success for job in jobs)
+    assert pipeline.held_bytes == 0
+    # Secuencial serían 1.2 s; encadenado ~0.7 s
+    assert elapsed < 1.0, f"Sin solapamiento: {elapsed:.2f}s"
+    print(f"✅ 6 episodios en {elapsed:.2f}s")
+    return True
+
+
+def test_pipeline_respects_disk_budget():
+    """No deben acumularse más descargas que las que caben en el presupuesto de disco"""
+    print("🧪 Probando presupuesto de disco del encadenado...")
+    held = []
+    pipeline = FetchEncodePipeline(EpisodeQueue(max_parallel=3), encode_workers=1,
+                                   max_prefetch=10, disk_budget=250)
+
+    def fetch(job):
+        time.sleep(0.02)
+        return {'bytes': 100}
+
+    def encode(job, source):
+        held.append(pipeline.held_bytes)
+        time.sleep(0.1)
+        return True
+
+    jobs = [EpisodeJob(i, "http://host.example/ep.m3u8") for i in range(8)]
+    pipeline.run(jobs, fetch, encode)
+    assert all(job.success for job in jobs)
+    assert max(held) <= 300, f"Presupuesto superado: {max(held)} bytes"
+    print(f"✅ Máximo en disco: {max(held)} bytes")
+    return True
+
+
+def test_pipeline_fetch_failure():
+    """Un episodio que no se descarga debe marcarse como fallido sin codificarse"""
+    print("🧪 Probando fallo en la descarga encadenada...")
+    encoded = []
+    jobs = [EpisodeJob(i, "http://host.example/ep.m3u8") for i in range(3)]
+    FetchEncodePipeline(EpisodeQueue()).run(
+        jobs, lambda job: None if job.index == 1 else {'bytes': 1},
+        lambda job, source: encoded.append(job.index) or True)
+    assert [job.success for job in jobs] == [True, False, True]
+    assert sorted(encoded) == [0, 2]
+    print("✅ Fallo aislado")
+    return True
+
+
+def test_throughput_meter():
+    """El medidor debe olvidar las muestras fuera de la ventana"""
+    print("🧪 Probando medidor de caudal...")
+    meter = ThroughputMeter(window=0.2)
+    meter.add(1000)
+    assert meter.rate() == 5000
+    time.sleep(0.25)
+    assert meter.rate() == 0
+    print("✅ Medidor correcto")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_limits_are_respected,
+        test_other_hosts_are_not_blocked,
+        test_bandwidth_blocks_admission,
+        test_stop_prevents_new_episodes,
+        test_pipeline_overlaps_fetch_and_encode,
+        test_pipeline_respects_disk_budget,
+        test_pipeline_fetch_failure,
+        test_throughput_meter
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -7,6 +7,7 @@ Verifica que todas las funcionalidades están correctamente implementadas
 
 import sys
 import os
+import tempfile
 from pathlib import Path
 
 # Agregar el directorio del proyecto al path
@@ -35,8 +36,10 @@ def test_imports_and_setup():
             return False
         
         # Crear instancias básicas
-        config_manager = ConfigManager()
-        controller = SeriesController(config_manager)
+        # Configuración temporal: la caché de metadatos se crea junto a ella, no en el repositorio
+        with tempfile.TemporaryDirectory() as config_dir:
+            config_manager = ConfigManager(str(Path(config_dir) / "config.json"))
+            controller = SeriesController(config_manager)
         model = SeriesModel()
         
         print("✅ Instancias creadas correctamente")
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para el descargador HLS nativo
+Usa un servidor HTTP local como sustituto de un origen HLS real
+"""
+
+import io
+import os
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.hls import (HLSDownloader, HLSCancelled, HLSVariant, MasterPlaylist,
+                     parse_playlist, select_variant)
+from app.process_control import CancellationToken
+from app.utils import FFmpegProcessor
+
+
+class StandInServer:
+    """Servidor HLS local: sirve contenido en memoria, con rangos y retardo opcional
+
+    statuses fuerza un código de error por ruta; con allow_head responde a HEAD.
+    """
+
+    def __init__(self, files, delay=0.0, statuses=None, allow_head=False):
+        self.files = files
+        self.delay = delay
+        self.statuses = statuses or {}
+        self.requests = []
+        self.clients = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_empty(self, status):
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_HEAD(self):
+                with server._lock:
+                    server.requests.append(('HEAD ' + self.path, None))
+                path = self.path.split('?')[0]
+                if not allow_head:
+                    self._send_empty(501)
+                elif path in server.statuses or path not in server.files:
+                    self._send_empty(server.statuses.get(path, 404))
+                else:
+                    self.send_response(200)
+                    self.send_header('Content-Length', str(len(server.files[path])))
+                    self.end_headers()
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests.append((self.path, self.headers.get('Range')))
+                    server.clients.add(self.client_address)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    if self.path.split('?')[0].endswith(('.ts', '.bin')) and server.delay:
+                        time.sleep(server.delay(self.path) if callable(server.delay) else server.delay)
+                    if self.path.split('?')[0] in server.statuses:
+                        self._send_empty(server.statuses[self.path.split('?')[0]])
+                        return
+                    body = server.files.get(self.path.split('?')[0])
+                    if body is None:
+                        self._send_empty(404)
+                        return
+                    status = 200
+                    range_header = self.headers.get('Range')
+                    if range_header:
+                        start, end = range_header.split('=', 1)[1].split('-')
+                        body = body[int(start):int(end) + 1]
+                        status = 206
+                    self.send_response(status)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _segment(i):
+    return bytes([i % 256]) * (1000 + i)
+
+
+def _media_playlist(count, key=False):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:4", "#EXT-X-MEDIA-SEQUENCE:7"]
+    if key:
+        lines.append('#EXT-X-KEY:METHOD=AES-128,URI="/keys/k1.bin",IV=0x000102030405060708090a0b0c0d0e0f')
+    for i in range(count):
+        lines += ["#EXTINF:4.0,", f"seg{i}.ts?token=abc"]
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines).encode()
+
+
+def test_parse_master_playlist():
+    """La lista maestra debe exponer variantes con resolución y ancho de banda"""
+    print("🧪 Probando análisis de lista maestra...")
+    text = ("#EXTM3U\n"
+            '#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360,CODECS="avc1.4d401e,mp4a.40.2"\n'
+            "360/index.m3u8\n"
+            "#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080\n"
+            "1080/index.m3u8\n")
+    playlist = parse_playlist(text, "http://host/show/master.m3u8")
+    assert isinstance(playlist, MasterPlaylist)
+    assert [v.resolution for v in playlist.variants] == [(640, 360), (1920, 1080)]
+    assert playlist.variants[1].uri == "http://host/show/1080/index.m3u8"
+    print("✅ Lista maestra analizada")
+    return True
+
+
+def test_concurrent_download_with_pooling():
+    """Los segmentos deben descargarse en paralelo, acotados y sobre conexiones reutilizadas"""
+    print("🧪 Probando descarga concurrente...")
+    count = 24
+    files = {"/show/index.m3u8": _media_playlist(count)}
+    files.update({f"/show/seg{i}.ts": _segment(i) for i in range(count)})
+    server = StandInServer(files, delay=0.1)
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            progress = []
+            downloader = HLSDownloader(max_workers=6)
+            started = time.monotonic()
+            local = downloader.download(f"{server.url}/show/index.m3u8", Path(temp_dir),
+                                        lambda done, total, size: progress.append(done))
+            elapsed = time.monotonic() - started
+
+            for i in range(count):
+                assert (Path(temp_dir) / f"seg_{i:05d}.ts").read_bytes() == _segment(i)
+            text = local.read_text()
+            assert "#EXT-X-MEDIA-SEQUENCE:7" in text and "#EXT-X-ENDLIST" in text
+            assert progress[-1] == count
+
+            # Secuencial serían 2.4 s; con 6 en vuelo ~0.4 s
+            assert elapsed < count * 0.1 / 2, f"Demasiado lento: {elapsed:.2f}s"
+            assert 1 < server.max_in_flight <= 6
+            # Conexiones reutilizadas: muchas menos conexiones que peticiones
+            assert len(server.clients) <= 6 + 1
+            print(f"✅ {count} segmentos en {elapsed:.2f}s, {len(server.clients)} conexiones")
+    finally:
+        server.close()
+    return True
+
+
+def test_byte_ranges_and_keys():
+    """Deben respetarse EXT-X-BYTERANGE y descargarse las claves AES-128"""
+    print("🧪 Probando rangos de bytes y claves...")
+    blob = b"".join(_segment(i) for i in range(3))
+    sizes = [len(_segment(i)) for i in range(3)]
+    playlist = ("#EXTM3U\n#EXT-X-VERSION:4\n#EXT-X-TARGETDURATION:4\n"
+                '#EXT-X-KEY:METHOD=AES-128,URI="key.bin"\n'
+                f"#EXTINF:4.0,\n#EXT-X-BYTERANGE:{sizes[0]}@0\nall.ts\n"
+                f"#EXTINF:4.0,\n#EXT-X-BYTERANGE:{sizes[1]}\nall.ts\n"
+                f"#EXTINF:4.0,\n#EXT-X-BYTERANGE:{sizes[2]}\nall.ts\n"
+                "#EXT-X-ENDLIST\n")
+    files = {"/v/index.m3u8": playlist.encode(), "/v/all.ts": blob, "/v/key.bin": b"k" * 16}
+    server = StandInServer(files)
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            local = HLSDownloader(max_workers=3).download(f"{server.url}/v/index.m3u8", Path(temp_dir))
+            for i in range(3):
+                assert (Path(temp_dir) / f"seg_{i:05d}.ts").read_bytes() == _segment(i)
+            assert (Path(temp_dir) / "key_0.bin").read_bytes() == b"k" * 16
+            assert 'URI="key_0.bin"' in local.read_text()
+            ranges = sorted(r for path, r in server.requests if path == "/v/all.ts")
+            assert ranges == sorted([f"bytes=0-{sizes[0] - 1}",
+                                     f"bytes={sizes[0]}-{sizes[0] + sizes[1] - 1}",
+                                     f"bytes={sizes[0] + sizes[1]}-{sum(sizes) - 1}"])
+    finally:
+        server.close()
+    print("✅ Rangos y claves correctos")
+    return True
+
+
+def test_master_resolves_variant():
+    """Una URL de lista maestra debe resolverse a una variante"""
+    print("🧪 Probando resolución de variante...")
+    files = {
+        "/m/master.m3u8": b"#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=100\nlow.m3u8\n"
+                          b"#EXT-X-STREAM-INF:BANDWIDTH=900\nhigh.m3u8\n",
+        "/m/high.m3u8": _media_playlist(2),
+        "/m/seg0.ts": _segment(0), "/m/seg1.ts": _segment(1)
+    }
+    server = StandInServer(files)
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            HLSDownloader().download(f"{server.url}/m/master.m3u8", Path(temp_dir))
+            assert not any(path == "/m/low.m3u8" for path, _ in server.requests)
+    finally:
+        server.close()
+    print("✅ Variante resuelta")
+    return True
+
+
+def test_select_variant_by_resolution():
+    """Debe elegirse la variante exacta, o la menor superior a la pedida"""
+    print("🧪 Probando selección de variante por resolución...")
+    variants = [
+        HLSVariant("360.m3u8", 800000, (640, 360)),
+        HLSVariant("720.m3u8", 2800000, (1280, 720)),
+        HLSVariant("720hq.m3u8", 3500000, (1280, 720)),
+        HLSVariant("1080.m3u8", 5000000, (1920, 1080))
+    ]
+    assert select_variant(variants, 720).uri == "720hq.m3u8"
+    assert select_variant(variants, 480).uri == "720hq.m3u8"
+    assert select_variant(variants, 2160).uri == "1080.m3u8"
+    assert select_variant(variants).uri == "1080.m3u8"
+    print("✅ Variantes elegidas correctamente")
+    return True
+
+
+def test_master_selects_requested_variant():
+    """La descarga debe usar solo la variante de la resolución pedida"""
+    print("🧪 Probando descarga de la variante pedida...")
+    files = {
+        "/r/master.m3u8": b"#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=900000,RESOLUTION=854x480\n480.m3u8\n"
+                          b"#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080\n1080.m3u8\n",
+        "/r/480.m3u8": _media_playlist(1)
+    }
+    server = StandInServer(files)
+    try:
+        playlist = HLSDownloader().fetch_media_playlist(f"{server.url}/r/master.m3u8", 480)
+        assert playlist.variant.height == 480
+        assert not any(path == "/r/1080.m3u8" for path, _ in server.requests)
+    finally:
+        server.close()
+    print("✅ Variante de 480p descargada")
+    return True
+
+
+def _stream_server(count, delay=0.0):
+    files = {"/t/index.m3u8": _media_playlist(count)}
+    files.update({f"/t/seg{i}.ts": _segment(i) for i in range(count)})
+    return StandInServer(files, delay)
+
+
+def test_stream_preserves_order():
+    """El flujo debe escribir los segmentos en orden aunque lleguen desordenados"""
+    print("🧪 Probando transmisión ordenada...")
+    count = 20
+    # Los primeros segmentos son los más lentos: llegan en orden inverso
+    server = _stream_server(count, lambda path: 0.2 - int(path.split('seg')[1].split('.')[0]) * 0.01)
+    try:
+        downloader = HLSDownloader(max_workers=8)
+        playlist = downloader.fetch_media_playlist(f"{server.url}/t/index.m3u8")
+        assert downloader.can_stream(playlist)
+        sink = io.BytesIO()
+        written = downloader.stream(playlist, sink, max_buffered=10)
+        expected = b"".join(_segment(i) for i in range(count))
+        assert sink.getvalue() == expected and written == len(expected)
+        assert server.max_in_flight <= 8
+    finally:
+        server.close()
+    print("✅ Segmentos escritos en orden")
+    return True
+
+
+def test_stream_into_process_stdin():
+    """Los segmentos deben llegar al proceso por stdin sin archivos intermedios"""
+    print("🧪 Probando transmisión a stdin...")
+    count = 12
+    server = _stream_server(count)
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = Path(temp_dir) / "episode.ts"
+            cmd = [sys.executable, '-c',
+                   f"import sys, shutil; shutil.copyfileobj(sys.stdin.buffer, open({str(output_path)!r}, 'wb'))"]
+            downloader = HLSDownloader(max_workers=4)
+            playlist = downloader.fetch_media_playlist(f"{server.url}/t/index.m3u8")
+            result = FFmpegProcessor(ffmpeg_path=sys.executable).run_command(
+                cmd, str(output_path), stdin_feeder=lambda stdin: downloader.stream(playlist, stdin))
+            assert result.success
+            assert output_path.read_bytes() == b"".join(_segment(i) for i in range(count))
+            assert sorted(os.listdir(temp_dir)) == ["episode.ts"]
+    finally:
+        server.close()
+    print("✅ Flujo recibido completo")
+    return True
+
+
+def test_stream_failure_fails_command():
+    """Si falta un segmento, el proceso debe detenerse y la salida eliminarse"""
+    print("🧪 Probando fallo durante la transmisión...")
+    count = 6
+    server = _stream_server(count)
+    del server.files["/t/seg3.ts"]
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = Path(temp_dir) / "episode.ts"
+            cmd = [sys.executable, '-c',
+                   f"import sys, shutil; shutil.copyfileobj(sys.stdin.buffer, open({str(output_path)!r}, 'wb'))"]
+            downloader = HLSDownloader(max_workers=2, retries=1)
+            playlist = downloader.fetch_media_playlist(f"{server.url}/t/index.m3u8")
+            result = FFmpegProcessor(ffmpeg_path=sys.executable).run_command(
+                cmd, str(output_path), stdin_feeder=lambda stdin: downloader.stream(playlist, stdin))
+            assert not result.success
+            assert "Error en la entrada" in result.output
+            assert not output_path.exists()
+    finally:
+        server.close()
+    print("✅ Transmisión incompleta marcada como fallida")
+    return True
+
+
+def test_cancel_stops_download():
+    """Cancelar debe detener la descarga sin terminar todos los segmentos"""
+    print("🧪 Probando cancelación de descarga...")
+    count = 40
+    files = {"/c/index.m3u8": _media_playlist(count)}
+    files.update({f"/c/seg{i}.ts": _segment(i) for i in range(count)})
+    server = StandInServer(files, delay=0.1)
+    token = CancellationToken()
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            threading.Timer(0.25, token.cancel).start()
+            try:
+                HLSDownloader(max_workers=2).download(f"{server.url}/c/index.m3u8",
+                                                      Path(temp_dir), cancel_token=token)
+                assert False, "La descarga debía cancelarse"
+            except HLSCancelled:
+                pass
+            assert len(server.requests) < count
+    finally:
+        server.close()
+    print("✅ Descarga cancelada")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_parse_master_playlist,
+        test_concurrent_download_with_pooling,
+        test_byte_ranges_and_keys,
+        test_master_resolves_variant,
+        test_select_variant_by_resolution,
+        test_master_selects_requested_variant,
+        test_stream_preserves_order,
+        test_stream_into_process_stdin,
+        test_stream_failure_fails_command,
+        test_cancel_stops_download
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para el cliente HTTP compartido (pools, reintentos y métricas)
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+import requests
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.artwork import ArtworkCache
+from app.hls import HLSDownloader
+from app.http_client import HttpClient, get_http_client, format_host_stats
+from app.url_validator import URLValidator
+from app.utils import MetadataSearcher
+from test_hls_downloader import StandInServer
+
+
+def test_pooling_and_shared_client():
+    """Las peticiones reutilizan conexiones y todos los módulos comparten la sesión"""
+    print("🧪 Probando conexiones persistentes...")
+    server = StandInServer({'/a.json': b'{"ok": true}'})
+    try:
+        client = HttpClient(host_pool_sizes={"api.jikan.moe": 3})
+        for _ in range(20):
+            assert client.get(server.url + '/a.json').json() == {"ok": True}
+        assert len(server.clients) == 1
+
+        threads = [threading.Thread(target=lambda: client.get(server.url + '/a.json')) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(server.clients) <= 7
+
+        assert client.get_adapter("https://api.jikan.moe/v4/anime")._pool_maxsize == 3
+        assert client.get_adapter("https://otro.example/")._pool_maxsize == 10
+        client.ensure_pool(server.url + '/seg.ts', 16)
+        assert client.get_adapter(server.url + '/seg.ts')._pool_maxsize == 16
+        client.ensure_pool(server.url + '/seg.ts', 4)
+        assert client.get_adapter(server.url + '/seg.ts')._pool_maxsize == 16
+    finally:
+        server.close()
+
+    shared = get_http_client()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        assert MetadataSearcher().http is shared
+        assert HLSDownloader().session is shared
+        assert URLValidator().session is shared
+        assert ArtworkCache(temp_dir).session is shared
+    print("✅ Una conexión para 20 peticiones y una sola sesión compartida")
+    return True
+
+
+def test_timeouts_and_retries():
+    """Los 5xx pasajeros se reintentan y las esperas tienen un tiempo máximo por defecto"""
+    print("🧪 Probando reintentos y tiempos de espera...")
+    attempts = []
+
+    def delay(path):
+        attempts.append(path)
+        if path == '/flaky.bin' and len(attempts) == 2:
+            server.statuses.pop('/flaky.bin')
+        return 1.0 if path == '/slow.bin' else 0
+
+    server = StandInServer({'/flaky.bin': b'datos', '/slow.bin': b'lento'},
+                           delay=delay, statuses={'/flaky.bin': 503})
+    try:
+        client = HttpClient(retries=2)
+        response = client.get(server.url + '/flaky.bin')
+        assert response.status_code == 200 and response.content == b'datos'
+        assert attempts == ['/flaky.bin', '/flaky.bin']
+
+        fast = HttpClient(timeout=(1.0, 0.2), retries=0)
+        try:
+            fast.get(server.url + '/slow.bin')
+            assert False, "Debe vencer el tiempo de lectura"
+        except requests.Timeout:
+            pass
+        host = server.url.split('//')[1]
+        assert fast.stats()[host]["errors"] == 1
+    finally:
+        server.close()
+    print("✅ 503 reintentado y tiempo de espera aplicado")
+    return True
+
+
+def test_host_metrics():
+    """Las métricas por servidor deben señalar el más lento y contar los bytes recibidos"""
+    print("🧪 Probando métricas por servidor...")
+    body = b'x' * 200000
+    slow = StandInServer({'/seg.ts': body}, delay=0.15)
+    fast = StandInServer({'/seg.ts': body, '/index.m3u8': b'#EXTM3U'})
+    try:
+        client = HttpClient()
+        for _ in range(3):
+            client.get(slow.url + '/seg.ts')
+            with client.get(fast.url + '/seg.ts', stream=True) as response:
+                received = sum(len(chunk) for chunk in response.iter_content(65536))
+            assert received == len(body)
+        client.get(fast.url + '/index.m3u8')
+
+        stats = client.stats()
+        slow_host, fast_host = slow.url.split('//')[1], fast.url.split('//')[1]
+        assert stats[slow_host]["requests"] == 3 and stats[fast_host]["requests"] == 4
+        assert stats[slow_host]["bytes"] == 3 * len(body)
+        assert stats[fast_host]["bytes"] == 3 * len(body) + len(b'#EXTM3U')
+        assert stats[slow_host]["avg_latency"] >= 0.15 > stats[fast_host]["avg_latency"]
+        assert stats[fast_host]["throughput"] > 0
+        assert client.slowest_hosts(1)[0][0] == slow_host
+        lines = format_host_stats(stats)
+        assert lines[0].startswith(f"🌐 {slow_host}: 3 peticiones")
+    finally:
+        slow.close()
+        fast.close()
+    print("✅ Latencia, bytes y rendimiento registrados por servidor")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_pooling_and_shared_client,
+        test_timeouts_and_retries,
+        test_host_metrics
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para la identificación automática de series
+"""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import rate_limit
+from app.config import ConfigManager
+from app.controller import SeriesController
+from app.identifier import SeriesIdentifier, parse_release_name, candidate_titles, scan_series_folders
+from app.rate_limit import SourceLimiter
+
+
+def tmdb_show(show_id, name, year, original_name=None):
+    return SimpleNamespace(id=show_id, name=name, original_name=original_name or name, overview="",
+                           first_air_date=f"{year}-01-01", vote_average=8.0, poster_path=None)
+
+
+CATALOG = {
+    "doctor who": [tmdb_show(121, "Doctor Who", 1963), tmdb_show(57243, "Doctor Who", 2005)],
+    "spy x family": [tmdb_show(120089, "SPY×FAMILY", 2022)],
+    "dark": [tmdb_show(70523, "Dark", 2017), tmdb_show(1, "Dark Matter", 2015)],
+    "breaking bad": [tmdb_show(1396, "Breaking Bad", 2008)],
+}
+
+
+def fake_search(query, source):
+    if source != "tmdb":
+        return []
+    return [{'id': show.id, 'name': show.name, 'original_name': show.original_name,
+             'first_air_date': show.first_air_date} for show in CATALOG.get(query.lower(), [])]
+
+
+def test_release_name_parsing():
+    """Los nombres de descarga deben reducirse al título y el año"""
+    print("🧪 Probando limpieza de nombres de descarga...")
+    cases = {
+        "[SubsPlease] Spy x Family - 05 (1080p) [A1B2C3D4].mkv": ("Spy x Family", None),
+        "Dark.2017.S01E03.1080p.WEB-DL.x264-GRP.mkv": ("Dark", "2017"),
+        "Breaking.Bad.S05.COMPLETE.720p.BluRay.x264-DEMAND": ("Breaking Bad", None),
+        "Cowboy Bebop (1998) [BD 1080p HEVC 10bit Dual Audio]": ("Cowboy Bebop", "1998"),
+        "[Erai-raws] Jujutsu Kaisen 2nd Season - 01 [1080p].mkv": ("Jujutsu Kaisen", None),
+        "Attack_on_Titan_S02E05_1080p.mkv": ("Attack on Titan", None),
+        "Naruto Shippuden 001.mkv": ("Naruto Shippuden", None),
+        "Mob Psycho 100 - 03.mkv": ("Mob Psycho 100", None),
+        "Mr. Robot S01E01.mkv": ("Mr. Robot", None),
+        "Stranger Things 4x02 HDTV.avi": ("Stranger Things", None),
+        "1923.S01E01.2160p.mkv": ("1923", None),
+        "S01E01.mkv": ("", None),
+    }
+    for name, expected in cases.items():
+        assert parse_release_name(name) == expected, (name, parse_release_name(name))
+
+    titles, year = candidate_titles("Doctor Who (2005) Season 3",
+                                    ["Doctor.Who.2005.S03E01.mkv", "Episodio 2.mkv", "Doctor Who S03E03.mkv"])
+    assert titles == ["Doctor Who"] and year == "2005"
+    print("✅ Títulos y años extraídos")
+    return True
+
+
+def test_ranking_and_threshold():
+    """El año debe desempatar y los resultados dudosos no se aplican"""
+    print("🧪 Probando ranking por parecido...")
+    identifier = SeriesIdentifier(fake_search, ["tmdb", "jikan"], threshold=0.8)
+
+    doctor = identifier.identify("Doctor Who (2005)", [])
+    assert doctor.confident and doctor.result['id'] == 57243
+    classic = identifier.identify("Doctor.Who.1963.Complete", [])
+    assert classic.result['id'] == 121
+
+    spy = identifier.identify("[SubsPlease] Spy x Family", ["[SubsPlease] Spy x Family - 01 (1080p).mkv"])
+    assert spy.confident and spy.result['id'] == 120089 and spy.source == "tmdb"
+
+    unknown = identifier.identify("Dark Mattress", [])
+    assert not unknown.confident
+    missing = identifier.identify("Serie Inexistente", [])
+    assert missing.result is None and "sin resultados" in missing.summary
+    print("✅ Mejor resultado elegido y umbral respetado")
+    return True
+
+
+def test_bulk_folders_and_autofill():
+    """Un directorio con 100+ carpetas debe identificarse en una pasada con caché y límite"""
+    print("🧪 Probando identificación en lote...")
+    names = [f"Serie Numero {i}" for i in range(30)]
+    tv = mock.MagicMock()
+    tv.return_value.search.side_effect = lambda query: [tmdb_show(1000 + names.index(query), query, 2020)] \
+        if query in names else []
+    limiter = SourceLimiter(((1000, 1.0),))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir) / "descargas"
+        for i in range(120):
+            title = names[i % 30]
+            folder = root / f"[Grupo{i}] {title} (2020) [1080p]"
+            (folder / "Season 01").mkdir(parents=True)
+            (folder / "Season 01" / f"{title.replace(' ', '.')}.S01E01.1080p.mkv").touch()
+        (root / "sin videos").mkdir()
+
+        config = ConfigManager(str(Path(temp_dir) / "config.json"))
+        with mock.patch("app.utils.TMDB_AVAILABLE", True), mock.patch("app.utils.TV", tv), \
+                mock.patch.dict(rate_limit._limiters, {"tmdb": limiter}):
+            controller = SeriesController(config)
+            controller.model.history_file = Path(temp_dir) / "history.json"
+            controller.metadata_searcher.tmdb = object()
+            identifier = controller.create_identifier()
+
+            folders = scan_series_folders(str(root))
+            assert len(folders) == 120
+            start = time.monotonic()
+            results = identifier.identify_many(folders)
+            elapsed = time.monotonic() - start
+            assert [r.folder for r in results] == [name for name, _ in folders]
+            assert all(r.confident and r.name == names[r.result['id'] - 1000] for r in results)
+            # 30 series distintas: 30 peticiones, el resto desde la caché o agrupadas
+            assert tv.return_value.search.call_count == 30
+            assert limiter.stats()["requests"] == 30
+            assert elapsed < 5
+
+            # Autorrelleno de SeriesMetadata al detectar archivos de una carpeta
+            source_folder = root / f"[Grupo5] {names[5]} (2020) [1080p]" / "Season 01"
+            controller.detect_video_files(str(source_folder))
+            identification = controller.auto_identify_series(str(source_folder.parent))
+            assert identification.confident
+            # El controlador no pisa los metadatos: la UI los aplica tras comprobar el nombre
+            assert not controller.metadata.name
+            controller.apply_metadata(identification.result, identification.source)
+            assert (controller.metadata.name, controller.metadata.series_id) == (names[5], "1005")
+        controller.metadata_searcher.cache.close()
+    print(f"✅ 120 carpetas identificadas en {elapsed:.2f}s con 30 peticiones")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_release_name_parsing,
+        test_ranking_and_threshold,
+        test_bulk_folders_and_autofill
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
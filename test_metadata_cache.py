@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para la caché persistente de metadatos
+"""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.metadata_cache import MetadataCache, make_key
+from app.utils import MetadataSearcher
+
+
+class FakeConfig:
+    """Sustituto mínimo de ConfigManager"""
+
+    def __init__(self, values):
+        self.values = values
+
+    def get(self, section, key=None, default=None):
+        return self.values.get(section, {}).get(key, default)
+
+    def get_path(self, section, key, default):
+        return Path(self.get(section, key, default))
+
+    def get_network_config(self):
+        return self.values.get("network", {})
+
+
+class CountingFetch:
+    """Función de descarga que cuenta sus llamadas"""
+
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        value = self.values[min(self.calls, len(self.values)) - 1]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+def test_hits_misses_and_persistence():
+    """Las consultas repetidas (normalizadas) no deben volver a la red, ni tras reiniciar"""
+    print("🧪 Probando aciertos y persistencia...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = Path(temp_dir) / "metadata.db"
+        cache = MetadataCache(str(db_path), ttl=60)
+        fetch = CountingFetch([{'id': 1, 'name': 'Naruto'}])
+
+        assert make_key("tmdb", "search", "  NARUTO   Shippūden ") == make_key("tmdb", "search", "naruto shippūden")
+        first = cache.get_or_fetch(make_key("tmdb", "search", "Naruto"), fetch)
+        second = cache.get_or_fetch(make_key("tmdb", "search", " naruto "), fetch)
+        assert first == second == [{'id': 1, 'name': 'Naruto'}]
+        assert fetch.calls == 1
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+        cache.close()
+
+        reopened = MetadataCache(str(db_path), ttl=60)
+        assert reopened.get_or_fetch(make_key("tmdb", "search", "naruto"), fetch) == first
+        assert fetch.calls == 1
+        reopened.close()
+    print("✅ Respuestas servidas desde la caché")
+    return True
+
+
+def test_stale_while_revalidate():
+    """Una entrada vencida debe servirse al instante y actualizarse en segundo plano"""
+    print("🧪 Probando stale-while-revalidate...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = MetadataCache(str(Path(temp_dir) / "metadata.db"), ttl=0.2, stale_ttl=60)
+        key = make_key("jikan", "details", 20)
+        slow_fetch = CountingFetch({'title': 'Antiguo'}, {'title': 'Nuevo'})
+        cache.get_or_fetch(key, slow_fetch)
+        time.sleep(0.3)
+
+        start = time.monotonic()
+        assert cache.get_or_fetch(key, slow_fetch) == {'title': 'Antiguo'}
+        assert time.monotonic() - start < 0.1
+        assert cache.wait_revalidations(5)
+        assert slow_fetch.calls == 2
+        assert cache.get_or_fetch(key, slow_fetch) == {'title': 'Nuevo'}
+        stats = cache.stats()
+        assert (stats["stale_hits"], stats["revalidations"], stats["hits"]) == (1, 1, 1)
+
+        # Fuera de la ventana de vencidas: consulta síncrona
+        expired = MetadataCache(str(Path(temp_dir) / "expired.db"), ttl=0.1, stale_ttl=0.1)
+        fetch = CountingFetch(['v1'], ['v2'])
+        expired.get_or_fetch(key, fetch)
+        time.sleep(0.3)
+        assert expired.get_or_fetch(key, fetch) == ['v2']
+        assert expired.purge(0) == 1
+        cache.close()
+        expired.close()
+    print("✅ Entradas vencidas servidas y revalidadas")
+    return True
+
+
+def test_searcher_uses_cache_and_skips_errors():
+    """MetadataSearcher debe usar la caché y no guardar respuestas fallidas"""
+    print("🧪 Probando caché en MetadataSearcher...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = FakeConfig({"metadata": {"cache_metadata": True, "cache_duration_days": 7,
+                                          "cache_file": str(Path(temp_dir) / "metadata.db")}})
+        result = SimpleNamespace(id=31910, name="Naruto", original_name="ナルト", overview="",
+                                 first_air_date="2002-10-03", vote_average=8.3, poster_path="/p.jpg")
+        tv = mock.MagicMock()
+        tv.return_value.search.side_effect = [ConnectionError("sin red"), [result]]
+
+        with mock.patch("app.utils.TMDB_AVAILABLE", True), mock.patch("app.utils.TV", tv):
+            searcher = MetadataSearcher(config)
+            searcher.tmdb = object()
+            assert searcher.search_tmdb("Naruto") == []
+            assert searcher.search_tmdb("Naruto")[0]['name'] == "Naruto"
+            assert searcher.search_tmdb("naruto")[0]['id'] == 31910
+            assert tv.return_value.search.call_count == 2
+
+        assert searcher.get_cache_stats()["hits"] == 1
+        searcher.cache.close()
+        assert MetadataSearcher(FakeConfig({"metadata": {"cache_metadata": False}})).cache is None
+    print("✅ Búsquedas repetidas sin red y errores sin guardar")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_hits_misses_and_persistence,
+        test_stale_while_revalidate,
+        test_searcher_uses_cache_and_skips_errors
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para los archivos NFO de Jellyfin (serie, temporada y episodios)
+"""
+
+import os
+import sys
+import time
+import tempfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.config import ConfigManager
+from app.controller import SeriesController
+from app.model import EpisodeIndex, SeriesMetadata
+from app.nfo import write_tvshow_nfo, write_episode_nfo
+from app.planner import SpeedHistory
+
+DETAILS = {
+    'id': 1399, 'status': 'Ended', 'vote_count': 2500,
+    'genres': [{'id': 10765, 'name': 'Sci-Fi & Fantasy'}, {'id': 18, 'name': 'Drama'}],
+    'networks': [{'name': 'HBO'}],
+    'seasons': [{'season_number': 1, 'name': 'Temporada 1', 'overview': 'Invierno <se> acerca',
+                 'air_date': '2011-04-17'}]
+}
+
+
+def tmdb_metadata():
+    metadata = SeriesMetadata(name="Juego de Tronos", year="2011", series_id="1399", season="1")
+    metadata.tmdb_data = {'id': 1399, 'name': 'Juego de Tronos', 'original_name': 'Game of Thrones',
+                          'overview': 'Lannister & Stark: "guerra" <total>', 'first_air_date': '2011-04-17',
+                          'vote_average': 8.4}
+    metadata.episode_index = EpisodeIndex()
+    metadata.episode_index.add_season(1, [
+        {'episode_number': n, 'name': f"Capítulo {n} & <más>", 'air_date': f"2011-04-{16 + n}",
+         'overview': f"Sinopsis {n}"} for n in range(1, 4)])
+    return metadata
+
+
+def test_escaped_streaming_xml():
+    """El texto con &, < y comillas debe quedar escapado y el XML ser válido"""
+    print("🧪 Probando escritura XML de los NFO...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "tvshow.nfo"
+        write_tvshow_nfo(path, tmdb_metadata(), DETAILS)
+        assert path.read_text(encoding='utf-8').startswith('<?xml version="1.0" encoding="utf-8"?>')
+        root = ET.parse(path).getroot()
+        assert root.tag == "tvshow"
+        assert root.findtext("plot") == 'Lannister & Stark: "guerra" <total>'
+        assert root.findtext("originaltitle") == "Game of Thrones" and root.findtext("year") == "2011"
+        assert [genre.text for genre in root.findall("genre")] == ["Sci-Fi & Fantasy", "Drama"]
+        assert root.findtext("studio") == "HBO" and root.findtext("status") == "Ended"
+        assert root.find("uniqueid").attrib == {"type": "tmdb", "default": "true"}
+        assert not list(Path(temp_dir).glob(".*.tmp"))
+
+        anime = SeriesMetadata(name="Naruto")
+        anime.jikan_data = {'id': 20, 'title': 'Naruto', 'synopsis': 'Ninjas', 'year': 2002, 'score': 8.0}
+        write_tvshow_nfo(path, anime)
+        root = ET.parse(path).getroot()
+        assert (root.findtext("title"), root.findtext("plot"), root.findtext("uniqueid")) == ("Naruto", "Ninjas", "20")
+        assert root.findtext("premiered") is None
+
+        episode_path = Path(temp_dir) / "Naruto - S01E05.nfo"
+        write_episode_nfo(episode_path, "Naruto", 1, 5)
+        root = ET.parse(episode_path).getroot()
+        assert (root.tag, root.findtext("title"), root.findtext("episode")) == ("episodedetails", "Episodio 5", "5")
+    print("✅ XML válido y escapado")
+    return True
+
+
+def test_nfo_written_during_batch():
+    """Los NFO de cada episodio se escriben al terminarlo, sin pedir nada a la red"""
+    print("🧪 Probando NFO durante el procesamiento...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = Path(temp_dir) / "origen"
+        source.mkdir()
+        for n in range(1, 4):
+            (source / f"got.s01e0{n}.mkv").write_bytes(b"video" * 100)
+        output = Path(temp_dir) / "salida"
+        output.mkdir()
+
+        config = ConfigManager(str(Path(temp_dir) / "config.json"))
+        config.set("metadata", "download_artwork", False)
+        controller = SeriesController(config)
+        controller.model.history_file = Path(temp_dir) / "history.json"
+        controller.speed_history = SpeedHistory(str(Path(temp_dir) / "encode_history.json"))
+        controller.detect_video_files(str(source))
+        controller.model.metadata = tmdb_metadata()
+        controller.model.metadata.details = DETAILS
+
+        seen_before = []
+        process_single = controller._process_single_file
+
+        def process_and_record(video_file, work_dir, *args):
+            time.sleep(0.05)
+            seen_before.append(sorted(path.name for path in work_dir.glob("*.nfo")))
+            return process_single(video_file, work_dir, *args)
+
+        searcher = controller.metadata_searcher
+        with mock.patch.object(controller, "_process_single_file", side_effect=process_and_record), \
+                mock.patch.object(searcher, "get_tmdb_details") as get_details, \
+                mock.patch.object(searcher, "get_tmdb_season") as get_season:
+            controller._process_files("rename", str(output), "Original", "Medium", "keep_all",
+                                      "0", "mp3", True, True)
+        assert get_details.call_count == 0 and get_season.call_count == 0
+
+        series_dir = output / "Juego de Tronos (2011) [tmdbid-1399]"
+        season_dir = series_dir / "Season 01"
+        # Antes de procesar el tercer episodio ya estaba el NFO del primero
+        assert "season.nfo" in seen_before[0]
+        assert "Juego de Tronos - S01E01 - Capítulo 1 & más.nfo" in seen_before[2]
+
+        assert ET.parse(series_dir / "tvshow.nfo").getroot().findtext("title") == "Juego de Tronos"
+        season = ET.parse(season_dir / "season.nfo").getroot()
+        assert (season.findtext("seasonnumber"), season.findtext("plot")) == ("1", "Invierno <se> acerca")
+        episodes = sorted(season_dir.glob("*S01E0*.nfo"))
+        assert len(episodes) == 3
+        episode = ET.parse(episodes[1]).getroot()
+        assert (episode.findtext("title"), episode.findtext("aired"), episode.findtext("plot")) == \
+            ("Capítulo 2 & <más>", "2011-04-18", "Sinopsis 2")
+        assert controller.nfo_writer.written == 5
+        controller.nfo_writer.shutdown()
+        controller.metadata_searcher.cache.close()
+    print("✅ tvshow.nfo, season.nfo y 3 NFO de episodios escritos durante el lote")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_escaped_streaming_xml,
+        test_nfo_written_during_batch
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para el índice local de metadatos (búsqueda sin conexión)
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.config import ConfigManager
+from app.controller import SeriesController
+from app.offline_index import OfflineIndex, get_offline_index
+
+TMDB_DUMP = [
+    {"adult": False, "id": 1429, "original_name": "進撃の巨人", "name": "Attack on Titan",
+     "first_air_date": "2013-04-07", "popularity": 120.5},
+    {"adult": False, "id": 1399, "original_name": "Game of Thrones", "popularity": 300.1},
+    {"adult": False, "id": 66732, "original_name": "Stranger Things", "popularity": 250.0},
+    {"adult": False, "id": 61459, "original_name": "Pokémon", "popularity": 80.0},
+    {"adult": True, "id": 5, "original_name": "Adultos"}
+]
+
+MAL_DUMP = [
+    {"mal_id": 16498, "title": "Shingeki no Kyojin", "title_english": "Attack on Titan",
+     "title_synonyms": ["AoT", "SnK"], "year": 2013, "episodes": 25, "members": 3900000},
+    {"mal_id": 20, "title": "Naruto", "year": 2002, "episodes": 220, "members": 2800000},
+    {"mal_id": 1735, "title": "Naruto: Shippuuden", "year": 2007, "episodes": 500, "members": 2000000}
+]
+
+
+def write_dump(path, records, extra_lines=()):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        for line in extra_lines:
+            f.write(line + "\n")
+    return str(path)
+
+
+def test_fuzzy_search():
+    """La búsqueda debe tolerar errores, acentos y títulos alternativos"""
+    print("🧪 Probando búsqueda difusa sin red...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = OfflineIndex(str(Path(temp_dir) / "offline.db"))
+        counts = index.import_dump(write_dump(Path(temp_dir) / "tmdb.jsonl", TMDB_DUMP, ["{roto"]), "tmdb")
+        assert (counts["added"], counts["skipped"]) == (4, 1)
+        index.import_dump(write_dump(Path(temp_dir) / "mal.jsonl", MAL_DUMP), "mal")
+
+        start = time.monotonic()
+        results = index.search("atack on titn")
+        assert time.monotonic() - start < 0.1
+        assert {(r['source'], r['id']) for r in results[:2]} == {("tmdb", 1429), ("jikan", 16498)}
+        assert index.search("pokemon")[0]['name'] == "Pokémon"
+        assert index.search("Shippuden")[0]['title'] == "Naruto: Shippuuden"
+        assert index.search("snk", source="jikan")[0]['id'] == 16498
+        assert index.search("Naruto")[0]['id'] == 20
+        assert all(r['source'] == "tmdb" for r in index.search("attack", source="tmdb"))
+        assert index.search("of")[0]['name'] == "Game of Thrones"
+        assert index.search("   ") == []
+        assert index.stats() == {"tmdb": 4, "jikan": 3, "imports": 2}
+        index.close()
+    print("✅ Resultados correctos sin red")
+    return True
+
+
+def test_incremental_updates():
+    """Un volcado más nuevo solo debe reescribir lo que cambió"""
+    print("🧪 Probando actualizaciones incrementales...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = OfflineIndex(str(Path(temp_dir) / "offline.db"))
+        dump = write_dump(Path(temp_dir) / "tmdb_01.jsonl", TMDB_DUMP)
+        # Una importación interrumpida no cuenta como hecha
+        with mock.patch.object(index, "_write_batch", side_effect=KeyboardInterrupt):
+            try:
+                index.import_dump(dump, "tmdb")
+                assert False, "La interrupción debe propagarse"
+            except KeyboardInterrupt:
+                pass
+        assert index.stats()["imports"] == 0
+        assert index.import_dump(dump, "tmdb")["added"] == 4
+        assert index.import_dump(dump, "tmdb")["already_imported"] == 1
+
+        newer = [dict(record) for record in TMDB_DUMP if record['id'] != 66732]
+        newer[1]['name'] = "Juego de Tronos"
+        newer.append({"adult": False, "id": 100088, "original_name": "The Last of Us", "popularity": 90})
+        counts = index.import_dump(write_dump(Path(temp_dir) / "tmdb_02.jsonl", newer), "tmdb", prune=True)
+        assert (counts["added"], counts["updated"], counts["unchanged"], counts["removed"]) == (1, 1, 2, 1)
+
+        assert index.search("juego de tronos")[0]['id'] == 1399
+        assert index.search("game of thrones")[0]['id'] == 1399
+        assert all(r['id'] != 66732 for r in index.search("stranger things"))
+        assert index.search("last of us")[0]['id'] == 100088
+        index.close()
+    print("✅ Solo se reescriben las entradas nuevas o modificadas")
+    return True
+
+
+def test_controller_offline_source():
+    """'offline' debe funcionar como tercera fuente en el controlador"""
+    print("🧪 Probando la fuente local en el controlador...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Las rutas relativas por defecto se resuelven junto a la configuración
+        config = ConfigManager(str(Path(temp_dir) / "config.json"))
+        assert get_offline_index(config) is None
+        index = get_offline_index(config, create=True)
+        assert index.db_path == Path(temp_dir) / "metadata_offline.db"
+        index.import_dump(write_dump(Path(temp_dir) / "tmdb.jsonl", TMDB_DUMP), "tmdb")
+        index.import_dump(write_dump(Path(temp_dir) / "mal.jsonl", MAL_DUMP), "mal")
+        index.close()
+
+        with mock.patch("requests.Session.request", side_effect=AssertionError("sin red")):
+            controller = SeriesController(config)
+            results = controller.search_metadata("attack on titan", "offline")
+        assert {r['source'] for r in results[:2]} == {"tmdb", "jikan"}
+
+        tmdb_result = next(r for r in results if r['source'] == "tmdb")
+        controller.apply_metadata(tmdb_result, "offline")
+        assert (controller.metadata.name, controller.metadata.year, controller.metadata.series_id) == \
+            ("Attack on Titan", "2013", "1429")
+
+        mal_result = controller.search_metadata("naruto", "offline")[0]
+        controller.apply_metadata(mal_result, "offline")
+        assert controller.metadata.jikan_data['id'] == 20 and controller.metadata.name == "Naruto"
+        controller.metadata_searcher.offline_index.close()
+        controller.metadata_searcher.cache.close()
+    print("✅ Fuente local integrada")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_fuzzy_search,
+        test_incremental_updates,
+        test_controller_offline_source
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para los modos de salida progresiva (fMP4/MKV) y faststart
+Usa un script de Python como sustituto de FFmpeg
+"""
+
+import os
+import sys
+import stat
+import struct
+import tempfile
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.utils import FFmpegProcessor, FRAGMENTED_MOVFLAGS
+from app.faststart import (check_faststart, scan_library, FASTSTART_OK, FASTSTART_MISSING,
+                           FASTSTART_FRAGMENTED, FASTSTART_INVALID)
+
+# Sustituto de FFmpeg: copia la entrada (-i) en la salida (último argumento);
+# con -moov_size y un origen 'bigmoov' simula una reserva insuficiente
+FAKE_FFMPEG = '''import sys, shutil
+args = sys.argv[1:]
+source = args[args.index('-i') + 1]
+if 'fail' in source:
+    sys.exit(1)
+if 'bigmoov' in source and '-moov_size' in args:
+    print('reserved_moov_size is too small, needed 1024 additional', flush=True)
+    sys.exit(1)
+with open(source + '.args', 'a') as log:
+    log.write(' '.join(args) + chr(10))
+shutil.copyfile(source, args[-1])
+print('progress=end', flush=True)
+'''
+
+
+def _fake_ffmpeg(temp_dir):
+    script = Path(temp_dir) / "ffmpeg"
+    script.write_text(f"#!{sys.executable}\n{FAKE_FFMPEG}")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return FFmpegProcessor(ffmpeg_path=str(script))
+
+
+def _atom(atom_type, payload=b"", large=False):
+    """Átomo MP4 con tamaño normal o de 64 bits"""
+    if large:
+        return struct.pack('>I4sQ', 1, atom_type, len(payload) + 16) + payload
+    return struct.pack('>I4s', len(payload) + 8, atom_type) + payload
+
+
+def test_output_paths_and_args():
+    """Cada modo debe elegir la ruta y las opciones de contenedor adecuadas"""
+    print("🧪 Probando rutas y opciones por modo...")
+    ffmpeg = FFmpegProcessor(ffmpeg_path=sys.executable)
+    assert ffmpeg.get_progressive_path("/tv/ep.mp4", "mkv") == str(Path("/tv/ep.mkv"))
+    assert ffmpeg.get_progressive_path("/tv/ep.mp4", "fragmented") == "/tv/ep.mp4"
+    assert ffmpeg.get_output_args("/tv/ep.mp4", "fragmented") == ['-movflags', FRAGMENTED_MOVFLAGS]
+    assert ffmpeg.get_output_args("/tv/ep.mkv", "fragmented") == []
+    assert ffmpeg.get_output_args("/tv/ep.mp4") == ['-movflags', '+faststart']
+    assert ffmpeg.get_output_args("/tv/ep.mkv") == []
+    # Copia con duración conocida: índice reservado al principio en una pasada
+    args = ffmpeg.get_output_args("/tv/ep.mp4", "standard", 1440)
+    assert args[0] == '-moov_size' and int(args[1]) > 1440 * 100
+    assert ffmpeg.estimate_moov_size(2880) > ffmpeg.estimate_moov_size(1440)
+    assert ffmpeg.needs_finalize("/tv/ep.mp4", "mkv")
+    assert not ffmpeg.needs_finalize("/tv/ep.mp4", "standard")
+    assert not ffmpeg.needs_finalize("/tv/ep.mkv", "fragmented")
+    print("✅ Rutas y opciones correctas")
+    return True
+
+
+def test_finalize_replaces_progressive_output():
+    """Finalizar debe producir el MP4 final y eliminar la salida MKV intermedia"""
+    print("🧪 Probando finalización...")
+    if os.name == "nt":
+        print("⚠️ Prueba solo para POSIX, omitida")
+        return True
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ffmpeg = _fake_ffmpeg(temp_dir)
+        progressive = Path(temp_dir) / "ep.mkv"
+        progressive.write_bytes(b"episode")
+        output = Path(temp_dir) / "ep.mp4"
+
+        assert ffmpeg.finalize_output(str(progressive), str(output))
+        assert output.read_bytes() == b"episode"
+        assert not progressive.exists()
+        assert not list(Path(temp_dir).glob("*.finalizing*"))
+        args = Path(str(progressive) + '.args').read_text()
+        assert '-map 0 -map_metadata 0 -c copy' in args
+
+        # Reescritura sobre el mismo archivo (python -m app.faststart --fix)
+        assert ffmpeg.finalize_output(str(output), str(output))
+        assert output.read_bytes() == b"episode"
+        assert not list(Path(temp_dir).glob("*.finalizing*"))
+    print("✅ Salida finalizada")
+    return True
+
+
+def test_failed_finalize_keeps_progressive_output():
+    """Si la finalización falla debe conservarse la salida reproducible"""
+    print("🧪 Probando fallo de finalización...")
+    if os.name == "nt":
+        print("⚠️ Prueba solo para POSIX, omitida")
+        return True
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ffmpeg = _fake_ffmpeg(temp_dir)
+        progressive = Path(temp_dir) / "fail.mp4"
+        progressive.write_bytes(b"fragmented")
+
+        assert not ffmpeg.finalize_output(str(progressive), str(progressive))
+        assert progressive.read_bytes() == b"fragmented"
+        assert not list(Path(temp_dir).glob("*.finalizing*"))
+    print("✅ Salida progresiva conservada")
+    return True
+
+
+def test_faststart_fallback_when_reserve_too_small():
+    """Si la reserva del índice no alcanza debe repetirse con +faststart"""
+    print("🧪 Probando reserva insuficiente del índice...")
+    if os.name == "nt":
+        print("⚠️ Prueba solo para POSIX, omitida")
+        return True
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ffmpeg = _fake_ffmpeg(temp_dir)
+        ffmpeg.configure_watchdog(stall_timeout=30, max_retries=0)
+        source = Path(temp_dir) / "bigmoov.ts"
+        source.write_bytes(b"episode")
+        output = Path(temp_dir) / "ep.mp4"
+        cmd = [ffmpeg.ffmpeg_path, '-i', str(source), '-c', 'copy']
+        cmd += ffmpeg.get_output_args(str(output), "standard", 60) + ['-y', str(output)]
+
+        result = ffmpeg.run_with_retries(cmd, str(output))
+        assert result.success
+        assert output.read_bytes() == b"episode"
+        runs = Path(str(source) + '.args').read_text().splitlines()
+        assert len(runs) == 1 and '-movflags +faststart' in runs[0]
+
+        # La finalización hace lo mismo con la duración indicada
+        progressive = Path(temp_dir) / "bigmoov.mkv"
+        progressive.write_bytes(b"progressive")
+        assert ffmpeg.finalize_output(str(progressive), str(output), duration=60)
+        assert output.read_bytes() == b"progressive"
+    print("✅ Reubicación con +faststart tras reserva insuficiente")
+    return True
+
+
+def test_faststart_verification():
+    """La verificación debe detectar el orden de moov y mdat en la biblioteca"""
+    print("🧪 Probando verificación de faststart...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        library = Path(temp_dir) / "Serie" / "Season 01"
+        library.mkdir(parents=True)
+        ftyp = _atom(b'ftyp', b'isom\x00\x00\x02\x00')
+        (library / "ok.mp4").write_bytes(ftyp + _atom(b'moov', b'x' * 20) + _atom(b'free', b'\x00' * 8)
+                                         + _atom(b'mdat', b'v' * 100, large=True))
+        (library / "late.mp4").write_bytes(ftyp + _atom(b'mdat', b'v' * 100) + _atom(b'moov', b'x' * 20))
+        (library / "frag.mp4").write_bytes(ftyp + _atom(b'moov') + _atom(b'moof') + _atom(b'mdat', b'v'))
+        (library / "broken.mp4").write_bytes(ftyp + b'\x00\x00\x00\x02junk')
+        (library / "ep.mkv").write_bytes(b'\x1a\x45\xdf\xa3')
+
+        assert check_faststart(str(library / "ok.mp4")) == FASTSTART_OK
+        assert check_faststart(str(library / "late.mp4")) == FASTSTART_MISSING
+        assert check_faststart(str(library / "frag.mp4")) == FASTSTART_FRAGMENTED
+        assert check_faststart(str(library / "broken.mp4")) == FASTSTART_INVALID
+
+        results = {path.name: status for path, status in scan_library(temp_dir)}
+        assert set(results) == {"ok.mp4", "late.mp4", "frag.mp4", "broken.mp4"}
+    print("✅ Archivos sin faststart detectados")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_output_paths_and_args,
+        test_finalize_replaces_progressive_output,
+        test_failed_finalize_keeps_progressive_output,
+        test_faststart_fallback_when_reserve_too_small,
+        test_faststart_verification
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
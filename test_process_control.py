@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para el control de procesos externos
+Usa el propio intérprete de Python como sustituto de FFmpeg
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.utils import FFmpegProcessor
+from app.process_control import CancellationToken
+
+SLEEP_CMD = [sys.executable, '-c', 'import time; time.sleep(30)']
+
+
+def test_background_launch_priority():
+    """Un proceso lanzado en segundo plano debe tener nice reducido"""
+    print("🧪 Probando lanzamiento en segundo plano...")
+    if os.name == "nt":
+        print("⚠️ Prueba solo para POSIX, omitida")
+        return True
+
+    ffmpeg = FFmpegProcessor(ffmpeg_path=sys.executable)
+    ffmpeg.configure_priority("background", nice_value=7)
+    base_nice = os.getpriority(os.PRIO_PROCESS, 0)
+
+    process = ffmpeg.start_process(SLEEP_CMD, stdout=subprocess.DEVNULL)
+    try:
+        assert process in ffmpeg.process_registry.running()
+        assert os.getpriority(os.PRIO_PROCESS, process.pid) == min(base_nice + 7, 19)
+        if sys.platform.startswith("linux") and shutil.which('ionice'):
+            io_class = subprocess.run(['ionice', '-p', str(process.pid)], capture_output=True, text=True)
+            assert io_class.stdout.strip() == "idle"
+    finally:
+        process.kill()
+        ffmpeg.finish_process(process)
+
+    assert not ffmpeg.process_registry.running()
+    print("✅ Prioridad de lanzamiento correcta")
+    return True
+
+
+def test_live_priority_change():
+    """Cambiar el modo debe afectar a los procesos ya en ejecución"""
+    print("🧪 Probando cambio de prioridad en vivo...")
+    if os.name == "nt":
+        print("⚠️ Prueba solo para POSIX, omitida")
+        return True
+
+    ffmpeg = FFmpegProcessor(ffmpeg_path=sys.executable)
+    process = ffmpeg.start_process(SLEEP_CMD, stdout=subprocess.DEVNULL)
+    try:
+        ffmpeg.background_nice = 12
+        results = ffmpeg.set_priority_mode("background")
+        assert process.pid in results
+        assert os.getpriority(os.PRIO_PROCESS, process.pid) == 12
+    finally:
+        process.kill()
+        ffmpeg.finish_process(process)
+    print("✅ Cambio de prioridad en vivo correcto")
+    return True
+
+
+def _writer_cmd(output_path, ignore_sigterm=False):
+    """Proceso que escribe una salida parcial y luego se queda colgado"""
+    script = (
+        "import signal, sys, time\n"
+        + ("signal.signal(signal.SIGTERM, signal.SIG_IGN)\n" if ignore_sigterm else "")
+        + f"open({str(output_path)!r}, 'wb').write(b'partial')\n"
+        + "print('out_time=00:00:01.000000', flush=True)\n"
+        + "time.sleep(30)\n"
+    )
+    return [sys.executable, '-c', script]
+
+
+def _run_and_cancel(ignore_sigterm):
+    ffmpeg = FFmpegProcessor(ffmpeg_path=sys.executable)
+    token = CancellationToken(grace_period=0.3)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = Path(temp_dir) / "episode.mp4"
+        lines = []
+
+        def cancel_when_started():
+            while not output_path.exists():
+                time.sleep(0.05)
+            time.sleep(0.1)
+            token.cancel()
+
+        canceller = threading.Thread(target=cancel_when_started, daemon=True)
+        canceller.start()
+        started = time.monotonic()
+        result = ffmpeg.run_command(_writer_cmd(output_path, ignore_sigterm),
+                                    str(output_path), lines.append, token)
+        elapsed = time.monotonic() - started
+        canceller.join(timeout=2)
+
+        assert result.cancelled and not result.success
+        assert not output_path.exists(), "La salida parcial debe eliminarse"
+        assert 'out_time=00:00:01.000000' in lines
+        assert elapsed < 5
+        assert token.cancel_latency is not None and token.cancel_latency < 1.0
+        assert not ffmpeg.process_registry.running()
+    return token.cancel_latency
+
+
+def test_cancel_terminates_process():
+    """Cancelar debe terminar el proceso y borrar la salida parcial"""
+    print("🧪 Probando cancelación inmediata...")
+    latency = _run_and_cancel(ignore_sigterm=False)
+    print(f"✅ Cancelado en {latency * 1000:.0f} ms")
+    return True
+
+
+def test_cancel_escalates_to_sigkill():
+    """Si el proceso ignora SIGTERM se debe escalar a SIGKILL"""
+    print("🧪 Probando escalado a SIGKILL...")
+    if os.name == "nt":
+        print("⚠️ Prueba solo para POSIX, omitida")
+        return True
+    latency = _run_and_cancel(ignore_sigterm=True)
+    print(f"✅ Proceso forzado en {latency * 1000:.0f} ms")
+    return True
+
+
+def test_cancelled_token_stops_new_processes():
+    """Un proceso lanzado con un token ya cancelado no debe seguir corriendo"""
+    print("🧪 Probando token ya cancelado...")
+    ffmpeg = FFmpegProcessor(ffmpeg_path=sys.executable)
+    token = CancellationToken(grace_period=0.3)
+    token.cancel()
+    started = time.monotonic()
+    result = ffmpeg.run_command(SLEEP_CMD, cancel_token=token)
+    assert result.return_code != 0 and result.cancelled
+    assert time.monotonic() - started < 2
+    print("✅ Token cancelado respetado")
+    return True
+
+
+def _progress_cmd(stall_after):
+    """Proceso que informa avance unos segundos y luego se cuelga"""
+    script = (
+        "import time\n"
+        f"for i in range({stall_after}):\n"
+        "    print(f'out_time_us={i + 1}000000', flush=True)\n"
+        "    time.sleep(0.1)\n"
+        "time.sleep(30)\n"
+    )
+    return [sys.executable, '-c', script]
+
+
+def test_watchdog_kills_stalled_process():
+    """Un proceso sin avance debe detenerse tras la ventana configurada"""
+    print("🧪 Probando detección de estancamiento...")
+    ffmpeg = FFmpegProcessor(ffmpeg_path=sys.executable)
+    started = time.monotonic()
+    result = ffmpeg.run_command(_progress_cmd(5), stall_timeout=1.0)
+    elapsed = time.monotonic() - started
+
+    assert result.stalled and not result.success
+    # 0.5 s de avance + 1 s de ventana + margen de comprobación
+    assert elapsed < 4
+    print(f"✅ Estancamiento detectado en {elapsed:.1f} s")
+    return True
+
+
+def test_watchdog_allows_progressing_process():
+    """Un proceso que avanza no debe considerarse estancado"""
+    print("🧪 Probando proceso con avance continuo...")
+    ffmpeg = FFmpegProcessor(ffmpeg_path=sys.executable)
+    script = ("import time\n"
+              "for i in range(15):\n"
+              "    print(f'total_size={i * 1000 + 1}', flush=True)\n"
+              "    time.sleep(0.1)\n")
+    result = ffmpeg.run_command([sys.executable, '-c', script], stall_timeout=1.0)
+    assert result.success and not result.stalled
+    print("✅ Proceso con avance completado")
+    return True
+
+
+def test_retries_with_backoff():
+    """Los estancamientos deben reintentarse hasta max_retries"""
+    print("🧪 Probando reintentos con espera...")
+    ffmpeg = FFmpegProcessor(ffmpeg_path=sys.executable)
+    ffmpeg.configure_watchdog(stall_timeout=0.5, max_retries=2, retry_backoff=0.1)
+    attempts = []
+
+    result = ffmpeg.run_with_retries(_progress_cmd(1),
+                                     on_retry=lambda attempt, r: attempts.append(attempt))
+    assert result.stalled
+    assert attempts == [1, 2]
+    print("✅ Reintentos agotados y trabajo marcado como fallido")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_background_launch_priority,
+        test_live_priority_change,
+        test_cancel_terminates_process,
+        test_cancel_escalates_to_sigkill,
+        test_cancelled_token_stops_new_processes,
+        test_watchdog_kills_stalled_process,
+        test_watchdog_allows_progressing_process,
+        test_retries_with_backoff
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para el límite de peticiones a las APIs de metadatos
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from types import SimpleNamespace
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+
+import requests
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import rate_limit
+from app.rate_limit import SourceLimiter, RateLimitError, parse_retry_after
+from app.utils import MetadataSearcher
+
+
+class RateLimitedAPI:
+    """API local que aplica ventanas de peticiones como Jikan y responde 429 al superarlas"""
+
+    def __init__(self, limits, retry_after="1", delay=0.0):
+        self.limits = limits
+        self.retry_after = retry_after
+        self.delay = delay
+        self.arrivals = deque()
+        self.log = []
+        self._lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query).get('q', [''])[0]
+                with api._lock:
+                    now = time.monotonic()
+                    allowed = all(sum(1 for t in api.arrivals if now - t < period) < count
+                                  for count, period in api.limits)
+                    if allowed:
+                        api.arrivals.append(now)
+                    status = 200 if allowed else 429
+                    if url.path != '/anime':
+                        status = 404
+                    api.log.append((now, query, status))
+                if status == 200:
+                    time.sleep(api.delay)
+                    body = json.dumps({'data': [{'mal_id': len(query), 'title': query}]}).encode()
+                else:
+                    body = b'{}'
+                self.send_response(status)
+                if status == 429 and api.retry_after:
+                    self.send_header('Retry-After', api.retry_after)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def statuses(self):
+        with self._lock:
+            return [status for _, _, status in self.log]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeJikan:
+    """Cliente Jikan mínimo que consulta la API local"""
+
+    def __init__(self, base_url, path='/anime'):
+        self.url = base_url + path
+
+    def search_anime(self, query, limit=10):
+        response = requests.get(self.url, params={'q': query}, timeout=5)
+        response.raise_for_status()
+        return [SimpleNamespace(mal_id=item['mal_id'], title=item['title'], title_english=None,
+                                synopsis='', year=None, score=None, episodes=None, status='',
+                                image_url='') for item in response.json()['data']]
+
+
+def make_searcher(api, path='/anime'):
+    searcher = MetadataSearcher()
+    searcher.jikan = FakeJikan(api.base_url, path)
+    return searcher
+
+
+def run_concurrently(func, items, workers=4):
+    results = {}
+    pending = deque(items)
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                item = pending.popleft()
+            results[item] = func(item)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_bulk_lookups_within_limits():
+    """Una identificación masiva debe ir al ritmo máximo permitido sin recibir 429"""
+    print("🧪 Probando búsquedas masivas dentro del límite...")
+    limits = ((4, 0.5), (10, 2.0))
+    api = RateLimitedAPI(limits)
+    limiter = SourceLimiter(limits)
+    try:
+        with mock.patch("app.utils.JIKAN_AVAILABLE", True), \
+                mock.patch.dict(rate_limit._limiters, {"jikan": limiter}):
+            searcher = make_searcher(api)
+            queries = [f"serie {i:02d}" for i in range(16)]
+            start = time.monotonic()
+            results = run_concurrently(searcher.search_jikan, queries)
+            elapsed = time.monotonic() - start
+
+        assert all(results[q][0]['title'] == q for q in queries)
+        assert api.statuses() == [200] * 16, api.statuses()
+        # 16 peticiones con 10 cada 2 s necesitan algo más de 2 s; sin esperas de más
+        assert 2.0 <= elapsed < 3.5, elapsed
+        assert limiter.stats()["requests"] == 16 and limiter.stats()["throttled"] == 0
+    finally:
+        api.close()
+    print(f"✅ 16 búsquedas en {elapsed:.1f}s sin respuestas 429")
+    return True
+
+
+def test_retry_after_backoff():
+    """Ante un 429 se espera lo indicado en Retry-After; otros errores no se reintentan"""
+    print("🧪 Probando reintentos con Retry-After...")
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("pronto") is None
+
+    api = RateLimitedAPI(((3, 1.0),), retry_after="1")
+    try:
+        # Un cliente más permisivo que el servidor recibe 429 y debe recuperarse
+        limiter = SourceLimiter(((20, 1.0),))
+        client = FakeJikan(api.base_url)
+        results = run_concurrently(lambda q: limiter.call(lambda: client.search_anime(q)),
+                                   [f"q{i}" for i in range(6)], workers=6)
+        assert all(results[q][0].title == q for q in results)
+        assert limiter.stats()["throttled"] >= 1
+        # Tras cada 429 nadie vuelve a llamar antes de que pase el Retry-After
+        first_429 = next(t for t, _, status in api.log if status == 429)
+        later = [t for t, _, status in api.log if t > first_429 + 0.05]
+        assert later and min(later) >= first_429 + 0.9
+
+        missing = SourceLimiter(((20, 1.0),))
+        try:
+            missing.call(lambda: FakeJikan(api.base_url, '/otro').search_anime("x"))
+            assert False, "Un 404 debe propagarse"
+        except requests.HTTPError:
+            pass
+        assert missing.stats()["requests"] == 1
+
+        always_busy = SourceLimiter(((20, 1.0),), max_retries=2, base_backoff=0.05)
+        busy = requests.Response()
+        busy.status_code = 429
+        try:
+            always_busy.call(lambda: busy.raise_for_status())
+            assert False, "Debe rendirse tras los reintentos"
+        except RateLimitError:
+            pass
+        assert always_busy.stats()["requests"] == 3
+    finally:
+        api.close()
+    print("✅ Reintentos respetan Retry-After y se limitan")
+    return True
+
+
+def test_identical_requests_coalesced():
+    """Las búsquedas idénticas simultáneas deben compartir una sola petición"""
+    print("🧪 Probando agrupación de peticiones idénticas...")
+    api = RateLimitedAPI(((3, 1.0),), delay=0.3)
+    limiter = SourceLimiter(((3, 1.0),))
+    try:
+        with mock.patch("app.utils.JIKAN_AVAILABLE", True), \
+                mock.patch.dict(rate_limit._limiters, {"jikan": limiter}):
+            searcher = make_searcher(api)
+            barrier = threading.Barrier(8)
+
+            def search(i):
+                barrier.wait()
+                return searcher.search_jikan("Naruto" if i % 2 else " naruto ")
+
+            results = run_concurrently(search, range(8), workers=8)
+
+        assert len(api.log) == 1
+        assert all(result and result[0]['title'].strip().lower() == "naruto" for result in results.values())
+        assert limiter.stats()["coalesced"] == 7
+    finally:
+        api.close()
+    print("✅ 8 búsquedas idénticas, 1 petición a la red")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_bulk_lookups_within_limits,
+        test_retry_after_backoff,
+        test_identical_requests_coalesced
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
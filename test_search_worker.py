@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para la búsqueda de metadatos en segundo plano
+"""
+
+import os
+import sys
+import time
+import queue
+import tempfile
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import rate_limit
+from app.config import ConfigManager
+from app.controller import SeriesController
+from app.rate_limit import SourceLimiter
+from app.search_worker import MetadataSearchWorker, DetailsPrefetcher
+
+
+class FakeSearch:
+    """Búsqueda que registra las consultas y tarda lo indicado por consulta"""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.calls = []
+        self.threads = set()
+
+    def __call__(self, query, source):
+        self.calls.append(query)
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delays.get(query, 0))
+        if query == "falla":
+            raise ConnectionError("sin red")
+        return [{'name': query, 'source': source}]
+
+
+def make_worker(search, **kwargs):
+    """Worker cuya 'interfaz' es una cola atendida por el hilo de la prueba"""
+    ui_queue = queue.Queue()
+    delivered = []
+    worker = MetadataSearchWorker(search, ui_queue.put, **kwargs)
+
+    def on_results(query, source, results, error):
+        delivered.append((query, source, results, error))
+
+    def pump(timeout=1.0):
+        # Equivale al bucle de Tk: ejecuta las entregas en este hilo
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                ui_queue.get(timeout=0.02)()
+            except queue.Empty:
+                pass
+
+    return worker, on_results, delivered, pump
+
+
+def test_debounce_collapses_keystrokes():
+    """Las pulsaciones rápidas deben producir una única búsqueda con el texto final"""
+    print("🧪 Probando agrupación de pulsaciones...")
+    search = FakeSearch()
+    worker, on_results, delivered, pump = make_worker(search, debounce=0.15)
+
+    start = time.monotonic()
+    for prefix in ("na", "nar", "naru", "narut", "naruto"):
+        assert worker.request(prefix, "tmdb", on_results)
+        time.sleep(0.02)
+    assert time.monotonic() - start < 0.15, "request() no debe bloquear"
+    pump(0.5)
+
+    assert search.calls == ["naruto"]
+    assert delivered == [("naruto", "tmdb", [{'name': 'naruto', 'source': 'tmdb'}], None)]
+    assert threading.current_thread().name not in search.threads
+    worker.shutdown()
+    print("✅ Una sola búsqueda fuera del hilo de la interfaz")
+    return True
+
+
+def test_stale_results_are_dropped():
+    """Los resultados de una búsqueda superada por otra no deben mostrarse"""
+    print("🧪 Probando descarte de resultados obsoletos...")
+    search = FakeSearch({"bleach": 0.3})
+    worker, on_results, delivered, pump = make_worker(search, debounce=0)
+
+    worker.request("bleach", "jikan", on_results)
+    time.sleep(0.05)
+    worker.request("one piece", "jikan", on_results)
+    pump(0.6)
+
+    assert search.calls == ["bleach", "one piece"]
+    assert [entry[0] for entry in delivered] == ["one piece"]
+    assert worker.superseded == 1
+
+    # Una entrega ya encolada tampoco se ejecuta si llega una consulta nueva
+    worker.request("dororo", "jikan", on_results)
+    time.sleep(0.1)
+    worker.cancel()
+    pump(0.2)
+    assert [entry[0] for entry in delivered] == ["one piece"]
+    worker.shutdown()
+    print("✅ Solo se muestra la consulta más reciente")
+    return True
+
+
+def test_immediate_short_and_errors():
+    """Enter busca al instante; las consultas cortas se ignoran y los errores se entregan"""
+    print("🧪 Probando búsqueda inmediata, consultas cortas y errores...")
+    search = FakeSearch()
+    worker, on_results, delivered, pump = make_worker(search, debounce=5, min_length=3)
+
+    assert not worker.request("na", "tmdb", on_results)
+    assert not worker.request("   ", "tmdb", on_results, immediate=True)
+    assert worker.request("K", "tmdb", on_results, immediate=True)
+    pump(0.3)
+    assert delivered and delivered[0][:3] == ("K", "tmdb", [{'name': 'K', 'source': 'tmdb'}])
+
+    worker.request("falla", "tmdb", on_results, immediate=True)
+    pump(0.3)
+    query, _, results, error = delivered[-1]
+    assert query == "falla" and results == [] and isinstance(error, ConnectionError)
+    worker.shutdown()
+    print("✅ Búsqueda inmediata y errores entregados a la interfaz")
+    return True
+
+
+def test_prefetch_top_results():
+    """Solo se precargan los primeros resultados y una precarga nueva cancela la anterior"""
+    print("🧪 Probando precarga de detalles...")
+    calls = []
+
+    def get_details(source, item_id, cancel_token):
+        calls.append((source, item_id))
+        # Simula la espera de turno en el limitador, que atiende la cancelación
+        if cancel_token.wait(0.2):
+            return None
+        return {'id': item_id, 'source': source}
+
+    prefetcher = DetailsPrefetcher(get_details, top_n=3, max_workers=1)
+    results = [{'id': i} for i in range(5)] + [{'name': 'sin id'}]
+    assert prefetcher.prefetch(results, "tmdb") == 3
+    time.sleep(0.05)
+    assert prefetcher.prefetch([{'id': 20, 'source': 'jikan'}, {'id': 7, 'source': 'otra'}], "offline") == 1
+    assert prefetcher.wait(timeout=2)
+    assert calls == [("tmdb", 0), ("jikan", 20)]
+    assert prefetcher.cancelled == 2
+    assert prefetcher.get("jikan", "20") == {'id': 20, 'source': 'jikan'}
+    assert prefetcher.get("tmdb", 0) is None
+    prefetcher.shutdown()
+    print("✅ Top N precargado y precarga anterior cancelada")
+    return True
+
+
+def test_prefetch_makes_apply_instant():
+    """Al elegir un resultado precargado, aplicar no espera a la red"""
+    print("🧪 Probando aplicación instantánea de metadatos...")
+    shows = [SimpleNamespace(id=70523 + i, name=f"Dark {i}", original_name=f"Dark {i}", overview="",
+                             first_air_date="2017-12-01", vote_average=8.0, poster_path=None) for i in range(5)]
+    tv = mock.MagicMock()
+    others = [SimpleNamespace(**dict(vars(show), id=show.id + 100)) for show in shows]
+    tv.return_value.search.side_effect = lambda query: shows if query == "dark" else others
+    tv.return_value.details.side_effect = lambda series_id: SimpleNamespace(id=series_id, number_of_seasons=3)
+    limiter = SourceLimiter(((20, 1.0),))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = ConfigManager(str(Path(temp_dir) / "config.json"))
+        with mock.patch("app.utils.TMDB_AVAILABLE", True), mock.patch("app.utils.TV", tv), \
+                mock.patch.dict(rate_limit._limiters, {"tmdb": limiter}):
+            controller = SeriesController(config)
+            controller.metadata_searcher.tmdb = object()
+            results = controller.search_metadata("dark", "tmdb")
+            assert controller.details_prefetcher.wait(timeout=5)
+            assert tv.return_value.details.call_count == 3
+            assert limiter.stats()["requests"] == 4
+
+            start = time.monotonic()
+            controller.apply_metadata(results[0], "tmdb")
+            assert time.monotonic() - start < 0.05
+            assert controller.metadata.details == {'id': 70523, 'number_of_seasons': 3}
+            assert tv.return_value.details.call_count == 3
+
+            # Un resultado fuera del top N se aplica igual de rápido y sus detalles llegan después
+            controller.apply_metadata(results[4], "tmdb")
+            assert controller.metadata.details is None
+            assert controller.details_prefetcher.wait(timeout=5)
+            assert controller.metadata_searcher.peek_cached("tmdb", "details", 70527)['id'] == 70527
+
+            # Con el limitador agotado, una búsqueda nueva libera la precarga que espera turno
+            slow = SourceLimiter(((1, 30.0),))
+            with mock.patch.dict(rate_limit._limiters, {"tmdb": slow}):
+                controller.search_metadata("dark matter", "tmdb")
+                time.sleep(0.1)
+                start = time.monotonic()
+                controller.search_metadata("otra", "offline")
+                assert controller.details_prefetcher.wait(timeout=1)
+                assert time.monotonic() - start < 0.5
+            assert slow.stats()["requests"] == 1
+            assert tv.return_value.details.call_count == 4
+        controller.metadata_searcher.cache.close()
+    print("✅ Detalles precargados respetando el límite y cancelables")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_debounce_collapses_keystrokes,
+        test_stale_results_are_dropped,
+        test_immediate_short_and_errors,
+        test_prefetch_top_results,
+        test_prefetch_makes_apply_instant
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
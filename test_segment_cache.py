@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para la caché de segmentos HLS
+Verifica claves estables, reanudación, verificación de tamaño y expulsión LRU
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.hls import HLSDownloader, HLSCancelled
+from app.segment_cache import SegmentCache, normalize_uri
+from app.process_control import CancellationToken
+from test_hls_downloader import StandInServer, _segment, _media_playlist
+
+
+def _segment_requests(server):
+    return [path for path, _ in server.requests if path.split('?')[0].endswith('.ts')]
+
+
+def test_volatile_tokens_are_ignored():
+    """La clave no debe depender de tokens de firma ni del orden de parámetros"""
+    print("🧪 Probando normalización de URI...")
+    a = normalize_uri("http://cdn/x/seg1.ts?token=aaa&quality=hd&Expires=1")
+    b = normalize_uri("http://cdn/x/seg1.ts?Expires=2&quality=hd&token=bbb&X-Amz-Signature=z")
+    assert a == b == "http://cdn/x/seg1.ts?quality=hd"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = SegmentCache(temp_dir)
+        assert cache.make_key("http://cdn/a.ts", (100, 0)) != cache.make_key("http://cdn/a.ts", (100, 100))
+    print("✅ URI normalizada")
+    return True
+
+
+def test_resume_from_cache():
+    """Una descarga cancelada debe reanudarse sin repetir los segmentos ya bajados"""
+    print("🧪 Probando reanudación desde la caché...")
+    count = 30
+    files = {"/s/index.m3u8": _media_playlist(count)}
+    files.update({f"/s/seg{i}.ts": _segment(i) for i in range(count)})
+    server = StandInServer(files, delay=0.05)
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = SegmentCache(str(Path(temp_dir) / "segments"))
+            url = f"{server.url}/s/index.m3u8"
+
+            token = CancellationToken()
+            threading.Timer(0.2, token.cancel).start()
+            try:
+                HLSDownloader(max_workers=2, cache=cache).download(url, Path(temp_dir) / "a", cancel_token=token)
+                assert False, "La descarga debía cancelarse"
+            except HLSCancelled:
+                pass
+            first = len(_segment_requests(server))
+            cached = cache.entry_count
+            assert 0 < cached < count
+
+            # Reinicio: una caché nueva sobre la misma carpeta
+            server.requests.clear()
+            downloader = HLSDownloader(max_workers=4, cache=SegmentCache(str(Path(temp_dir) / "segments")))
+            downloader.download(url, Path(temp_dir) / "b")
+            assert downloader.cache_hits == cached
+            assert len(_segment_requests(server)) == count - cached
+            for i in range(count):
+                assert (Path(temp_dir) / "b" / f"seg_{i:05d}.ts").read_bytes() == _segment(i)
+            print(f"✅ Reanudado: {cached} desde caché, {count - cached} descargados (antes {first})")
+    finally:
+        server.close()
+    return True
+
+
+def test_corrupt_entry_is_discarded():
+    """Un segmento en caché con tamaño incorrecto debe descargarse de nuevo"""
+    print("🧪 Probando verificación de tamaño...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = Path(temp_dir) / "seg.ts"
+        source.write_bytes(b"x" * 500)
+        cache = SegmentCache(str(Path(temp_dir) / "segments"))
+        path = cache.put("http://cdn/seg.ts?token=1", None, source)
+        assert cache.get("http://cdn/seg.ts?token=2") == path
+
+        source.unlink()
+        path.write_bytes(b"x" * 10)
+        assert cache.get("http://cdn/seg.ts") is None
+        assert cache.entry_count == 0 and not path.exists()
+    print("✅ Entrada corrupta descartada")
+    return True
+
+
+def test_lru_eviction():
+    """Al superar el límite deben eliminarse los segmentos menos usados"""
+    print("🧪 Probando expulsión LRU...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = SegmentCache(str(Path(temp_dir) / "segments"), max_bytes=250)
+        source = Path(temp_dir) / "seg.ts"
+        for i in range(3):
+            source.write_bytes(b"x" * 100)
+            cache.put(f"http://cdn/{i}.ts", None, source)
+            source.unlink()
+            time.sleep(0.02)
+        # Usar el primero para que sea el más reciente
+        time.sleep(0.02)
+        assert cache.get("http://cdn/0.ts")
+
+        removed, freed = cache.evict()
+        assert (removed, freed) == (1, 100)
+        assert cache.get("http://cdn/1.ts") is None
+        assert cache.get("http://cdn/0.ts") and cache.get("http://cdn/2.ts")
+
+        assert cache.clear() == (2, 200)
+        assert cache.total_bytes == 0
+    print("✅ Expulsión LRU correcta")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_volatile_tokens_are_ignored,
+        test_resume_from_cache,
+        test_corrupt_entry_is_discarded,
+        test_lru_eviction
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
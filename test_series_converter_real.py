@@ -26,8 +26,10 @@ def test_series_converter_integration():
         print("✅ Importaciones exitosas")
         
         # Crear instancias
-        config_manager = ConfigManager()
-        controller = SeriesController(config_manager)
+        # Configuración temporal: la caché de metadatos se crea junto a ella, no en el repositorio
+        with tempfile.TemporaryDirectory() as config_dir:
+            config_manager = ConfigManager(str(Path(config_dir) / "config.json"))
+            controller = SeriesController(config_manager)
         
         print("✅ Controlador creado")
         
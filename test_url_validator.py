@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de prueba para la validación previa de URLs de episodios
+Usa un servidor HTTP local como sustituto de un origen HLS real
+"""
+
+import os
+import sys
+import time
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.url_validator import (URLValidator, STATUS_OK, STATUS_NOT_FOUND, STATUS_FORBIDDEN,
+                               STATUS_UNREACHABLE, STATUS_INVALID)
+from test_hls_downloader import StandInServer, _segment, _media_playlist
+
+
+def _episode_files(prefix, count):
+    files = {f"/{prefix}/index.m3u8": _media_playlist(count)}
+    for i in range(count):
+        files[f"/{prefix}/seg{i}.ts"] = _segment(i)
+    return files
+
+
+def test_validate_playlist_and_segments():
+    """Debe leer la lista maestra y comprobar solo el primer y último segmento"""
+    print("🧪 Probando validación de una lista válida...")
+    files = _episode_files("ep1", 6)
+    files["/ep1/master.m3u8"] = ("#EXTM3U\n"
+                                 "#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360\n"
+                                 "index.m3u8\n"
+                                 "#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080\n"
+                                 "missing.m3u8\n").encode()
+    server = StandInServer(files, allow_head=True)
+    validator = URLValidator(max_workers=4, timeout=5)
+    try:
+        result = validator.validate(f"{server.url}/ep1/master.m3u8", target_height=360)
+        assert result.ok, result.message
+        assert result.duration == 24.0 and result.segment_count == 6
+        assert result.variants == [("640x360", 800), ("1920x1080", 5000)]
+        assert result.variant_height == 360
+        checked = [path for path, _ in server.requests if path.startswith("HEAD")]
+        assert checked == ["HEAD /ep1/seg0.ts?token=abc", "HEAD /ep1/seg5.ts?token=abc"]
+    finally:
+        server.close()
+    print("✅ Lista, variantes y segmentos comprobados")
+    return True
+
+
+def test_classify_failures():
+    """Debe distinguir enlaces caídos, denegados y sin conexión"""
+    print("🧪 Probando clasificación de fallos...")
+    files = _episode_files("dead", 3)
+    files.update(_episode_files("geo", 3))
+    files["/empty/index.m3u8"] = b"#EXTM3U\n#EXT-X-TARGETDURATION:4\n#EXT-X-ENDLIST\n"
+    # Lista accesible pero con el último segmento caducado (y sin soporte de HEAD)
+    server = StandInServer(files, statuses={"/dead/seg2.ts": 404, "/geo/index.m3u8": 403})
+    validator = URLValidator(max_workers=4, timeout=5)
+    try:
+        dead = validator.validate(f"{server.url}/dead/index.m3u8")
+        assert dead.status == STATUS_NOT_FOUND and "seg2.ts" in dead.message
+        assert dead.duration == 12.0
+        assert validator.validate(f"{server.url}/geo/index.m3u8").status == STATUS_FORBIDDEN
+        assert validator.validate(f"{server.url}/empty/index.m3u8").status == STATUS_INVALID
+        # HEAD no soportado: se valida con un GET de un byte
+        assert ("/dead/seg0.ts?token=abc", "bytes=0-0") in server.requests
+    finally:
+        server.close()
+    unreachable = validator.validate(f"{server.url}/dead/index.m3u8")
+    assert unreachable.status == STATUS_UNREACHABLE
+    print("✅ Fallos clasificados")
+    return True
+
+
+def test_validate_all_concurrently():
+    """Debe validar en paralelo, una sola vez por URL repetida, informando por fila"""
+    print("🧪 Probando validación en paralelo...")
+    files = {}
+    for n in range(6):
+        files.update(_episode_files(f"ep{n}", 2))
+    # Sin HEAD: cada segmento se comprueba con un GET que tarda 0.2 s
+    server = StandInServer(files, delay=0.2)
+    validator = URLValidator(max_workers=6, timeout=5)
+    urls = [f"{server.url}/ep{n}/index.m3u8" for n in range(6)] + [f"{server.url}/ep0/index.m3u8"]
+    reported = []
+    try:
+        start = time.monotonic()
+        results = validator.validate_all(urls, on_result=lambda index, result: reported.append(index))
+        elapsed = time.monotonic() - start
+        assert all(result.status == STATUS_OK for result in results)
+        assert sorted(reported) == list(range(7))
+        assert results[0] is results[6]
+        playlist_requests = [path for path, _ in server.requests if path == "/ep0/index.m3u8"]
+        assert len(playlist_requests) == 1
+        # Secuencial serían al menos 6 × 2 × 0.2 s
+        assert elapsed < 1.2, f"Validación demasiado lenta: {elapsed:.2f}s"
+    finally:
+        server.close()
+    print(f"✅ {len(urls)} URLs validadas en {elapsed:.2f}s")
+    return True
+
+
+def main():
+    """Función principal"""
+    tests = [
+        test_validate_playlist_and_segments,
+        test_classify_failures,
+        test_validate_all_concurrently
+    ]
+    results = [test() for test in tests]
+    print(f"\n📊 Resultado: {sum(results)}/{len(results)} pruebas exitosas")
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
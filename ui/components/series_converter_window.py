@@ -7,10 +7,36 @@ Ventana del Convertidor de Series M3U8
 import customtkinter as ctk
 from tkinter import messagebox, filedialog
 import threading
-import json
+import requests
 from pathlib import Path
 from datetime import datetime
 
+from app.process_control import CancellationToken
+from app.episode_queue import EpisodeQueue, EpisodeJob, FetchEncodePipeline
+from app.hls import HLSDownloader, HLSError, HLSCancelled, is_hls_url, remove_work_dir
+from app.segment_cache import get_segment_cache
+from app.url_validator import URLValidator
+from app.bandwidth import BandwidthLimiter, mbps_to_bytes
+from app.episode_import import import_episodes, save_episode_list, detect_format, EpisodeImportError
+
+# Altura de cada resolución seleccionable (para elegir variantes HLS)
+RESOLUTION_HEIGHTS = {
+    "1080p": 1080,
+    "720p": 720,
+    "480p": 480,
+    "360p": 360
+}
+
+# Filas de episodios mostradas como máximo (las listas importadas pueden tener miles)
+EPISODE_DISPLAY_LIMIT = 300
+
+# Modos de salida (ver FFmpegProcessor.OUTPUT_MODES)
+OUTPUT_MODE_LABELS = {
+    "Estándar": "standard",
+    "Ver mientras convierte (fMP4)": "fragmented",
+    "Ver mientras convierte (MKV)": "mkv"
+}
+
 class SeriesConverterWindow:
     def __init__(self, controller, config_manager, parent=None):
         self.controller = controller
@@ -22,6 +48,16 @@ class SeriesConverterWindow:
         self.is_converting = False
         self.current_episode = 0
         self.total_episodes = 0
+        self.cancel_token = CancellationToken()
+        self.episode_queue = None
+        self.segment_cache = None
+        self.episode_rows = {}
+        self.progress_lock = threading.Lock()
+        self.validation_results = {}
+        self.validation_labels = {}
+        self.bandwidth_limiter = BandwidthLimiter(
+            mbps_to_bytes(self.config_manager.get("converter", "max_bandwidth_mbps", 0)),
+            mbps_to_bytes(self.config_manager.get("converter", "episode_bandwidth_mbps", 0)))
         
         self.setup_window()
         self.create_interface()
@@ -43,9 +79,17 @@ class SeriesConverterWindow:
         self.start_episode = ctk.StringVar(value="01")
         self.resolution = ctk.StringVar(value="Original")
         self.compression_level = ctk.StringVar(value="Medium")
+        output_mode = self.config_manager.get("converter", "output_mode", "standard")
+        self.output_mode_label = ctk.StringVar(value=next(
+            (label for label, mode in OUTPUT_MODE_LABELS.items() if mode == output_mode), "Estándar"))
         self.output_directory = ctk.StringVar(value=str(Path.cwd()))
         self.episode_url_var = ctk.StringVar()
         self.episode_name_var = ctk.StringVar()
+        self.background_mode = ctk.BooleanVar(value=self.controller.priority_mode == "background")
+        self.global_bandwidth_var = ctk.StringVar(
+            value=str(self.config_manager.get("converter", "max_bandwidth_mbps", 0)))
+        self.episode_bandwidth_var = ctk.StringVar(
+            value=str(self.config_manager.get("converter", "episode_bandwidth_mbps", 0)))
         
     def create_interface(self):
         """Crear la interfaz principal"""
@@ -193,6 +237,8 @@ class SeriesConverterWindow:
                     font=ctk.CTkFont(size=12, weight="bold")).pack(side="left", padx=5)
         ctk.CTkLabel(headers_frame, text="URL", width=300, 
                     font=ctk.CTkFont(size=12, weight="bold")).pack(side="left", padx=5)
+        ctk.CTkLabel(headers_frame, text="Estado", width=150, 
+                    font=ctk.CTkFont(size=12, weight="bold")).pack(side="left", padx=5)
         
         # Botones para manejar lista
         buttons_frame = ctk.CTkFrame(episodes_frame)
@@ -212,6 +258,8 @@ class SeriesConverterWindow:
                      width=80).pack(side="left", padx=(0, 5), pady=10)
         ctk.CTkButton(buttons_frame, text="💾 Guardar", command=self.save_episodes_file, 
                      width=80).pack(side="left", padx=(0, 5), pady=10)
+        ctk.CTkButton(buttons_frame, text="🔍 Validar", command=self.validate_episodes, 
+                     width=80).pack(side="left", padx=(0, 5), pady=10)
         
     def create_video_config(self, parent):
         """Crear sección de configuración de video"""
@@ -247,6 +295,67 @@ class SeriesConverterWindow:
                                                 state="readonly", width=150)
         self.compression_combo.pack(padx=10, pady=(0, 10))
         
+        # Modo de salida (reproducible durante la conversión)
+        output_frame = ctk.CTkFrame(video_frame)
+        output_frame.pack(fill="x", padx=15, pady=(0, 10))
+        
+        ctk.CTkLabel(output_frame, text="Salida:", 
+                    font=ctk.CTkFont(size=12, weight="bold")).pack(side="left", padx=10, pady=10)
+        self.output_mode_combo = ctk.CTkComboBox(output_frame, variable=self.output_mode_label,
+                                                values=list(OUTPUT_MODE_LABELS.keys()),
+                                                state="readonly", width=240)
+        self.output_mode_combo.pack(side="left", padx=10, pady=10)
+        
+        # Límite de ancho de banda (se puede cambiar durante la conversión)
+        bandwidth_frame = ctk.CTkFrame(video_frame)
+        bandwidth_frame.pack(fill="x", padx=15, pady=(0, 10))
+        
+        ctk.CTkLabel(bandwidth_frame, text="Ancho de banda (Mbps, 0 = sin límite):", 
+                    font=ctk.CTkFont(size=12, weight="bold")).pack(side="left", padx=10, pady=10)
+        ctk.CTkLabel(bandwidth_frame, text="Global").pack(side="left", padx=(10, 5))
+        ctk.CTkEntry(bandwidth_frame, textvariable=self.global_bandwidth_var, 
+                    width=70).pack(side="left", padx=(0, 10))
+        ctk.CTkLabel(bandwidth_frame, text="Por episodio").pack(side="left", padx=(10, 5))
+        ctk.CTkEntry(bandwidth_frame, textvariable=self.episode_bandwidth_var, 
+                    width=70).pack(side="left", padx=(0, 10))
+        ctk.CTkButton(bandwidth_frame, text="Aplicar", command=self.apply_bandwidth_limits, 
+                     width=80).pack(side="left", padx=10)
+        
+        # Prioridad de ejecución (se puede cambiar durante la conversión)
+        self.background_switch = ctk.CTkSwitch(video_frame, 
+                                               text="🌙 Segundo plano (baja prioridad de CPU y disco)",
+                                               variable=self.background_mode,
+                                               command=self.on_priority_mode_change)
+        self.background_switch.pack(anchor="w", padx=25, pady=(0, 15))
+        
+    def apply_bandwidth_limits(self):
+        """Aplicar los límites de ancho de banda (también a las descargas en curso)"""
+        try:
+            global_mbps = float(self.global_bandwidth_var.get().replace(',', '.') or 0)
+            episode_mbps = float(self.episode_bandwidth_var.get().replace(',', '.') or 0)
+            if global_mbps < 0 or episode_mbps < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("Advertencia", "Los límites deben ser números positivos (Mbps)")
+            return
+        
+        # La cola de episodios lee el límite global de la misma cubeta
+        self.bandwidth_limiter.set_global_rate(mbps_to_bytes(global_mbps))
+        self.bandwidth_limiter.set_episode_rate(mbps_to_bytes(episode_mbps))
+        self.config_manager.set("converter", "max_bandwidth_mbps", global_mbps)
+        self.config_manager.set("converter", "episode_bandwidth_mbps", episode_mbps)
+        
+        def describe(mbps):
+            return f"{mbps:g} Mbps" if mbps else "sin límite"
+        self.log_message(f"📶 Ancho de banda: global {describe(global_mbps)}, "
+                         f"por episodio {describe(episode_mbps)}")
+        
+    def on_priority_mode_change(self):
+        """Cambio en el modo de prioridad de ejecución"""
+        mode = "background" if self.background_mode.get() else "normal"
+        self.controller.set_priority_mode(mode)
+        self.log_message(f"🌙 Modo de ejecución: {'segundo plano' if mode == 'background' else 'normal'}")
+        
     def create_progress_section(self, parent):
         """Crear sección de progreso"""
         progress_frame = ctk.CTkFrame(parent)
@@ -268,14 +377,9 @@ class SeriesConverterWindow:
         self.overall_progress.pack(fill="x", padx=15, pady=(0, 10))
         self.overall_progress.set(0)
         
-        # Progreso del episodio actual
-        self.episode_label = ctk.CTkLabel(progress_inner_frame, text="", 
-                                         font=ctk.CTkFont(size=11))
-        self.episode_label.pack(pady=(0, 5))
-        
-        self.episode_progress = ctk.CTkProgressBar(progress_inner_frame)
-        self.episode_progress.pack(fill="x", padx=15, pady=(0, 15))
-        self.episode_progress.set(0)
+        # Progreso de cada episodio en curso
+        self.active_episodes_frame = ctk.CTkFrame(progress_inner_frame, fg_color="transparent")
+        self.active_episodes_frame.pack(fill="x", pady=(0, 10))
         
     def create_log_section(self, parent):
         """Crear sección de log"""
@@ -324,6 +428,12 @@ class SeriesConverterWindow:
                                         height=40, width=120)
         self.stop_button.pack(side="left", padx=10, pady=15)
         
+        # Botón limpiar caché de segmentos
+        ctk.CTkButton(buttons_container, text="🧹 Limpiar Caché", 
+                     command=self.clear_segment_cache,
+                     font=ctk.CTkFont(size=14, weight="bold"),
+                     height=40, width=140).pack(side="left", padx=10, pady=15)
+        
         # Botón volver al menú
         ctk.CTkButton(buttons_container, text="🏠 Menú Principal", 
                      command=self.back_to_menu,
@@ -457,6 +567,8 @@ class SeriesConverterWindow:
         self.episode_name_var.set('')
         
         self.log_message(f"✅ Episodio {episode_num} agregado: {name}")
+        if self.config_manager.get("converter", "validate_on_add", True):
+            self.validate_episodes(only_new=True)
         
     def refresh_episodes_display(self):
         """Actualizar la visualización de episodios"""
@@ -466,7 +578,8 @@ class SeriesConverterWindow:
                 widget.destroy()
         
         # Recrear lista
-        for i, episode in enumerate(self.episodes_list):
+        self.validation_labels = {}
+        for i, episode in enumerate(self.episodes_list[:EPISODE_DISPLAY_LIMIT]):
             episode_frame = ctk.CTkFrame(self.episodes_scroll_frame)
             episode_frame.pack(fill="x", pady=2)
             
@@ -481,6 +594,18 @@ class SeriesConverterWindow:
             url_text = episode['url'][:40] + "..." if len(episode['url']) > 40 else episode['url']
             ctk.CTkLabel(episode_frame, text=url_text, width=300).pack(side="left", padx=5)
             
+            # Estado de la validación previa
+            result = self.validation_results.get(episode['url'])
+            status_label = ctk.CTkLabel(episode_frame, text=result.summary if result else "—", width=150)
+            status_label.pack(side="left", padx=5)
+            self.validation_labels[i] = status_label
+        
+        hidden = len(self.episodes_list) - EPISODE_DISPLAY_LIMIT
+        if hidden > 0:
+            more_frame = ctk.CTkFrame(self.episodes_scroll_frame)
+            more_frame.pack(fill="x", pady=2)
+            ctk.CTkLabel(more_frame, text=f"… y {hidden} episodios más").pack(padx=5)
+            
     def move_episode_up(self):
         """Mover episodio seleccionado hacia arriba"""
         # Implementar lógica de selección y movimiento
@@ -511,17 +636,55 @@ class SeriesConverterWindow:
         """Cargar lista de episodios desde archivo"""
         file_path = filedialog.askopenfilename(
             title="Cargar Lista de Episodios",
-            filetypes=[("Archivos JSON", "*.json"), ("Todos los archivos", "*.*")]
+            filetypes=[("Listas de episodios", "*.json *.m3u *.m3u8 *.csv *.txt"),
+                       ("Archivos JSON", "*.json"), ("Listas M3U", "*.m3u *.m3u8"),
+                       ("CSV (url, name, number)", "*.csv"), ("Lista de URLs", "*.txt"),
+                       ("Todos los archivos", "*.*")]
         )
         
         if file_path:
+            # La lista JSON propia reemplaza la actual; las importaciones agregan episodios nuevos
+            replace = detect_format(file_path) == "json"
+            existing = [] if replace else list(self.episodes_list)
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    self.episodes_list = json.load(f)
-                self.refresh_episodes_display()
-                self.log_message(f"📁 Lista cargada desde {Path(file_path).name}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Error al cargar archivo: {e}")
+                start_number = int(self.start_episode.get())
+            except ValueError:
+                start_number = 1
+            self.log_message(f"📥 Importando {Path(file_path).name}...")
+            threading.Thread(target=self._import_episodes_file,
+                             args=(file_path, start_number, existing, replace), daemon=True).start()
+    
+    def _import_episodes_file(self, file_path, start_number, existing, replace):
+        """Leer el archivo en segundo plano y agregar los episodios por lotes"""
+        imported_count = 0
+        
+        def on_batch(batch):
+            nonlocal imported_count
+            imported_count += len(batch)
+            count = imported_count
+            if not replace:
+                self.root.after(0, lambda: self.episodes_list.extend(batch))
+            self.root.after(0, lambda: self.log_message(f"📥 {count} episodios leídos..."))
+        
+        try:
+            imported, duplicates = import_episodes(file_path, start_number, existing, on_batch=on_batch)
+        except (EpisodeImportError, OSError, ValueError) as e:
+            self.root.after(0, lambda err=e: messagebox.showerror("Error", f"Error al cargar archivo: {err}"))
+            return
+        
+        self.root.after(0, lambda: self._finish_import(Path(file_path).name, imported, duplicates, replace))
+    
+    def _finish_import(self, file_name, imported, duplicates, replace):
+        """Mostrar la lista importada y validar las URLs nuevas"""
+        if replace:
+            self.episodes_list = imported
+        self.refresh_episodes_display()
+        message = f"📁 {len(imported)} episodios cargados desde {file_name}"
+        if duplicates:
+            message += f" ({duplicates} URLs repetidas descartadas)"
+        self.log_message(message)
+        if self.config_manager.get("converter", "validate_on_add", True):
+            self.validate_episodes(only_new=True)
                 
     def save_episodes_file(self):
         """Guardar lista de episodios a archivo"""
@@ -537,12 +700,49 @@ class SeriesConverterWindow:
         
         if file_path:
             try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.episodes_list, f, indent=2, ensure_ascii=False)
+                save_episode_list(file_path, self.episodes_list)
                 self.log_message(f"💾 Lista guardada en {Path(file_path).name}")
             except Exception as e:
                 messagebox.showerror("Error", f"Error al guardar archivo: {e}")
                 
+    def validate_episodes(self, only_new=False):
+        """Validar en segundo plano las URLs de la lista (lista, variantes y segmentos)"""
+        urls = [episode['url'] for episode in self.episodes_list]
+        if only_new:
+            urls = [url for url in urls if url not in self.validation_results]
+        if not urls:
+            return
+        self.log_message(f"🔍 Validando {len(set(urls))} URLs...")
+        threading.Thread(target=self._validate_urls, args=(urls,), daemon=True).start()
+    
+    def _validate_urls(self, urls):
+        """Validar URLs en paralelo mostrando el resultado en cada fila al llegar"""
+        validator = URLValidator(max_workers=self.config_manager.get("converter", "validation_workers", 8),
+                                 timeout=self.config_manager.get("converter", "segment_timeout_seconds", 30))
+        
+        def on_result(index, result):
+            self.root.after(0, lambda: self._show_validation_result(result))
+        
+        results = validator.validate_all(list(dict.fromkeys(urls)),
+                                         RESOLUTION_HEIGHTS.get(self.resolution.get()), on_result)
+        
+        failed = [result for result in results if result is not None and not result.ok]
+        self.root.after(0, lambda: self.log_message(
+            f"🔍 Validación terminada: {len(results) - len(failed)} correctas, {len(failed)} con problemas"))
+    
+    def _show_validation_result(self, result):
+        """Guardar el resultado y actualizar las filas de esa URL"""
+        self.validation_results[result.url] = result
+        for i, episode in enumerate(self.episodes_list):
+            if episode['url'] == result.url and i in self.validation_labels:
+                self.validation_labels[i].configure(text=result.summary)
+        if result.ok:
+            variants = ", ".join(f"{resolution} ({kbps} kbps)" for resolution, kbps in result.variants)
+            if variants:
+                self.log_message(f"📺 Variantes disponibles: {variants}")
+        else:
+            self.log_message(f"❌ URL no válida ({result.status}): {result.message}")
+    
     def select_output_directory(self):
         """Seleccionar directorio de salida"""
         directory = filedialog.askdirectory(title="Seleccionar Carpeta de Destino")
@@ -559,8 +759,16 @@ class SeriesConverterWindow:
         if not self.series_name.get().strip():
             messagebox.showwarning("Advertencia", "Ingresa el nombre de la serie")
             return
+        
+        failed = [episode['number'] for episode in self.episodes_list
+                  if episode['url'] in self.validation_results and not self.validation_results[episode['url']].ok]
+        if failed and not messagebox.askyesno(
+                "Episodios no válidos",
+                f"La validación falló para los episodios {', '.join(failed)}.\n¿Convertir de todas formas?"):
+            return
             
         self.is_converting = True
+        self.cancel_token = CancellationToken()
         self.start_button.configure(state="disabled")
         self.stop_button.configure(state="normal")
         
@@ -568,9 +776,10 @@ class SeriesConverterWindow:
         threading.Thread(target=self._convert_episodes, daemon=True).start()
         
     def _convert_episodes(self):
-        """Proceso de conversión en hilo separado"""
+        """Proceso de conversión en hilo separado (varios episodios a la vez)"""
         try:
             self.total_episodes = len(self.episodes_list)
+            self.current_episode = 0
             
             # Crear directorio de la serie
             series_dir = Path(self.output_directory.get()) / self.series_name.get().strip()
@@ -578,75 +787,186 @@ class SeriesConverterWindow:
             
             self.root.after(0, lambda: self.log_message(f"📁 Directorio de serie: {series_dir}"))
             
-            for i, episode in enumerate(self.episodes_list):
-                if not self.is_converting:
-                    break
-                    
-                self.current_episode = i + 1
-                
-                # Actualizar UI
-                self.root.after(0, lambda: self.status_label.configure(
-                    text=f"Convirtiendo episodio {self.current_episode} de {self.total_episodes}"))
-                self.root.after(0, lambda: self.episode_label.configure(
-                    text=f"Episodio {episode['number']}: {episode['name']}"))
-                
-                # Generar nombre de archivo
-                season = self.season_number.get().zfill(2)
-                episode_num = episode['number']
-                filename = f"{self.series_name.get().strip()} {season}x{episode_num}.mp4"
-                output_path = series_dir / filename
-                
-                self.root.after(0, lambda: self.log_message(f"🎬 Iniciando conversión: {episode['name']}"))
-                self.root.after(0, lambda: self.log_message(f"📄 Archivo de salida: {output_path.name}"))
-                
-                # Conversión real usando FFmpeg
-                success = self._convert_single_episode(episode['url'], output_path)
-                
-                if success:
-                    self.root.after(0, lambda: self.log_message(f"✅ Completado: {episode['name']}"))
-                else:
-                    self.root.after(0, lambda: self.log_message(f"❌ Error al convertir: {episode['name']}"))
-                
-                # Actualizar progreso general
-                progress = (i + 1) / self.total_episodes
-                self.root.after(0, lambda p=progress: self.overall_progress.set(p))
-                
+            converter_config = self.config_manager.get_converter_config()
+            self.episode_queue = EpisodeQueue(
+                max_parallel=converter_config.get("max_parallel_episodes", 3),
+                max_per_host=converter_config.get("max_episodes_per_host", 2),
+                bandwidth_bucket=self.bandwidth_limiter.global_bucket
+            )
+            self.root.after(0, lambda: self.log_message(
+                f"🚦 Hasta {self.episode_queue.max_parallel} episodios a la vez "
+                f"({self.episode_queue.max_per_host} por servidor)"))
+            self.root.after(0, self._update_queue_status)
+            
+            jobs = [EpisodeJob(i, episode['url'], episode) for i, episode in enumerate(self.episodes_list)]
+            if self.compression_level.get() != "None":
+                # Recodificación: descargar el siguiente episodio mientras se codifica el actual
+                pipeline = FetchEncodePipeline(
+                    self.episode_queue,
+                    encode_workers=converter_config.get("max_parallel_encodes", 1),
+                    max_prefetch=converter_config.get("prefetch_depth", 2),
+                    disk_budget=converter_config.get("prefetch_disk_mb", 8192) * 1024 * 1024
+                )
+                self.root.after(0, lambda: self.log_message(
+                    f"🔀 Descarga y codificación encadenadas ({pipeline.encode_workers} codificación(es), "
+                    f"hasta {pipeline.max_prefetch} episodio(s) descargados por adelantado)"))
+                pipeline.run(jobs, lambda job: self._fetch_episode_job(job, series_dir),
+                             lambda job, source: self._encode_episode_job(job, source, series_dir),
+                             self.cancel_token, self._on_episode_finished)
+            else:
+                self.episode_queue.run(jobs, lambda job: self._run_episode_job(job, series_dir),
+                                       self.cancel_token, self._on_episode_finished)
+            
             if self.is_converting:
+                failed = sum(1 for job in jobs if not job.success)
+                if failed:
+                    self.root.after(0, lambda: self.log_message(f"⚠️ {failed} episodio(s) fallaron"))
                 self.root.after(0, lambda: self.log_message("🎉 ¡Conversión de serie completada!"))
                 self.root.after(0, lambda: self.log_message(f"📁 Archivos guardados en: {series_dir}"))
                 
         except Exception as e:
-            self.root.after(0, lambda: self.log_message(f"❌ Error durante la conversión: {e}"))
+            self.root.after(0, lambda err=e: self.log_message(f"❌ Error durante la conversión: {err}"))
         finally:
             self.is_converting = False
             self.root.after(0, self._reset_conversion_ui)
+    
+    def _run_episode_job(self, job, series_dir):
+        """Convertir un episodio de la cola con su propia barra de progreso"""
+        output_path = self._start_episode_job(job, series_dir)
+        
+        # Conversión real usando FFmpeg
+        success = self._convert_single_episode(job.url, output_path, self._episode_progress_setter(job),
+                                               self.episode_queue.report_bytes)
+        self._report_episode_result(job.payload, success)
+        return success
+    
+    def _fetch_episode_job(self, job, series_dir):
+        """Etapa de descarga de un episodio en modo encadenado"""
+        output_path = self._start_episode_job(job, series_dir)
+        source = self._fetch_episode(job.url, output_path, self._episode_progress_setter(job),
+                                     self.episode_queue.report_bytes)
+        if source is None:
+            self._report_episode_result(job.payload, False)
+        else:
+            self.root.after(0, lambda: self._set_episode_row_text(
+                job.index, f"⏳ Episodio {job.payload['number']}: descargado, esperando codificación"))
+        return source
+    
+    def _encode_episode_job(self, job, source, series_dir):
+        """Etapa de codificación de un episodio en modo encadenado"""
+        episode = job.payload
+        output_path = self._episode_output_path(episode, series_dir)
+        self.root.after(0, lambda: self._set_episode_row_text(
+            job.index, f"⚙️ Episodio {episode['number']}: codificando"))
+        # En modo transmisión los segmentos se descargan aquí: contarlos para la admisión
+        success = self._transcode_episode(source, output_path, self._episode_progress_setter(job),
+                                          self.episode_queue.report_bytes)
+        self._report_episode_result(episode, success)
+        return success
+    
+    def _episode_output_path(self, episode, series_dir):
+        """Ruta de salida de un episodio"""
+        season = self.season_number.get().zfill(2)
+        filename = f"{self.series_name.get().strip()} {season}x{episode['number']}.mp4"
+        return series_dir / filename
+    
+    def _start_episode_job(self, job, series_dir):
+        """Mostrar la barra de progreso del episodio y retornar su ruta de salida"""
+        episode = job.payload
+        output_path = self._episode_output_path(episode, series_dir)
+        
+        self.root.after(0, lambda: self._add_episode_row(
+            job.index, f"Episodio {episode['number']}: {episode['name']}"))
+        self.root.after(0, self._update_queue_status)
+        self.root.after(0, lambda: self.log_message(f"🎬 Iniciando conversión: {episode['name']}"))
+        self.root.after(0, lambda: self.log_message(f"📄 Archivo de salida: {output_path.name}"))
+        return output_path
+    
+    def _episode_progress_setter(self, job):
+        def set_progress(value):
+            self.root.after(0, lambda: self._set_episode_row_progress(job.index, value))
+        return set_progress
+    
+    def _report_episode_result(self, episode, success):
+        if success:
+            self.root.after(0, lambda: self.log_message(f"✅ Completado: {episode['name']}"))
+        elif not self.cancel_token.is_cancelled:
+            self.root.after(0, lambda: self.log_message(f"❌ Error al convertir: {episode['name']}"))
+    
+    def _on_episode_finished(self, job):
+        """Actualizar el progreso general al terminar un episodio"""
+        with self.progress_lock:
+            self.current_episode += 1
+            progress = self.current_episode / self.total_episodes
+        self.root.after(0, lambda: self._remove_episode_row(job.index))
+        self.root.after(0, lambda: self.overall_progress.set(progress))
+        self.root.after(0, self._update_queue_status)
+    
+    def _update_queue_status(self):
+        """Mostrar episodios activos y completados"""
+        if not self.is_converting:
+            return
+        active = self.episode_queue.active_count if self.episode_queue else 0
+        self.status_label.configure(
+            text=f"Completados {self.current_episode} de {self.total_episodes} · {active} en curso")
+    
+    def _add_episode_row(self, index, text):
+        """Agregar una barra de progreso para un episodio activo"""
+        row = ctk.CTkFrame(self.active_episodes_frame)
+        row.pack(fill="x", padx=15, pady=(0, 5))
+        label = ctk.CTkLabel(row, text=text, font=ctk.CTkFont(size=11))
+        label.pack(anchor="w", padx=10, pady=(5, 0))
+        bar = ctk.CTkProgressBar(row)
+        bar.pack(fill="x", padx=10, pady=(0, 8))
+        bar.set(0)
+        self.episode_rows[index] = (row, bar, label)
+    
+    def _set_episode_row_progress(self, index, value):
+        row = self.episode_rows.get(index)
+        if row:
+            row[1].set(value)
+    
+    def _set_episode_row_text(self, index, text):
+        row = self.episode_rows.get(index)
+        if row:
+            row[2].configure(text=text)
+    
+    def _remove_episode_row(self, index):
+        row = self.episode_rows.pop(index, None)
+        if row:
+            row[0].destroy()
             
     def _reset_conversion_ui(self):
         """Resetear UI después de conversión"""
         self.start_button.configure(state="normal")
         self.stop_button.configure(state="disabled")
         self.status_label.configure(text="Conversión finalizada")
-        self.episode_label.configure(text="")
         self.overall_progress.set(0)
-        self.episode_progress.set(0)
+        for index in list(self.episode_rows):
+            self._remove_episode_row(index)
+        
+    def _convert_single_episode(self, url, output_path, set_progress=None, on_bytes=None):
+        """Convertir un episodio individual usando FFmpeg con progreso en tiempo real
+        
+        set_progress recibe el avance del episodio (0-1); on_bytes, los bytes
+        descargados de cada segmento (para la admisión por ancho de banda).
+        """
+        set_progress = set_progress or (lambda value: None)
+        source = self._fetch_episode(url, output_path, set_progress, on_bytes)
+        if source is None:
+            return False
+        return self._transcode_episode(source, output_path, set_progress, on_bytes)
+    
+    def _fetch_episode(self, url, output_path, set_progress, on_bytes=None):
+        """Etapa de descarga: elegir la variante y bajar los segmentos HLS
         
-    def _convert_single_episode(self, url, output_path):
-        """Convertir un episodio individual usando FFmpeg con progreso en tiempo real"""
+        Retorna el origen para FFmpeg (input_url, source_height, duration,
+        work_dir, bytes) o None si falla.
+        """
         try:
-            # Importar FFmpegProcessor para verificar disponibilidad
-            import sys
-            import os
-            import subprocess
-            import re
-            sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
-            from app.utils import FFmpegProcessor
-            
-            # Crear procesador FFmpeg
-            ffmpeg = FFmpegProcessor()
-            
-            if not ffmpeg.is_available():
+            if not self.controller.ffmpeg_processor.is_available():
                 self.root.after(0, lambda: self.log_message("❌ FFmpeg no está disponible"))
-                return False
+                return None
             
             # Configurar parámetros de conversión
             resolution = self.resolution.get()
@@ -655,87 +975,267 @@ class SeriesConverterWindow:
             self.root.after(0, lambda: self.log_message(f"⚙️ Configuración: {resolution}, Compresión: {compression_level}"))
             
             # Resetear progreso del episodio
-            self.root.after(0, lambda: self.episode_progress.set(0))
+            set_progress(0)
+            
+            # Descargar segmentos HLS en paralelo para leerlos desde disco local
+            work_dir = None
+            input_url = url
+            source_height = None
+            duration = 0
+            if is_hls_url(url):
+                downloader = self._create_hls_downloader()
+                playlist = self._fetch_hls_playlist(downloader, url)
+                if playlist is None:
+                    return None
+                duration = playlist.total_duration
+                if playlist.variant:
+                    input_url = playlist.variant.uri
+                    source_height = playlist.variant.height
+                if self._use_native_hls(url) and self._use_streaming(downloader, playlist, source_height):
+                    # Remux: enviar los segmentos directamente a FFmpeg sin archivos temporales
+                    self.root.after(0, lambda: self.log_message(
+                        "📡 Transmitiendo segmentos directamente a FFmpeg (sin archivos temporales)"))
+                    return {'input_url': 'pipe:0', 'source_height': source_height,
+                            'duration': duration, 'work_dir': None, 'bytes': 0,
+                            'playlist': playlist}
+                if self._use_native_hls(url):
+                    work_dir = self._download_hls(downloader, playlist, output_path, set_progress, on_bytes)
+                    if work_dir is None:
+                        return None
+                    input_url = str(work_dir / "index.m3u8")
+            
+            byte_count = sum(f.stat().st_size for f in work_dir.iterdir()) if work_dir else 0
+            return {'input_url': input_url, 'source_height': source_height,
+                    'duration': duration, 'work_dir': work_dir, 'bytes': byte_count}
+            
+        except Exception as e:
+            self.root.after(0, lambda err=e: self.log_message(f"❌ Error en descarga: {err}"))
+            return None
+    
+    def _transcode_episode(self, source, output_path, set_progress, on_bytes=None):
+        """Etapa de codificación: ejecutar FFmpeg sobre el origen obtenido"""
+        try:
+            import re
+            
+            # Usar el procesador compartido (prioridad y procesos activos)
+            ffmpeg = self.controller.ffmpeg_processor
+            set_progress(0)
+            
+            # Modo transmisión: un hilo escribe los segmentos en orden en stdin de FFmpeg
+            stdin_feeder = None
+            playlist = source.get('playlist')
+            if playlist is not None:
+                downloader = self._create_hls_downloader()
+                reported_bytes = 0
+                
+                def handle_stream_progress(completed, total, written_bytes):
+                    nonlocal reported_bytes
+                    if on_bytes:
+                        on_bytes(written_bytes - reported_bytes)
+                        reported_bytes = written_bytes
+                
+                def stdin_feeder(stdin):
+                    nonlocal reported_bytes
+                    reported_bytes = 0
+                    downloader.stream(playlist, stdin, handle_stream_progress, self.cancel_token,
+                                      self.config_manager.get("converter", "stream_buffer_segments", 16))
+            
+            # Salida progresiva: reproducible en Jellyfin mientras se convierte
+            output_mode = OUTPUT_MODE_LABELS.get(self.output_mode_label.get(), "standard")
+            progressive_path = Path(ffmpeg.get_progressive_path(str(output_path), output_mode))
             
             # Generar comando FFmpeg
-            cmd = self._get_ffmpeg_command(ffmpeg.ffmpeg_path, url, str(output_path))
+            cmd = self._get_ffmpeg_command(ffmpeg.ffmpeg_path, source['input_url'], str(progressive_path),
+                                           source['source_height'], output_mode,
+                                           source.get('duration', 0))
             
             self.root.after(0, lambda: self.log_message(f"🔧 Comando: {' '.join(cmd)}"))
             
-            # Ejecutar FFmpeg con progreso en tiempo real
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
-            )
-            
-            total_duration = 0
+            # Ejecutar FFmpeg con progreso en tiempo real (por flujo, la duración viene de la lista)
+            total_duration = playlist.total_duration if playlist is not None else 0
             
-            # Leer salida en tiempo real
-            while True:
-                if not self.is_converting:
-                    process.terminate()
-                    return False
+            def handle_output(line):
+                nonlocal total_duration
                 
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
+                # Parsear duración total
+                if "Duration:" in line and total_duration == 0:
+                    duration_match = re.search(r'Duration: (\d{2}):(\d{2}):(\d{2})\.(\d{2})', line)
+                    if duration_match:
+                        hours, minutes, seconds, centiseconds = map(int, duration_match.groups())
+                        total_duration = hours * 3600 + minutes * 60 + seconds + centiseconds / 100
                 
-                if output:
-                    line = output.strip()
-                    
-                    # Parsear duración total
-                    if "Duration:" in line and total_duration == 0:
-                        duration_match = re.search(r'Duration: (\d{2}):(\d{2}):(\d{2})\.(\d{2})', line)
-                        if duration_match:
-                            hours, minutes, seconds, centiseconds = map(int, duration_match.groups())
-                            total_duration = hours * 3600 + minutes * 60 + seconds + centiseconds / 100
-                    
-                    # Parsear progreso
-                    if "time=" in line and total_duration > 0:
-                        time_match = re.search(r'time=(\d{2}):(\d{2}):(\d{2})\.(\d{2})', line)
-                        if time_match:
-                            hours, minutes, seconds, centiseconds = map(int, time_match.groups())
-                            current_time = hours * 3600 + minutes * 60 + seconds + centiseconds / 100
-                            progress = min((current_time / total_duration), 1.0)
-                            self.root.after(0, lambda p=progress: self.episode_progress.set(p))
-                    
-                    # Mostrar log con categorización
-                    if line and not line.startswith('frame='):
-                        if 'error' in line.lower():
-                            self.root.after(0, lambda l=line: self.log_message(f"❌ {l}"))
-                        elif 'warning' in line.lower():
-                            self.root.after(0, lambda l=line: self.log_message(f"⚠️ {l}"))
-                        elif any(keyword in line.lower() for keyword in ['duration', 'stream', 'video:', 'audio:', 'input #', 'output #']):
-                            self.root.after(0, lambda l=line: self.log_message(f"ℹ️ {l}"))
-                        elif 'time=' in line:
-                            self.root.after(0, lambda l=line: self.log_message(f"⏱️ {l}"))
-                        else:
-                            self.root.after(0, lambda l=line: self.log_message(f"📋 {l}"))
+                # Parsear progreso
+                if "time=" in line and total_duration > 0:
+                    time_match = re.search(r'time=(\d{2}):(\d{2}):(\d{2})\.(\d{2})', line)
+                    if time_match:
+                        hours, minutes, seconds, centiseconds = map(int, time_match.groups())
+                        current_time = hours * 3600 + minutes * 60 + seconds + centiseconds / 100
+                        progress = min((current_time / total_duration), 1.0)
+                        set_progress(progress)
+                
+                # Mostrar log con categorización
+                if not line.startswith('frame='):
+                    if 'error' in line.lower():
+                        self.root.after(0, lambda l=line: self.log_message(f"❌ {l}"))
+                    elif 'warning' in line.lower():
+                        self.root.after(0, lambda l=line: self.log_message(f"⚠️ {l}"))
+                    elif any(keyword in line.lower() for keyword in ['duration', 'stream', 'video:', 'audio:', 'input #', 'output #']):
+                        self.root.after(0, lambda l=line: self.log_message(f"ℹ️ {l}"))
+                    elif 'time=' in line:
+                        self.root.after(0, lambda l=line: self.log_message(f"⏱️ {l}"))
+                    else:
+                        self.root.after(0, lambda l=line: self.log_message(f"📋 {l}"))
             
-            # Verificar resultado
-            return_code = process.wait()
+            def handle_retry(attempt, result):
+                reason = "sin avance" if result.stalled else f"código {result.return_code}"
+                self.root.after(0, lambda: self.log_message(
+                    f"🔁 Reintento {attempt}/{ffmpeg.max_retries} del episodio ({reason})"))
+                set_progress(0)
+            
+            # Descargas de red: reintentar también ante errores, con vigilancia de estancamiento
+            result = ffmpeg.run_with_retries(cmd, str(progressive_path), handle_output, self.cancel_token,
+                                             retry_on_error=True, on_retry=handle_retry,
+                                             stdin_feeder=stdin_feeder)
+            
+            if result.cancelled:
+                return False
+            
+            if result.stalled:
+                self.root.after(0, lambda: self.log_message(
+                    f"⏰ Episodio sin avance durante {ffmpeg.stall_timeout}s; se marca como fallido"))
+                return False
             
-            if return_code == 0 and output_path.exists():
+            # Finalizar: MP4 normal con el índice al principio
+            if result.success and ffmpeg.needs_finalize(str(output_path), output_mode):
+                self.root.after(0, lambda: self.log_message(f"🎞️ Finalizando con faststart: {output_path.name}"))
+                if not ffmpeg.finalize_output(str(progressive_path), str(output_path), self.cancel_token,
+                                              source.get('duration', 0)):
+                    self.root.after(0, lambda: self.log_message(
+                        f"⚠️ No se pudo finalizar; se conserva {progressive_path.name}"))
+                    return False
+            
+            # Verificar resultado
+            if result.success and output_path.exists():
                 file_size = output_path.stat().st_size / (1024 * 1024)  # MB
                 self.root.after(0, lambda: self.log_message(f"📊 Archivo creado: {file_size:.2f} MB"))
-                self.root.after(0, lambda: self.episode_progress.set(1.0))
+                set_progress(1.0)
                 return True
             else:
                 return False
                 
         except Exception as e:
-            self.root.after(0, lambda: self.log_message(f"❌ Error en conversión: {e}"))
+            self.root.after(0, lambda err=e: self.log_message(f"❌ Error en conversión: {err}"))
             return False
+        finally:
+            if source['work_dir'] is not None:
+                remove_work_dir(source['work_dir'])
     
-    def _get_ffmpeg_command(self, ffmpeg_path, input_url, output_path):
-        """Generar comando FFmpeg según configuración"""
-        cmd = [ffmpeg_path, '-i', input_url]
+    def _use_native_hls(self, url):
+        """Indica si la URL se descarga con el descargador HLS nativo"""
+        return bool(self.config_manager.get("converter", "native_hls", True)) and is_hls_url(url)
+    
+    def _is_stream_copy(self, source_height=None):
+        """Indica si el episodio se copia sin recodificar"""
+        target_height = RESOLUTION_HEIGHTS.get(self.resolution.get())
+        return (self.compression_level.get() == "None"
+                or (target_height is not None and source_height == target_height))
+    
+    def _use_streaming(self, downloader, playlist, source_height=None):
+        """Indica si la copia puede hacerse transmitiendo los segmentos a FFmpeg"""
+        return (bool(self.config_manager.get("converter", "stream_remux", True))
+                and self._is_stream_copy(source_height)
+                and downloader.can_stream(playlist))
+    
+    def _create_hls_downloader(self):
+        """Crear un descargador HLS según la configuración del conversor
+
+        Cada descargador corresponde a un episodio y tiene su propio límite de
+        ancho de banda, además del global.
+        """
+        converter_config = self.config_manager.get_converter_config()
+        if self.segment_cache is None:
+            self.segment_cache = get_segment_cache(self.config_manager)
+        return HLSDownloader(max_workers=converter_config.get("segment_workers", 8),
+                             timeout=converter_config.get("segment_timeout_seconds", 30),
+                             cache=self.segment_cache,
+                             throttle=self.bandwidth_limiter.episode_throttle())
+    
+    def _fetch_hls_playlist(self, downloader, url):
+        """Obtener la lista de medios, eligiendo la variante según la resolución pedida"""
+        try:
+            playlist = downloader.fetch_media_playlist(url, RESOLUTION_HEIGHTS.get(self.resolution.get()))
+        except (HLSError, requests.RequestException) as e:
+            self.root.after(0, lambda err=e: self.log_message(f"❌ Error leyendo la lista M3U8: {err}"))
+            return None
+        
+        variant = playlist.variant
+        if variant:
+            resolution = f"{variant.resolution[0]}x{variant.resolution[1]}" if variant.resolution else "desconocida"
+            self.root.after(0, lambda: self.log_message(
+                f"📺 Variante elegida: {resolution}, {variant.bandwidth // 1000} kbps"))
+            if variant.height == RESOLUTION_HEIGHTS.get(self.resolution.get()):
+                self.root.after(0, lambda: self.log_message(
+                    "🎯 La variante coincide con la resolución pedida: copia directa sin recodificar"))
+        return playlist
+    
+    def _download_hls(self, downloader, playlist, output_path, set_progress, on_bytes=None):
+        """Descargar los segmentos de una lista M3U8 a una carpeta temporal"""
+        work_dir = Path(self.config_manager.get_temp_folder()) / "hls" / output_path.stem
+        reported_bytes = 0
+        
+        def handle_progress(completed, total, downloaded_bytes):
+            nonlocal reported_bytes
+            if on_bytes:
+                on_bytes(downloaded_bytes - reported_bytes)
+                reported_bytes = downloaded_bytes
+            set_progress(completed / total)
+            if completed == total or completed % 25 == 0:
+                size_mb = downloaded_bytes / (1024 * 1024)
+                self.root.after(0, lambda: self.log_message(
+                    f"📥 Segmentos: {completed}/{total} ({size_mb:.1f} MB)"))
+        
+        try:
+            self.root.after(0, lambda: self.log_message(
+                f"📥 Descargando {len(playlist.segments)} segmentos con {downloader.max_workers} conexiones"
+                + (" (cifrado AES-128)" if playlist.is_encrypted else "")))
+            downloader.download(playlist.url, work_dir, handle_progress, self.cancel_token, playlist)
+            if downloader.cache_hits:
+                self.root.after(0, lambda: self.log_message(
+                    f"♻️ {downloader.cache_hits} segmentos recuperados de la caché"))
+            set_progress(0)
+            return work_dir
+        except HLSCancelled:
+            remove_work_dir(work_dir)
+            return None
+        except (HLSError, OSError, requests.RequestException) as e:
+            remove_work_dir(work_dir)
+            self.root.after(0, lambda err=e: self.log_message(f"❌ Error descargando segmentos: {err}"))
+            return None
+    
+    def _get_ffmpeg_command(self, ffmpeg_path, input_url, output_path, source_height=None,
+                            output_mode="standard", duration=0):
+        """Generar comando FFmpeg según configuración
+        
+        source_height: altura de la variante HLS elegida; si coincide con la
+        resolución pedida se copian los streams sin escalar ni recodificar.
+        duration: duración conocida del origen; al copiar permite escribir el
+        MP4 con faststart en una sola pasada.
+        """
+        cmd = [ffmpeg_path]
+        
+        # Lista local descargada: permitir segmentos y claves en disco
+        if input_url.endswith('.m3u8') and Path(input_url).exists():
+            cmd.extend(['-allowed_extensions', 'ALL', '-protocol_whitelist', 'file,crypto,data'])
+        # Segmentos transmitidos por stdin
+        if input_url == 'pipe:0':
+            cmd.extend(['-f', 'mpegts'])
+        cmd.extend(['-i', input_url])
+        
+        target_height = RESOLUTION_HEIGHTS.get(self.resolution.get())
+        stream_copy = self._is_stream_copy(source_height)
         
         # Configurar video
-        if self.compression_level.get() == "None":
+        if stream_copy:
             cmd.extend(['-c:v', 'copy'])
         else:
             cmd.extend(['-c:v', 'libx264'])
@@ -749,8 +1249,8 @@ class SeriesConverterWindow:
             }
             cmd.extend(['-crf', crf_values.get(self.compression_level.get(), "23")])
         
-        # Configurar resolución
-        if self.resolution.get() != "Original":
+        # Configurar resolución (no se puede escalar al copiar el stream)
+        if not stream_copy and target_height is not None:
             resolution_map = {
                 "1080p": "1920:1080",
                 "720p": "1280:720",
@@ -760,20 +1260,35 @@ class SeriesConverterWindow:
             cmd.extend(['-vf', f'scale={resolution_map[self.resolution.get()]}'])
         
         # Configurar audio
-        if self.compression_level.get() == "None":
+        if stream_copy:
             cmd.extend(['-c:a', 'copy'])
         else:
             cmd.extend(['-c:a', 'aac', '-b:a', '128k'])
         
         # Configuraciones adicionales
+        copy_duration = duration if stream_copy else 0
+        cmd.extend(self.controller.ffmpeg_processor.get_output_args(output_path, output_mode, copy_duration))
         cmd.extend(['-y', output_path])
         
         return cmd
     
     def stop_conversion(self):
-        """Detener conversión"""
+        """Detener conversión, terminando el proceso FFmpeg en curso"""
         self.is_converting = False
-        self.log_message("⏹️ Conversión detenida por el usuario")
+        latency = self.cancel_token.cancel()
+        self.log_message(f"⏹️ Conversión detenida por el usuario ({latency * 1000:.0f} ms)")
+        
+    def clear_segment_cache(self):
+        """Vaciar la caché de segmentos HLS descargados"""
+        if self.is_converting:
+            messagebox.showwarning("Advertencia", "No se puede limpiar la caché durante una conversión")
+            return
+        cache = self.segment_cache or get_segment_cache(self.config_manager)
+        if cache is None:
+            self.log_message("ℹ️ La caché de segmentos está desactivada")
+            return
+        removed, freed = cache.clear()
+        self.log_message(f"🧹 Caché limpiada: {removed} segmentos ({freed / (1024 * 1024):.1f} MB)")
         
     def back_to_menu(self):
         """Volver al menú principal"""
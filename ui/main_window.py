@@ -5,12 +5,14 @@ Ventana Principal del Organizador de Series
 """
 
 import customtkinter as ctk
-from tkinter import messagebox, filedialog
+from tkinter import messagebox, filedialog, TclError
 import threading
 import json
 from pathlib import Path
 from datetime import datetime
 
+from app.search_worker import MetadataSearchWorker
+
 class MainWindow:
     def __init__(self, controller, config_manager):
         self.controller = controller
@@ -25,6 +27,12 @@ class MainWindow:
         self.create_interface()
         self.check_ffmpeg_status()
         
+        # Búsqueda de metadatos en segundo plano (la ventana no se congela)
+        self.search_results = []
+        self.search_worker = MetadataSearchWorker(
+            self.controller.search_metadata, self._deliver_to_ui,
+            debounce=self.config_manager.get("metadata", "search_debounce_ms", 350) / 1000)
+        
     def setup_window(self):
         """Configurar la ventana principal"""
         self.root = ctk.CTk()
@@ -53,6 +61,7 @@ class MainWindow:
         self.audio_mode = ctk.StringVar(value="keep_all")
         self.selected_audio_track = ctk.StringVar(value="0")
         self.audio_format = ctk.StringVar(value="mp3")
+        self.background_mode = ctk.BooleanVar(value=self.controller.priority_mode == "background")
         
     def create_interface(self):
         """Crear la interfaz principal"""
@@ -239,15 +248,25 @@ class MainWindow:
                                               command=self.on_search_source_change)
         self.source_jikan.pack(side="left", padx=(0, 10))
         
+        self.source_offline = ctk.CTkRadioButton(source_frame, text="Local (sin conexión)", 
+                                                variable=self.search_source, value="offline",
+                                                command=self.on_search_source_change)
+        self.source_offline.pack(side="left", padx=(0, 10))
+        
         search_entry_frame = ctk.CTkFrame(search_frame)
         search_entry_frame.pack(fill="x", padx=10, pady=(0, 10))
         
         self.search_entry = ctk.CTkEntry(search_entry_frame, textvariable=self.metadata_search, placeholder_text="Buscar serie...")
         self.search_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        self.search_entry.bind("<KeyRelease>", self.on_search_typed)
+        self.search_entry.bind("<Return>", lambda event: self.search_metadata())
         
         ctk.CTkButton(search_entry_frame, text="🔍 Buscar", 
                      command=self.search_metadata, width=100).pack(side="left")
         
+        self.search_status_label = ctk.CTkLabel(search_frame, text="", font=ctk.CTkFont(size=11))
+        self.search_status_label.pack(anchor="w", padx=10, pady=(0, 5))
+        
         # Frame para resultados de búsqueda (inicialmente oculto)
         self.search_results_frame = ctk.CTkFrame(search_frame)
         
@@ -285,6 +304,16 @@ class MainWindow:
                                               command=self.on_mode_change)
         self.mode_extract.pack(anchor="w", padx=15, pady=(0, 15))
         
+        # Prioridad de ejecución (se puede cambiar durante el procesamiento)
+        priority_frame = ctk.CTkFrame(mode_frame)
+        priority_frame.pack(fill="x", padx=15, pady=(0, 15))
+        
+        self.background_switch = ctk.CTkSwitch(priority_frame, 
+                                               text="🌙 Segundo plano (baja prioridad de CPU y disco)",
+                                               variable=self.background_mode,
+                                               command=self.on_priority_mode_change)
+        self.background_switch.pack(anchor="w", padx=15, pady=10)
+        
         # Frame de opciones de compresión (inicialmente oculto)
         self.compression_frame = ctk.CTkFrame(mode_frame)
         
@@ -608,9 +637,32 @@ class MainWindow:
             return
         
         # Delegar al controlador
-        self.video_files = self.controller.detect_video_files(self.source_folder.get())
+        self.controller.detect_video_files(self.source_folder.get())
+        self.video_files = self.controller.video_files
         self.refresh_files_display()
         self.log_message(f"🔍 Detectados {len(self.video_files)} archivos de video")
+        
+        # Identificar la serie en segundo plano si todavía no tiene nombre
+        if (self.video_files and not self.series_name.get().strip()
+                and self.config_manager.get("metadata", "auto_identify", True)):
+            threading.Thread(target=self._auto_identify_series, args=(self.source_folder.get(),),
+                             daemon=True).start()
+    
+    def _auto_identify_series(self, source_folder):
+        """Identificación automática (hilo separado); rellena los campos si hay confianza"""
+        identification = self.controller.auto_identify_series(source_folder)
+        self._deliver_to_ui(lambda: self._show_identification(identification))
+    
+    def _show_identification(self, identification):
+        """Aplicar el resultado de la identificación automática (hilo de la UI)
+        
+        Solo si es fiable y el usuario no ha escrito un nombre mientras tanto.
+        """
+        if identification.confident and not self.series_name.get().strip():
+            self.select_metadata_result(identification.result, identification.source)
+        elif identification.query:
+            # Sin confianza suficiente: dejar la búsqueda preparada para elegir a mano
+            self.metadata_search.set(identification.query)
     
     def refresh_files_display(self):
         """Actualizar la visualización de archivos"""
@@ -807,8 +859,19 @@ class MainWindow:
             self.log_message(f"🗑️ Archivo eliminado: {removed_file.original_name}")
     
     def on_search_source_change(self):
-        """Cambio en la fuente de búsqueda"""
-        pass
+        """Cambio en la fuente de búsqueda: repetir la búsqueda actual en la nueva fuente"""
+        if self.metadata_search.get().strip():
+            self.search_metadata()
+    
+    def on_search_typed(self, event=None):
+        """Búsqueda mientras se escribe (se lanza tras una pausa en las pulsaciones)"""
+        if event is not None and event.keysym in ("Return", "KP_Enter"):
+            return
+        query = self.metadata_search.get().strip()
+        if self.search_worker.request(query, self.search_source.get(), self._show_search_results):
+            self.search_status_label.configure(text=f"⏳ Buscando '{query}'...")
+        else:
+            self.search_status_label.configure(text="")
     
     def search_metadata(self):
         """Buscar metadatos"""
@@ -817,8 +880,56 @@ class MainWindow:
             messagebox.showwarning("Advertencia", "Ingresa un término de búsqueda")
             return
         
-        # Delegar al controlador
-        self.controller.search_metadata(query, self.search_source.get())
+        # Delegar al controlador en segundo plano; los resultados llegan por root.after
+        self.search_worker.request(query, self.search_source.get(), self._show_search_results, immediate=True)
+        self.search_status_label.configure(text=f"⏳ Buscando '{query}'...")
+    
+    def _deliver_to_ui(self, callback):
+        """Ejecutar callback en el hilo de la interfaz (si la ventana sigue abierta)"""
+        try:
+            self.root.after(0, callback)
+        except (RuntimeError, TclError):
+            pass
+    
+    def _show_search_results(self, query, source, results, error):
+        """Mostrar los resultados de la búsqueda más reciente"""
+        for widget in self.results_scroll.winfo_children():
+            widget.destroy()
+        self.search_results = results
+        
+        if error is not None:
+            self.search_status_label.configure(text=f"❌ Error buscando '{query}'")
+            self.log_message(f"❌ Error buscando metadatos: {error}")
+            return
+        
+        self.search_status_label.configure(text=f"🔍 {len(results)} resultados para '{query}' en {source.upper()}")
+        self.log_message(f"🔍 Encontrados {len(results)} resultados para '{query}' en {source.upper()}")
+        if not results:
+            self.search_results_frame.pack_forget()
+            return
+        
+        for result in results:
+            if result.get('source', source) == "tmdb":
+                title = result.get('name', '')
+                year = (result.get('first_air_date') or '')[:4]
+            else:
+                title = result.get('title_english') or result.get('title', '')
+                year = str(result.get('year') or '')
+            text = f"{title} ({year})" if year else title
+            ctk.CTkButton(self.results_scroll, text=text, anchor="w",
+                          command=lambda r=result, s=source: self.select_metadata_result(r, s)
+                          ).pack(fill="x", padx=5, pady=2)
+        self.search_results_frame.pack(fill="x", padx=10, pady=(0, 10))
+    
+    def select_metadata_result(self, result, source):
+        """Aplicar el resultado elegido a la configuración de la serie"""
+        self.controller.apply_metadata(result, source)
+        metadata = self.controller.model.metadata
+        self.series_name.set(metadata.name)
+        self.series_year.set(metadata.year)
+        if result.get('source', source) == "tmdb":
+            self.series_id.set(metadata.series_id)
+        self.search_results_frame.pack_forget()
     
     def on_mode_change(self):
         """Cambio en el modo de operación"""
@@ -834,6 +945,11 @@ class MainWindow:
             self.audio_frame.pack(fill="x", padx=15, pady=(0, 15))
             self.on_audio_mode_change()
     
+    def on_priority_mode_change(self):
+        """Cambio en el modo de prioridad de ejecución"""
+        mode = "background" if self.background_mode.get() else "normal"
+        self.controller.set_priority_mode(mode)
+    
     def on_audio_mode_change(self):
         """Cambio en el modo de audio"""
         mode = self.audio_mode.get()
@@ -912,11 +1028,13 @@ class MainWindow:
     def stop_processing(self):
         """Detener procesamiento"""
         self.is_processing = False
-        self.controller.stop_processing()
+        self.controller.stop_processing_request()
         self.log_message("⏹️ Procesamiento detenido por el usuario")
     
     def back_to_menu(self):
         """Volver al menú principal"""
+        self.search_worker.shutdown()
+        self.controller.details_prefetcher.cancel()
         if self.is_processing:
             if messagebox.askyesno("Confirmar", "¿Detener el procesamiento y volver al menú?"):
                 self.stop_processing()